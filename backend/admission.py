@@ -0,0 +1,197 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests for one route class and bounds its wait queue.
+
+    Requests beyond `limit` wait up to `queue_timeout` seconds for a slot;
+    once `max_queue` requests are already waiting new ones are shed at once.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int,
+                 queue_timeout: float = 10.0, retry_after: float = 2.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(503, f"Server busy ({self.name}), please retry", self.retry_after)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(503, f"Server busy ({self.name}), please retry", self.retry_after)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class TokenBucket:
+    """Per-client token buckets: `rate` tokens per second up to `burst`.
+
+    At most `max_clients` buckets are kept; past that, refilled buckets are
+    dropped first and then the least recently used ones.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.rejected = 0
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Consume a token for `key`; returns 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if key in self._buckets:
+            self._buckets.move_to_end(key)
+        elif len(self._buckets) >= self.max_clients:
+            self._prune(now)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        self.rejected += 1
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float) -> None:
+        # Buckets are kept in order of last use; drop the oldest until there is
+        # room, and any refilled ones after that since they carry no state
+        full_after = self.burst / self.rate
+        while self._buckets:
+            _, last = next(iter(self._buckets.values()))
+            if len(self._buckets) < self.max_clients and now - last < full_after:
+                break
+            self._buckets.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "rate_per_minute": self.rate * 60,
+            "burst": self.burst,
+            "tracked_clients": len(self._buckets),
+            "rejected": self.rejected,
+        }
+
+
+def parse_limits(spec: str) -> Dict[str, tuple]:
+    """Parse "upload=2:8,download=8:32" into {"upload": (2, 8), ...}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        limit, _, max_queue = values.partition(":")
+        limits[name.strip()] = (int(limit), int(max_queue or limit))
+    return limits
+
+
+def client_key(scope, trusted_proxies: int = 0) -> str:
+    """The address rate limits are keyed on.
+
+    Clients can put anything in X-Forwarded-For, so it is only read behind
+    `trusted_proxies` proxies, and then only the entry the outermost of
+    them appended: each proxy appends the address it was connected from.
+    """
+    if trusted_proxies > 0:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",")]
+                return hops[-min(trusted_proxies, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying rate limits and per-class concurrency limits.
+
+    `classify(scope)` maps a request to a route class name (or None for
+    cheap requests, which pass straight through). Rejections fail fast with
+    429/503 and a `Retry-After` header instead of queueing unboundedly.
+    """
+
+    def __init__(self, app, limiters: Dict[str, ConcurrencyLimiter],
+                 rate_limits: Dict[str, TokenBucket],
+                 classify: Callable[[dict], Optional[str]], trusted_proxies: int = 0):
+        self.app = app
+        self.limiters = limiters
+        self.rate_limits = rate_limits
+        self.classify = classify
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        bucket = self.rate_limits.get(scope["path"]) if scope["method"] == "POST" else None
+        if bucket is not None:
+            wait = bucket.take(client_key(scope, self.trusted_proxies))
+            if wait:
+                await self._reject(send, AdmissionRejected(429, "Too many requests, please slow down", wait))
+                return
+
+        limiter = self.limiters.get(self.classify(scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as exc:
+            await self._reject(send, exc)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, send, exc: AdmissionRejected) -> None:
+        body = json.dumps({"detail": exc.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": exc.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(exc.retry_after))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class AuditLog:
+    """Write-behind audit trail of admin actions.
+
+    `record()` only appends to a bounded in-memory queue, so auditing adds
+    no database round trip to the request. A background task writes queued
+    events to `audit_log` with `insert_many`, every `flush_interval` seconds
+    or as soon as `batch_size` events are waiting, and `stop()` drains the
+    queue on shutdown. If the database stays unavailable long enough for
+    `max_queue` events to pile up, new events are dropped and counted
+    rather than blocking the admin routes. An event the database can never
+    accept (say, details BSON cannot encode) is dropped and counted too,
+    instead of being retried ahead of everything queued behind it.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: Deque[dict] = deque()
+        self._batch_ready = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    def record(self, actor, action: str, target_type: str, target_id: Optional[str] = None, **details) -> None:
+        """Queue an event; `actor` is the admin User performing `action` on the target."""
+        if len(self._queue) >= self.max_queue:
+            if self.dropped == 0:
+                logger.warning("Audit queue full (%d events), dropping new events", self.max_queue)
+            self.dropped += 1
+            return
+        self._queue.append({
+            "id": str(uuid.uuid4()),
+            "timestamp": datetime.utcnow(),
+            "actor_id": actor.id,
+            "actor_username": actor.username,
+            "action": action,
+            "target_type": target_type,
+            "target_id": target_id,
+            "details": details,
+        })
+        if len(self._queue) >= self.batch_size:
+            self._batch_ready.set()
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def ensure_indexes(self, db) -> None:
+        await db.audit_log.create_index("id", unique=True)
+        await db.audit_log.create_index([("timestamp", -1)])
+        await db.audit_log.create_index([("actor_id", 1), ("timestamp", -1)])
+        await db.audit_log.create_index([("target_type", 1), ("target_id", 1), ("timestamp", -1)])
+
+    async def flush(self, db) -> int:
+        written = 0
+        try:
+            while self._queue:
+                count = min(self.batch_size, len(self._queue))
+                batch = [self._queue.popleft() for _ in range(count)]
+                try:
+                    await db.audit_log.insert_many(batch, ordered=False)
+                except asyncio.CancelledError:
+                    # Put the batch back for the drain in stop(); whatever the
+                    # server did write comes back as duplicates then
+                    self._queue.extendleft(reversed(batch))
+                    raise
+                except BulkWriteError as exc:
+                    # Events written by an earlier attempt that failed midway
+                    # come back as duplicates; retry only the real failures
+                    failed = [
+                        batch[error["index"]] for error in exc.details.get("writeErrors", [])
+                        if error.get("code") != DUPLICATE_KEY
+                    ]
+                    written += count - len(failed)
+                    if not failed:
+                        continue
+                    logger.warning("Failed to write %d audit events, will retry", len(failed))
+                    self._queue.extendleft(reversed(failed))
+                    break
+                except PyMongoError:
+                    logger.exception("Failed to write %d audit events, will retry", count)
+                    self._queue.extendleft(reversed(batch))
+                    break
+                except Exception:
+                    # Not the database: the batch itself cannot be sent
+                    # (bson InvalidDocument), so find the events at fault
+                    batch_written, complete = await self._write_each(db, batch)
+                    written += batch_written
+                    if not complete:
+                        break
+                    continue
+                written += count
+        finally:
+            self.written += written
+        return written
+
+    async def _write_each(self, db, batch) -> Tuple[int, bool]:
+        """Insert `batch` one event at a time, dropping the events that cannot be written.
+
+        Returns the number written and whether the whole batch was handled;
+        on a database error the unwritten rest is requeued.
+        """
+        written = 0
+        for index, event in enumerate(batch):
+            try:
+                await db.audit_log.insert_one(event)
+            except asyncio.CancelledError:
+                self._queue.extendleft(reversed(batch[index:]))
+                raise
+            except DuplicateKeyError:
+                pass
+            except PyMongoError:
+                logger.exception("Failed to write %d audit events, will retry", len(batch) - index)
+                self._queue.extendleft(reversed(batch[index:]))
+                return written, False
+            except Exception:
+                logger.exception("Dropping audit event %s (%s) that cannot be written", event["id"], event["action"])
+                self.dropped += 1
+                continue
+            written += 1
+        return written, True
+
+    async def _run(self, db) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush(db)
+            except Exception:
+                logger.exception("Audit log flush failed")
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self, db) -> None:
+        if self._task is not None:
+            # Let a write in progress finish rather than cancelling it
+            # with its batch already off the queue
+            self._stopping = True
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+        await self.flush(db)
@@ -0,0 +1,197 @@
+import functools
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Helvetica / Helvetica-Bold advance widths (1/1000 em) for printable ASCII,
+# from the standard AFM metrics, used to centre lines on the page
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+FONTS = {
+    "CertRegular": ("Helvetica", _HELVETICA_WIDTHS),
+    "CertBold": ("Helvetica-Bold", _HELVETICA_BOLD_WIDTHS),
+}
+
+# Lines stamped between the logo and the artwork of the house template and
+# below the artwork: (font, size, baseline y, text template)
+LAYOUT = [
+    ("CertBold", 26, 630, "CERTIFICATE OF COMPLETION"),
+    ("CertRegular", 13, 596, "This is to certify that"),
+    ("CertBold", 28, 556, "{full_name}"),
+    ("CertRegular", 13, 520, "has successfully completed the {course} course"),
+    ("CertRegular", 13, 500, "with an average score of {average_score:.1f}%"),
+    ("CertRegular", 12, 276, "Awarded on {issued_on}"),
+    ("CertRegular", 10, 258, "Certificate No. {number}"),
+    ("CertBold", 12, 230, "TWOEM Online Productions"),
+]
+MARGIN = 54
+
+
+class CertificateTemplateError(ValueError):
+    pass
+
+
+def _text_width(text: str, font: str, size: float) -> float:
+    widths = FONTS[font][1]
+    return sum(widths[ord(char) - 32] if 32 <= ord(char) < 127 else 556 for char in text) * size / 1000
+
+
+def _pdf_string(text: str) -> bytes:
+    encoded = text.encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _stream(body: bytes) -> bytes:
+    return b"<</Length %d>>\nstream\n" % len(body) + body + b"\nendstream"
+
+
+class CertificateTemplate:
+    """A one-page PDF that certificates are stamped onto.
+
+    Stamping appends an incremental update to the template: two font
+    objects, a content stream holding the text and a new revision of the
+    page that draws it after the original artwork. The template's own
+    objects are copied byte for byte, so a certificate costs a few string
+    operations and no PDF library. The template needs a classic xref
+    table and an uncompressed page object, as Word and most other
+    exporters write them.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data if data.endswith(b"\n") else data + b"\n"
+        startxrefs = re.findall(rb"startxref\s+(\d+)", data)
+        trailers = re.findall(rb"trailer\s*<<(.*?)>>\s*startxref", data, re.S)
+        if not startxrefs or not trailers:
+            raise CertificateTemplateError("Template has no xref table trailer")
+        self.previous_xref = int(startxrefs[-1])
+        trailer = trailers[-1]
+        self.size = int(self._entry(trailer, rb"/Size\s+(\d+)"))
+        self.trailer_extra = b"".join(
+            match.group(0) for match in re.finditer(rb"/(?:Root|Info)\s+\d+\s+\d+\s+R|/ID\s*\[[^\]]*\]", trailer)
+        )
+        root = int(self._entry(trailer, rb"/Root\s+(\d+)\s+\d+\s+R"))
+        self.page_number, self.page = self._first_page(root)
+        self.page_width, self.page_height = self._media_box()
+
+    @classmethod
+    def load(cls, path: str) -> "CertificateTemplate":
+        with open(path, "rb") as file:
+            return cls(file.read())
+
+    @staticmethod
+    def _entry(dictionary: bytes, pattern: bytes) -> bytes:
+        match = re.search(pattern, dictionary)
+        if match is None:
+            raise CertificateTemplateError(f"Template is missing {pattern.decode()}")
+        return match.group(1)
+
+    def _object(self, number: int) -> bytes:
+        # The last definition wins; earlier ones were replaced by updates
+        matches = list(re.finditer(rb"(?<!\d)%d\s+0\s+obj\s*(.*?)\s*endobj" % number, self.data, re.S))
+        if not matches:
+            raise CertificateTemplateError(f"Object {number} is missing or compressed in the template")
+        return matches[-1].group(1)
+
+    def _first_page(self, root: int) -> Tuple[int, bytes]:
+        number = int(self._entry(self._object(root), rb"/Pages\s+(\d+)\s+\d+\s+R"))
+        node = self._object(number)
+        while re.search(rb"/Type\s*/Pages\b", node):
+            number = int(self._entry(node, rb"/Kids\s*\[\s*(\d+)\s+\d+\s+R"))
+            node = self._object(number)
+        return number, node
+
+    def _media_box(self) -> Tuple[float, float]:
+        box = re.search(rb"/MediaBox\s*\[\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s*\]", self.page)
+        if box is None:
+            return 612.0, 792.0
+        x0, y0, x1, y1 = (float(value) for value in box.groups())
+        return x1 - x0, y1 - y0
+
+    def _content(self, fields: Dict[str, object]) -> bytes:
+        lines = [b"BT", b"0 g"]
+        for font, size, y, text in LAYOUT:
+            text = text.format(**fields)
+            # Shrink long lines (usually names) to fit between the margins
+            size = min(size, size * (self.page_width - 2 * MARGIN) / max(_text_width(text, font, size), 1))
+            x = (self.page_width - _text_width(text, font, size)) / 2
+            lines.append(b"/%s %.2f Tf 1 0 0 1 %.2f %.2f Tm %s Tj" % (
+                font.encode(), size, x, y * self.page_height / 792, _pdf_string(text)))
+        lines.append(b"ET")
+        return b"\n".join(lines)
+
+    def _page_revision(self, prefix: int, content: int, fonts: Dict[str, int]) -> bytes:
+        contents = re.search(rb"/Contents\s*(\[[^\]]*\]|\d+\s+\d+\s+R)", self.page)
+        if contents is None:
+            raise CertificateTemplateError("Template page has no /Contents")
+        original = contents.group(1).strip(b"[]").strip()
+        # Wrapped in q/Q so the template's graphics state cannot leak into the stamp
+        page = (self.page[:contents.start()]
+                + b"/Contents[%d 0 R %s %d 0 R]" % (prefix, original, content)
+                + self.page[contents.end():])
+        font_refs = b"".join(b"/%s %d 0 R" % (name.encode(), number) for name, number in fonts.items())
+        if re.search(rb"/Font\s*<<", page):
+            return re.sub(rb"/Font\s*<<", lambda match: match.group(0) + font_refs, page, count=1)
+        if re.search(rb"/Resources\s*<<", page):
+            return re.sub(rb"/Resources\s*<<", lambda match: match.group(0) + b"/Font<<" + font_refs + b">>",
+                          page, count=1)
+        raise CertificateTemplateError("Template page resources must be inline")
+
+    def render(self, fields: Dict[str, object]) -> bytes:
+        """The template with `fields` (see LAYOUT) stamped onto its page."""
+        fonts = {name: self.size + index for index, name in enumerate(FONTS)}
+        prefix = self.size + len(fonts)
+        content = prefix + 1
+        objects = [
+            (number, b"<</Type/Font/Subtype/Type1/BaseFont/%s/Encoding/WinAnsiEncoding>>" % FONTS[name][0].encode())
+            for name, number in fonts.items()
+        ]
+        objects.append((prefix, _stream(b"q")))
+        objects.append((content, _stream(b"Q\n" + self._content(fields))))
+        objects.append((self.page_number, self._page_revision(prefix, content, fonts)))
+
+        output = bytearray(self.data)
+        offsets = {}
+        for number, body in objects:
+            offsets[number] = len(output)
+            output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+        xref_offset = len(output)
+        output += b"xref\n0 1\n0000000000 65535 f\r\n"
+        for number in sorted(offsets):
+            output += b"%d 1\n%010d 00000 n\r\n" % (number, offsets[number])
+        output += b"trailer\n<</Size %d%s/Prev %d>>\nstartxref\n%d\n%%%%EOF\n" % (
+            content + 1, self.trailer_extra, self.previous_xref, xref_offset)
+        return bytes(output)
+
+
+@functools.lru_cache(maxsize=4)
+def _template(path: str) -> CertificateTemplate:
+    return CertificateTemplate.load(path)
+
+
+def render_certificates(template_path: str, batch: List[Dict[str, object]]) -> List[bytes]:
+    """Render a batch of certificates; runs in the job process pool.
+
+    The parsed template is cached per worker process, so only the field
+    values travel to the worker and only the PDFs come back.
+    """
+    template = _template(template_path)
+    return [template.render(fields) for fields in batch]
+
+
+def certificate_filename(full_name: str, fallback: Optional[str] = None) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", full_name).strip("_")
+    return f"certificate_{slug or fallback or 'student'}.pdf"
@@ -0,0 +1,175 @@
+import gzip
+import zlib
+from typing import Iterable, Optional
+
+import anyio.to_thread
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Types that are already compressed or gain too little to be worth the CPU
+INCOMPRESSIBLE_TYPES = (
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/octet-stream",
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+)
+
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the client's highest-weighted encoding, ties going to `available` order."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return bool(content_type) and not content_type.startswith(INCOMPRESSIBLE_TYPES)
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=brotli_quality)
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            # wbits=31 writes a gzip header and trailer
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with brotli or gzip.
+
+    Responses smaller than `minimum_size`, already encoded, or of a type in
+    INCOMPRESSIBLE_TYPES pass through untouched. Bodies larger than
+    `offload_size` are compressed in a worker thread so a big student list
+    does not stall the event loop.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 offload_size: int = 262144):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.offload_size = offload_size
+        self.encodings = supported_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, send, encoding)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def _compress(self, data: bytes, final: bool) -> bytes:
+        def run():
+            chunk = self.compressor.compress(data)
+            return chunk + self.compressor.finish() if final else chunk
+
+        if len(data) > self.middleware.offload_size:
+            return await anyio.to_thread.run_sync(run)
+        return run()
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            self.passthrough = b"content-encoding" in headers or not is_compressible(content_type)
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] == "http.response.pathsend" and self.compressor is None and not self.passthrough:
+            # The server streams the file itself; it goes out uncompressed
+            self.passthrough = True
+            await self.send(self.start_message)
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = [
+                (name, value) for name, value in self.start_message.get("headers", [])
+                if name.lower() != b"content-length"
+            ]
+            headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+            vary = [value for name, value in headers if name.lower() == b"vary"]
+            if not any(b"accept-encoding" in value.lower() for value in vary):
+                headers.append((b"vary", b"Accept-Encoding"))
+            compressed = await self._compress(body, final=not more_body)
+            if not more_body:
+                headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+            await self.send({**self.start_message, "headers": headers})
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        compressed = await self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+
+def compress_bytes(data: bytes, encoding: str, gzip_level: int = 9, brotli_quality: int = 11) -> bytes:
+    """One-shot compression at build-time settings (slow, smallest output)."""
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCounter:
+    """Write-behind buffer for download counts.
+
+    Downloads only bump an in-memory counter; a background task folds the
+    buffered counts into `downloads.download_count` and the per-day rollups
+    in `download_daily_stats` with one `bulk_write` per collection, and
+    `stop()` lets a write in progress finish before flushing the rest.
+    """
+
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        self._totals: Dict[str, int] = defaultdict(int)
+        self._daily: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def record(self, download_id: str) -> None:
+        self._totals[download_id] += 1
+        self._daily[(download_id, datetime.utcnow().strftime("%Y-%m-%d"))] += 1
+
+    def pending_total(self) -> int:
+        return sum(self._totals.values())
+
+    async def flush(self, db) -> int:
+        # Each buffer is swapped out just before its write, so downloads
+        # recorded during the write land in the next batch instead of being lost
+        totals, self._totals = self._totals, defaultdict(int)
+        written = await self._increment(
+            db.downloads, totals, self._totals,
+            lambda download_id, count: UpdateOne({"id": download_id}, {"$inc": {"download_count": count}}),
+            "download counters"
+        )
+
+        now = datetime.utcnow()
+        daily, self._daily = self._daily, defaultdict(int)
+        await self._increment(
+            db.download_daily_stats, daily, self._daily,
+            lambda key, count: UpdateOne(
+                {"download_id": key[0], "date": key[1]},
+                {"$inc": {"count": count}, "$set": {"updated_at": now}},
+                upsert=True
+            ),
+            "daily download rollups"
+        )
+        return written
+
+    @staticmethod
+    async def _increment(collection, counts: Dict, buffer: Dict, operation, what: str) -> int:
+        """Apply `counts` with one unordered bulk_write; counts not applied go back into `buffer`.
+
+        Returns the sum of the counts that were applied.
+        """
+        if not counts:
+            return 0
+        keys = list(counts)
+        try:
+            await collection.bulk_write([operation(key, counts[key]) for key in keys], ordered=False)
+            failed = []
+        except asyncio.CancelledError:
+            for key in keys:
+                buffer[key] += counts[key]
+            raise
+        except BulkWriteError as exc:
+            # Unordered, so every update without a write error was applied;
+            # re-adding those would count them twice
+            failed = [keys[error["index"]] for error in exc.details.get("writeErrors", [])]
+            logger.exception("Failed to flush %d of %d %s, will retry", len(failed), len(keys), what)
+        except Exception:
+            failed = keys
+            logger.exception("Failed to flush %s, will retry", what)
+        for key in failed:
+            buffer[key] += counts[key]
+        return sum(counts.values()) - sum(counts[key] for key in failed)
+
+    async def _run(self, db) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                # stop() does the final flush
+                return
+            try:
+                await self.flush(db)
+            except Exception:
+                # Keep flushing; a failed write leaves its counts buffered for the next run
+                logger.exception("Download counter flush failed")
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self, db) -> None:
+        if self._task is not None:
+            # Let a write in progress finish rather than cancelling it with
+            # its counts already swapped out of the buffers
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush(db)
@@ -0,0 +1,121 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+from trusted_models import _nested_model
+
+
+def _collapse(paths: Iterable[str]) -> list:
+    """Unique paths, dropping subfields of fields that are selected whole.
+
+    Mongo rejects projections naming both `finance_record` and
+    `finance_record.balance`.
+    """
+    paths = list(dict.fromkeys(paths))
+    whole = set(paths)
+    return [path for path in paths if "." not in path or path.partition(".")[0] not in whole]
+
+
+def _default(model: Type[BaseModel], name: str):
+    field = model.model_fields[name]
+    return None if field.is_required() else field.get_default(call_default_factory=True)
+
+
+class FieldSelection:
+    """Fields of a response model picked with `fields=`.
+
+    Paths are top-level fields or `field.subfield` for nested models.
+    `projection` covers the requested stored fields plus whatever the
+    requested computed fields are derived from, so the rest never leaves
+    the database.
+    """
+
+    def __init__(self, selector: "FieldSelector", paths: Tuple[str, ...], projection: Dict[str, int]):
+        self.selector = selector
+        self.paths = paths
+        self.names = frozenset(path.partition(".")[0] for path in paths)
+        self.projection = projection
+
+    def wants(self, *names: str) -> bool:
+        return any(name in self.names for name in names)
+
+    def shape(self, document: dict, **computed) -> dict:
+        """The requested fields of a projected document, as the response model renders them.
+
+        Computed fields come from `computed` when given there, otherwise
+        from the selector's derivation. Fields missing from the document
+        get the model's defaults.
+        """
+        model, compute, nested_models = self.selector.model, self.selector.compute, self.selector.nested
+        row = {}
+        for path in self.paths:
+            name, _, subfield = path.partition(".")
+            if name in computed:
+                row[name] = computed[name]
+                continue
+            if name in compute:
+                row[name] = compute[name](document)
+                continue
+            value = document.get(name, _default(model, name))
+            nested = nested_models.get(name)
+            if nested is None or not isinstance(value, dict):
+                row[name] = value
+            elif subfield:
+                row.setdefault(name, {})[subfield] = value.get(subfield, _default(nested, subfield))
+            else:
+                row[name] = {key: value.get(key, _default(nested, key)) for key in nested.model_fields}
+        return row
+
+
+class FieldSelector:
+    """FastAPI dependency parsing `fields=` against a response model.
+
+    `derived` maps computed response fields to the stored paths they are
+    computed from and a function computing them from a projected document,
+    or None when the endpoint passes the value to `shape` itself. Without
+    `fields` the dependency returns None and the endpoint responds with the
+    full model.
+    """
+
+    def __init__(self, model: Type[BaseModel],
+                 derived: Optional[Dict[str, Tuple[Iterable[str], Optional[Callable[[dict], Any]]]]] = None):
+        self.model = model
+        self.derived = {name: tuple(paths) for name, (paths, _) in (derived or {}).items()}
+        self.compute = {name: function for name, (_, function) in (derived or {}).items() if function}
+        self.nested: Dict[str, Type[BaseModel]] = {}
+        for name, field in model.model_fields.items():
+            nested = _nested_model(field.annotation)
+            if nested is not None and not nested[1]:
+                self.nested[name] = nested[0]
+
+    def __call__(self, fields: Optional[str] = Query(
+            None, description="Comma-separated fields to return, e.g. full_name,finance_record.balance")
+    ) -> Optional[FieldSelection]:
+        if fields is None:
+            return None
+        return self.parse(fields)
+
+    def parse(self, fields: str) -> FieldSelection:
+        paths = []
+        for path in (part.strip() for part in fields.split(",")):
+            if not path:
+                continue
+            self._validate(path)
+            paths.append(path)
+        if not paths:
+            raise HTTPException(status_code=400, detail="fields must name at least one field")
+
+        paths = _collapse(paths)
+        stored = []
+        for path in paths:
+            stored.extend(self.derived.get(path.partition(".")[0], (path,)))
+        projection = {"_id": 0}
+        projection.update((path, 1) for path in _collapse(stored))
+        return FieldSelection(self, tuple(paths), projection)
+
+    def _validate(self, path: str) -> None:
+        name, _, subfield = path.partition(".")
+        if name not in self.model.model_fields or (
+                subfield and (name not in self.nested or subfield not in self.nested[name].model_fields)):
+            raise HTTPException(status_code=400, detail=f"Unknown field '{path}'")
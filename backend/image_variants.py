@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+import anyio.to_thread
+from PIL import Image, ImageOps
+
+from metrics import registry
+
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# format name -> (Pillow format, media type, file extension)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "png": ("PNG", "image/png", "png"),
+}
+
+
+class ImageVariantCache:
+    """Resized image variants generated with Pillow and cached on disk.
+
+    Requested widths snap up to the nearest entry of `widths`, so a srcset
+    maps onto a bounded set of files. Variants are keyed by the source's
+    mtime, so replacing an image produces new variants and the old ones age
+    out, and by a hash of its resolved path, so sources sharing a stem
+    (logo.jpg and logo.png) never share variants. Once the cache holds more
+    than `max_bytes`, the least recently served variants are dropped from
+    the index. Their files are deleted `unlink_grace` seconds later, on a
+    later eviction pass, so a response that was already given the path can
+    still open it. Recency is tracked in memory and seeded from file mtimes
+    by `load()`.
+    """
+
+    def __init__(self, source_dirs: Iterable[Path], cache_dir: Path, max_bytes: int = 256 * 1024 * 1024,
+                 widths=(320, 480, 640, 960, 1280, 1920), quality: int = 80, unlink_grace: float = 30.0):
+        self.source_dirs = [Path(directory) for directory in source_dirs]
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self.unlink_grace = unlink_grace
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._renders: Dict[str, asyncio.Lock] = {}
+        # (evicted at, key) of files still on disk, oldest first
+        self._evicted: Deque[Tuple[float, str]] = deque()
+        self.stats = registry.cache("image_variants", lambda: len(self.entries))
+
+    def load(self) -> None:
+        """Index variants left on disk by a previous run, oldest first."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.is_file() and not entry.name.startswith(".")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            for entry in files:
+                size = entry.stat().st_size
+                self.entries[entry.name] = size
+                self.total_bytes += size
+        self._evict()
+
+    def source(self, filename: str) -> Optional[Path]:
+        if os.path.basename(filename) != filename or not filename.lower().endswith(SOURCE_EXTENSIONS):
+            return None
+        for directory in self.source_dirs:
+            path = directory / filename
+            if path.is_file():
+                return path
+        return None
+
+    def snap_width(self, width: int) -> int:
+        for allowed in self.widths:
+            if allowed >= width:
+                return allowed
+        return self.widths[-1]
+
+    @staticmethod
+    def negotiate_format(requested: str, accept: str, source: Path) -> str:
+        if requested != "auto":
+            return requested
+        if "image/webp" in accept:
+            return "webp"
+        return "png" if source.suffix.lower() == ".png" else "jpeg"
+
+    async def variant(self, source: Path, width: int, image_format: str) -> Path:
+        """Path of `source` resized to `width` in `image_format`, rendering it if needed."""
+        extension = FORMATS[image_format][2]
+        source_id = hashlib.sha1(str(source.resolve()).encode()).hexdigest()[:12]
+        key = f"{source.stem}-{source_id}-{source.stat().st_mtime_ns:x}-w{width}-q{self.quality}.{extension}"
+        path = self.cache_dir / key
+        if self._touch(key):
+            self.stats.hit()
+            return path
+
+        # Concurrent requests for the same variant wait for one render
+        render_lock = self._renders.setdefault(key, asyncio.Lock())
+        try:
+            async with render_lock:
+                if self._touch(key):
+                    self.stats.hit()
+                    return path
+                self.stats.miss()
+                size = await anyio.to_thread.run_sync(self._render, source, path, width, image_format)
+                with self._lock:
+                    self.entries[key] = size
+                    self.total_bytes += size
+        finally:
+            self._renders.pop(key, None)
+        self._evict()
+        return path
+
+    def _touch(self, key: str) -> bool:
+        with self._lock:
+            if key not in self.entries:
+                return False
+            self.entries.move_to_end(key)
+            return True
+
+    def _render(self, source: Path, target: Path, width: int, image_format: str) -> int:
+        pillow_format = FORMATS[image_format][0]
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write under a temporary name so readers never see a partial file
+            partial = target.with_name(f".{target.name}.{threading.get_ident()}")
+            image.save(partial, pillow_format, quality=self.quality, optimize=True)
+        os.replace(partial, target)
+        return target.stat().st_size
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            # Never evict the variant that was just rendered
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                self._evicted.append((now, key))
+            while self._evicted and now - self._evicted[0][0] >= self.unlink_grace:
+                _, key = self._evicted.popleft()
+                # Requested again since and rendered anew under the same name
+                if key not in self.entries and key not in self._renders:
+                    expired.append(key)
+        for key in expired:
+            try:
+                (self.cache_dir / key).unlink()
+            except FileNotFoundError:
+                pass
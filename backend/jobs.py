@@ -0,0 +1,256 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import anyio.to_thread
+
+logger = logging.getLogger(__name__)
+
+# Job states; "queued" and "running" jobs are resumed after a restart
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+
+JobHandler = Callable[["JobContext"], Awaitable[Optional[dict]]]
+
+
+class UnknownJobKind(ValueError):
+    pass
+
+
+class JobContext:
+    """What a running job handler gets: its params, progress reporting and executors."""
+
+    def __init__(self, runner: "JobRunner", job: dict):
+        self.runner = runner
+        self.job_id = job["id"]
+        self.params = job.get("params") or {}
+        self.attempt = job["attempts"]
+        self.submitted_by = job.get("submitted_by")
+        self._progress = {"done": 0, "total": None, "message": None}
+        self._last_write = 0.0
+
+    async def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """Report progress; writes are throttled to one per `progress_interval`."""
+        self._progress = {
+            "done": done,
+            "total": total if total is not None else self._progress["total"],
+            "message": message if message is not None else self._progress["message"],
+        }
+        now = time.monotonic()
+        if now - self._last_write >= self.runner.progress_interval:
+            self._last_write = now
+            await self.runner.db.jobs.update_one({"id": self.job_id}, {"$set": {"progress": self._progress}})
+
+    async def run_in_thread(self, function: Callable, *args) -> Any:
+        """Run blocking I/O or GIL-releasing work in the worker thread pool."""
+        return await anyio.to_thread.run_sync(functools.partial(function, *args))
+
+    async def run_in_process(self, function: Callable, *args) -> Any:
+        """Run CPU-bound work in the process pool.
+
+        Workers start fresh rather than forking the server: `function` is
+        imported by name in the worker (keep it out of server.py so workers
+        do not build the whole app), args must be picklable, and a script
+        driving the app must guard its entry point with `__name__ == "__main__"`.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.runner.process_pool(), functools.partial(function, *args))
+
+
+class JobRunner:
+    """Runs long admin operations in the background, persisted in `jobs`.
+
+    Handlers are registered per job kind and run on `concurrency` asyncio
+    workers, so heavy work never holds a request open. Each job document
+    carries its status, progress, result and last error, which is what the
+    admin UI polls. A failing job is retried with exponential backoff up to
+    `max_attempts`; cancelling a running job cancels its task, which stops
+    it at its next await. Jobs still queued or running at shutdown are put
+    back in the queue and resumed on the next start.
+    """
+
+    def __init__(self, concurrency: int = 2, max_attempts: int = 3, retry_delay: float = 5.0,
+                 process_workers: Optional[int] = None, progress_interval: float = 0.5):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.process_workers = process_workers or os.cpu_count() or 1
+        self.progress_interval = progress_interval
+        self.handlers: Dict[str, JobHandler] = {}
+        self.db = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelling: Set[str] = set()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def handler(self, kind: str):
+        def register(function: JobHandler) -> JobHandler:
+            self.handlers[kind] = function
+            return function
+        return register
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # Forking a process that runs the event loop, the anyio thread
+            # pool and the log pipeline's writer thread can copy a lock held
+            # mid-call into the child; start workers from a clean process
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers, mp_context=multiprocessing.get_context(start_method))
+        return self._process_pool
+
+    def active(self) -> int:
+        return len(self._running)
+
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, kind: str, params: Optional[dict] = None, submitted_by: Optional[str] = None) -> dict:
+        if kind not in self.handlers:
+            raise UnknownJobKind(kind)
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "params": params or {},
+            "status": QUEUED,
+            "progress": {"done": 0, "total": None, "message": None},
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "submitted_by": submitted_by,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.db.jobs.insert_one(job)
+        job.pop("_id", None)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it already finished."""
+        result = await self.db.jobs.update_one(
+            {"id": job_id, "status": QUEUED},
+            {"$set": {"status": CANCELLED, "finished_at": datetime.utcnow()}}
+        )
+        if result.matched_count:
+            return True
+        task = self._running.get(job_id)
+        if task is None:
+            return False
+        self._cancelling.add(job_id)
+        task.cancel()
+        return True
+
+    async def retry(self, job_id: str) -> bool:
+        """Queue a failed or cancelled job again with a fresh set of attempts."""
+        result = await self.db.jobs.update_one(
+            {"id": job_id, "status": {"$in": [FAILED, CANCELLED]}},
+            {"$set": {"status": QUEUED, "attempts": 0, "error": None, "finished_at": None}}
+        )
+        if not result.matched_count:
+            return False
+        self._queue.put_nowait(job_id)
+        return True
+
+    async def _claim(self, job_id: str) -> Optional[dict]:
+        # Only a queued job can start; one cancelled while waiting is skipped
+        result = await self.db.jobs.update_one(
+            {"id": job_id, "status": QUEUED},
+            {"$set": {"status": RUNNING, "started_at": datetime.utcnow()}, "$inc": {"attempts": 1}}
+        )
+        if not result.matched_count:
+            return None
+        return await self.db.jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def _finish(self, job_id: str, **fields) -> None:
+        await self.db.jobs.update_one({"id": job_id}, {"$set": fields})
+
+    async def _execute(self, job: dict) -> None:
+        job_id = job["id"]
+        context = JobContext(self, job)
+        task = asyncio.create_task(self.handlers[job["kind"]](context))
+        self._running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancelling:
+                # Shutting down: resume on the next start without using up an attempt
+                await self.db.jobs.update_one(
+                    {"id": job_id},
+                    {"$set": {"status": QUEUED, "progress": context._progress}, "$inc": {"attempts": -1}}
+                )
+                raise
+            await self._finish(job_id, status=CANCELLED, progress=context._progress,
+                               finished_at=datetime.utcnow())
+        except Exception as exc:
+            error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            if job["attempts"] < job.get("max_attempts", self.max_attempts):
+                delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+                logger.warning("Job %s (%s) failed, retrying in %.0fs: %s", job_id, job["kind"], delay, error)
+                await self._finish(job_id, status=QUEUED, error=error, progress=context._progress)
+                asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job_id)
+            else:
+                logger.exception("Job %s (%s) failed", job_id, job["kind"])
+                await self._finish(job_id, status=FAILED, error=error, progress=context._progress,
+                                   finished_at=datetime.utcnow())
+        else:
+            progress = context._progress
+            if progress["total"] is not None:
+                progress["done"] = progress["total"]
+            await self._finish(job_id, status=SUCCEEDED, result=result, error=None, progress=progress,
+                               finished_at=datetime.utcnow())
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelling.discard(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self._claim(job_id)
+                if job is None:
+                    continue
+                if job["kind"] not in self.handlers:
+                    await self._finish(job_id, status=FAILED, error=f"Unknown job kind {job['kind']!r}",
+                                       finished_at=datetime.utcnow())
+                    continue
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker failed on %s", job_id)
+
+    async def start(self, db) -> None:
+        if self._workers:
+            return
+        self.db = db
+        self._queue = asyncio.Queue()
+        await db.jobs.create_index("id", unique=True)
+        await db.jobs.create_index([("status", 1), ("created_at", 1)])
+        # Pick up jobs left queued or running by the previous process
+        pending = await db.jobs.find(
+            {"status": {"$in": [QUEUED, RUNNING]}}, {"_id": 0, "id": 1}
+        ).sort("created_at", 1).to_list(None)
+        await db.jobs.update_many({"status": RUNNING}, {"$set": {"status": QUEUED}})
+        for job in pending:
+            self._queue.put_nowait(job["id"])
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
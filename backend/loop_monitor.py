@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Optional
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "Delay between when the loop monitor was due and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Offender:
+    __slots__ = ("location", "stack", "count", "total_ms", "max_ms", "last_seen")
+
+    def __init__(self, location: str, stack: list):
+        self.location = location
+        self.stack = stack
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen = None
+
+    def to_dict(self) -> dict:
+        return {
+            "location": self.location,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "last_seen": self.last_seen,
+            "stack": self.stack,
+        }
+
+
+class LoopMonitor:
+    """Measures event-loop lag and, in debug mode, catches blocking callbacks.
+
+    A task sleeps `interval` seconds in a loop and records how late it wakes
+    up. In debug mode a watchdog thread also notices when that task has not
+    run for longer than `block_threshold` and samples the loop thread's stack
+    while it is still blocked; samples are grouped by the innermost frame in
+    the application code.
+    """
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.1, debug: bool = False,
+                 app_root: Optional[str] = None, max_samples: int = 1200, max_offenders: int = 100):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self.app_root = app_root
+        self.max_offenders = max_offenders
+        self.samples = deque(maxlen=max_samples)
+        self.offenders: Dict[str, Offender] = {}
+        self._heartbeat = time.monotonic()
+        self._stalled: Optional[Offender] = None
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        registry.gauge(
+            "event_loop_lag_quantile_seconds", "Recent event-loop lag percentiles",
+            lambda: {(str(q),): value for q, value in self.percentiles().items()}, ["quantile"])
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._heartbeat = time.monotonic()
+            self.samples.append(lag)
+            event_loop_lag_seconds.observe(value=lag)
+            with self._lock:
+                stalled, self._stalled = self._stalled, None
+            if stalled is not None:
+                # The watchdog sampled the stack mid-stall; the lag is its length
+                stalled.total_ms += lag * 1000
+                stalled.max_ms = max(stalled.max_ms, lag * 1000)
+                logger.warning("Event loop blocked for %.1fms at %s", lag * 1000, stalled.location)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.block_threshold / 2):
+            overdue = time.monotonic() - self._heartbeat - self.interval
+            if overdue < self.block_threshold or self._stalled is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._record_stall(traceback.extract_stack(frame))
+
+    def _record_stall(self, stack) -> None:
+        # Blame the innermost frame in our own code rather than the library
+        # call (bcrypt, base64, file I/O) it was stuck in.
+        blamed = stack[-1]
+        if self.app_root:
+            for frame in reversed(stack):
+                if frame.filename.startswith(self.app_root) and "site-packages" not in frame.filename:
+                    blamed = frame
+                    break
+        location = f"{os.path.basename(blamed.filename)}:{blamed.lineno} in {blamed.name}"
+        with self._lock:
+            offender = self.offenders.get(location)
+            if offender is None:
+                if len(self.offenders) >= self.max_offenders:
+                    least = min(self.offenders, key=lambda key: self.offenders[key].total_ms)
+                    del self.offenders[least]
+                formatted = [f"{frame.filename}:{frame.lineno} in {frame.name}" for frame in stack[-15:]]
+                offender = self.offenders[location] = Offender(location, formatted)
+            offender.count += 1
+            offender.last_seen = time.time()
+            self._stalled = offender
+
+    def percentiles(self) -> dict:
+        values = sorted(self.samples)
+        return {
+            0.5: percentile(values, 0.5),
+            0.95: percentile(values, 0.95),
+            0.99: percentile(values, 0.99),
+            1.0: values[-1] if values else 0.0,
+        }
+
+    def worst_offenders(self, limit: int = 20) -> list:
+        with self._lock:
+            offenders = sorted(self.offenders.values(), key=lambda offender: offender.total_ms, reverse=True)
+            return [offender.to_dict() for offender in offenders[:limit]]
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._measure())
+        if self.debug:
+            self._loop_thread_id = threading.get_ident()
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from metrics import SIZE_BUCKETS, registry, route_template
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+request_peak_allocation_bytes = registry.histogram(
+    "http_request_peak_allocation_bytes",
+    "Peak traced allocation above the starting point during upload/download requests",
+    ["route"], buckets=SIZE_BUCKETS + (67108864, 268435456))
+
+
+def resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return peak_resident_memory_bytes()
+
+
+def peak_resident_memory_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryProfiler:
+    """Opt-in memory instrumentation built on tracemalloc.
+
+    RSS and heap gauges are always available; snapshots, snapshot diffs and
+    per-request peak allocation need tracemalloc, which `start()` enables
+    only when profiling is switched on because it slows allocation down.
+    """
+
+    def __init__(self, enabled: bool = False, frames: int = 1, sample_interval: float = 30.0,
+                 max_snapshots: int = 5, app_root: Optional[str] = None):
+        self.enabled = enabled
+        self.frames = frames
+        self.sample_interval = sample_interval
+        self.max_snapshots = max_snapshots
+        self.app_root = app_root
+        self.history = deque(maxlen=120)
+        self.snapshots: "OrderedDict[str, tuple]" = OrderedDict()
+        self.request_peaks: Dict[str, dict] = {}
+        self._task = None
+        self._lock = threading.Lock()
+        registry.gauge("process_resident_memory_bytes", "Resident set size", resident_memory_bytes)
+        registry.gauge("process_peak_resident_memory_bytes", "Peak resident set size",
+                       peak_resident_memory_bytes)
+        registry.gauge("python_allocated_blocks", "Memory blocks allocated by the interpreter",
+                       sys.getallocatedblocks)
+        registry.gauge("tracemalloc_traced_bytes", "Memory traced by tracemalloc",
+                       lambda: tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0)
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def sample(self) -> dict:
+        return {
+            "timestamp": datetime.utcnow(),
+            "rss_bytes": resident_memory_bytes(),
+            "allocated_blocks": sys.getallocatedblocks(),
+            "traced_bytes": tracemalloc.get_traced_memory()[0] if self.tracing else None,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            self.history.append(self.sample())
+            await asyncio.sleep(self.sample_interval)
+
+    def start(self) -> None:
+        if self.enabled and not self.tracing:
+            tracemalloc.start(self.frames)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.tracing:
+            tracemalloc.stop()
+
+    def take_snapshot(self) -> str:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        snapshot_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self.snapshots[snapshot_id] = (datetime.utcnow(), snapshot)
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return snapshot_id
+
+    def snapshot_list(self) -> list:
+        with self._lock:
+            return [
+                {
+                    "id": snapshot_id,
+                    "taken_at": taken_at,
+                    "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+                }
+                for snapshot_id, (taken_at, snapshot) in self.snapshots.items()
+            ]
+
+    def _snapshot(self, snapshot_id: str):
+        with self._lock:
+            entry = self.snapshots.get(snapshot_id)
+        return entry[1] if entry else None
+
+    def _app_frame(self, traceback):
+        # Frames run oldest to newest; the innermost one in our own code is
+        # the line that asked base64, pydantic etc. for the memory
+        for frame in reversed(traceback):
+            if frame.filename.startswith(self.app_root) and "site-packages" not in frame.filename:
+                return frame
+        return None
+
+    def diff(self, base_id: str, target_id: str, limit: int = 25, app_only: bool = True) -> Optional[list]:
+        """Compare two snapshots by file:line, largest growth first.
+
+        With `app_only`, allocations made inside libraries are charged to
+        the innermost application line on their stack (which needs
+        MEMORY_PROFILING_FRAMES > 1 to be visible); stacks that never enter
+        application code are left out.
+        """
+        base, target = self._snapshot(base_id), self._snapshot(target_id)
+        if base is None or target is None:
+            return None
+        grouped: Dict[tuple, dict] = {}
+        for stat in target.compare_to(base, "traceback"):
+            frame = stat.traceback[-1]
+            if app_only and self.app_root:
+                frame = self._app_frame(stat.traceback)
+                if frame is None:
+                    continue
+            entry = grouped.get((frame.filename, frame.lineno))
+            if entry is None:
+                entry = grouped[(frame.filename, frame.lineno)] = {
+                    "location": f"{os.path.relpath(frame.filename, self.app_root or '.')}:{frame.lineno}",
+                    "size_bytes": 0,
+                    "size_diff_bytes": 0,
+                    "count": 0,
+                    "count_diff": 0,
+                }
+            entry["size_bytes"] += stat.size
+            entry["size_diff_bytes"] += stat.size_diff
+            entry["count"] += stat.count
+            entry["count_diff"] += stat.count_diff
+        ranked = sorted(grouped.values(), key=lambda entry: (abs(entry["size_diff_bytes"]), entry["size_bytes"]),
+                        reverse=True)
+        return ranked[:limit]
+
+    def record_peak(self, route: str, peak_bytes: int) -> None:
+        request_peak_allocation_bytes.observe(route, value=peak_bytes)
+        with self._lock:
+            stats = self.request_peaks.setdefault(route, {"requests": 0, "total_bytes": 0, "max_bytes": 0})
+            stats["requests"] += 1
+            stats["total_bytes"] += peak_bytes
+            stats["max_bytes"] = max(stats["max_bytes"], peak_bytes)
+
+    def peak_summary(self) -> list:
+        with self._lock:
+            return sorted(
+                (
+                    {
+                        "route": route,
+                        "requests": stats["requests"],
+                        "avg_peak_bytes": stats["total_bytes"] // stats["requests"],
+                        "max_peak_bytes": stats["max_bytes"],
+                    }
+                    for route, stats in self.request_peaks.items()
+                ),
+                key=lambda item: item["max_peak_bytes"],
+                reverse=True,
+            )
+
+
+class PeakAllocationMiddleware:
+    """ASGI middleware recording peak traced allocation for selected routes.
+
+    tracemalloc keeps a single process-wide peak, and each request resets
+    it when it starts, so overlapping requests can both include and erase
+    each other's allocations. The figures are approximate; compare them
+    across runs with one request in flight at a time.
+    """
+
+    def __init__(self, app, profiler: MemoryProfiler, classify: Callable[[dict], Optional[str]],
+                 route_classes=("upload", "download")):
+        self.app = app
+        self.profiler = profiler
+        self.classify = classify
+        self.route_classes = set(route_classes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.profiler.tracing
+            or self.classify(scope) not in self.route_classes
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self.profiler.record_peak(route_template(scope), max(0, peak - start))
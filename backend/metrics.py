@@ -0,0 +1,287 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Latency buckets in seconds and payload buckets in bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+THROUGHPUT_BUCKETS = (65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Transfers smaller than this finish too quickly for a meaningful rate
+MIN_THROUGHPUT_BYTES = 65536
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Command listeners and thread-pool work update metrics off the loop
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = self.header()
+        with self._lock:
+            samples = sorted(self._values.items())
+        for labels, value in samples:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are computed at scrape time.
+
+    `callback` returns either a single number or a mapping of label value
+    tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, callback: Callable, labelnames=(), kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> list:
+        lines = self.header()
+        samples = self.callback()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, *labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), then sum, then count
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = self.header()
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class CacheStats:
+    """Hit/miss counters for an in-process cache, reported by the registry."""
+
+    def __init__(self, name: str, size: Callable[[], int] = lambda: 0):
+        self.name = name
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self) -> None:
+        self.hits += 1
+
+    def miss(self) -> None:
+        self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self.caches: Dict[str, CacheStats] = {}
+        self._register(CallbackGauge(
+            "cache_hits_total", "Cache hits by cache",
+            lambda: {(name,): cache.hits for name, cache in self.caches.items()}, ["cache"], kind="counter"))
+        self._register(CallbackGauge(
+            "cache_misses_total", "Cache misses by cache",
+            lambda: {(name,): cache.misses for name, cache in self.caches.items()}, ["cache"], kind="counter"))
+        self.gauge("cache_hit_ratio", "Cache hit ratio by cache",
+                   lambda: {(name,): cache.hit_ratio for name, cache in self.caches.items()}, ["cache"])
+        self.gauge("cache_entries", "Entries held by cache",
+                   lambda: {(name,): cache.size() for name, cache in self.caches.items()}, ["cache"])
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, callback: Optional[Callable] = None, labelnames=()):
+        if callback is None:
+            return self._register(Gauge(name, help, labelnames))
+        return self._register(CallbackGauge(name, help, callback, labelnames))
+
+    def cache(self, name: str, size: Callable[[], int] = lambda: 0) -> CacheStats:
+        stats = self.caches[name] = CacheStats(name, size)
+        return stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"])
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"])
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served")
+http_request_size_bytes = registry.histogram(
+    "http_request_size_bytes", "HTTP request body size by route template",
+    ["method", "route"], SIZE_BUCKETS)
+http_response_size_bytes = registry.histogram(
+    "http_response_size_bytes", "HTTP response body size by route template",
+    ["method", "route"], SIZE_BUCKETS)
+http_transfer_bytes_total = registry.counter(
+    "http_transfer_bytes_total", "Bytes moved by upload and download routes",
+    ["direction", "route"])
+http_transfer_throughput = registry.histogram(
+    "http_transfer_throughput_bytes_per_second", "Upload and download throughput",
+    ["direction", "route"], THROUGHPUT_BUCKETS)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return route.path if route is not None else "<unmatched>"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics.
+
+    Routes are labelled by their template (`/api/admin/students/{student_id}`)
+    so label cardinality stays bounded. `classify(scope)` picks out upload
+    and download routes for the throughput metrics.
+    """
+
+    def __init__(self, app, classify: Optional[Callable[[dict], Optional[str]]] = None,
+                 skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.classify = classify or (lambda scope: None)
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        request_bytes = 0
+        response_bytes = 0
+        declared_length = 0
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, response_bytes, declared_length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-length":
+                        declared_length = int(value)
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                # The server sends the file itself; trust the declared length
+                response_bytes += declared_length
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            http_requests_in_flight.dec()
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            route = route_template(scope)
+            http_requests_total.inc(method, route, str(status))
+            http_request_duration_seconds.observe(method, route, value=elapsed)
+            http_request_size_bytes.observe(method, route, value=request_bytes)
+            http_response_size_bytes.observe(method, route, value=response_bytes)
+
+            route_class = self.classify(scope)
+            if route_class in ("upload", "download"):
+                direction = route_class
+                transferred = request_bytes if direction == "upload" else response_bytes
+                http_transfer_bytes_total.inc(direction, route, amount=transferred)
+                if transferred >= MIN_THROUGHPUT_BYTES and elapsed > 0:
+                    http_transfer_throughput.observe(direction, route, value=transferred / elapsed)
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+from metrics import registry
+
+mongo_pool_wait_seconds = registry.histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check a connection out of the pool",
+    ["address"])
+mongo_pool_checkout_failures_total = registry.counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts that failed, by reason",
+    ["address", "reason"])
+mongo_pool_cleared_total = registry.counter(
+    "mongo_pool_cleared_total", "Times a server's pool was cleared (failover, network errors)",
+    ["address"])
+
+
+async def warm_pool(database, connections: int) -> None:
+    """Open connections before the first request needs them.
+
+    Motor connects lazily, so after a cold start the first request would
+    pay for server discovery and the TCP/TLS/auth handshakes. Concurrent
+    pings make the pool open up to `connections` of them in parallel.
+    """
+    await asyncio.gather(*(database.ping() for _ in range(max(connections, 1))))
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool metrics per server, from PyMongo's pool events.
+
+    PyMongo 4.5 events carry no checkout duration, so the wait is timed
+    from the "checkout started" event to the matching "checked out" or
+    "failed" one. Both fire on the thread running the operation (Motor's
+    executor threads), so the start times are kept per thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open: Dict[str, int] = defaultdict(int)
+        self.in_use: Dict[str, int] = defaultdict(int)
+        self.waiting: Dict[str, int] = defaultdict(int)
+
+    def snapshot(self) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            stats = {}
+            for state, counts in (("open", self.open), ("in_use", self.in_use), ("waiting", self.waiting)):
+                for address, count in counts.items():
+                    stats[(address, state)] = count
+            return stats
+
+    def _started(self) -> dict:
+        started = getattr(self._local, "started", None)
+        if started is None:
+            started = self._local.started = {}
+        return started
+
+    def _finish_wait(self, event) -> None:
+        address = _address(event)
+        started = self._started().pop(address, None)
+        with self._lock:
+            self.waiting[address] = max(self.waiting[address] - 1, 0)
+        if started is not None:
+            mongo_pool_wait_seconds.observe(address, value=time.perf_counter() - started)
+
+    def connection_check_out_started(self, event):
+        address = _address(event)
+        self._started()[address] = time.perf_counter()
+        with self._lock:
+            self.waiting[address] += 1
+
+    def connection_checked_out(self, event):
+        self._finish_wait(event)
+        with self._lock:
+            self.in_use[_address(event)] += 1
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait(event)
+        mongo_pool_checkout_failures_total.inc(_address(event), event.reason)
+
+    def connection_checked_in(self, event):
+        address = _address(event)
+        with self._lock:
+            self.in_use[address] = max(self.in_use[address] - 1, 0)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open[_address(event)] += 1
+
+    def connection_closed(self, event):
+        address = _address(event)
+        with self._lock:
+            self.open[address] = max(self.open[address] - 1, 0)
+
+    def pool_cleared(self, event):
+        mongo_pool_cleared_total.inc(_address(event))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = _address(event)
+        with self._lock:
+            for counts in (self.open, self.in_use, self.waiting):
+                counts.pop(address, None)
+
+    def connection_ready(self, event):
+        pass
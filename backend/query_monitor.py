@@ -0,0 +1,247 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+from metrics import registry
+from request_context import RequestContext, get_request_context
+from tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+# Commands that carry a collection name and correspond to application queries
+MONITORED_COMMANDS = {
+    "find", "getMore", "insert", "update", "delete", "aggregate",
+    "count", "distinct", "findAndModify", "createIndexes",
+}
+
+mongo_command_duration_seconds = registry.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency",
+    ["collection", "command"])
+mongo_slow_commands_total = registry.counter(
+    "mongo_slow_commands_total", "MongoDB commands over the slow-query threshold",
+    ["collection", "command"])
+mongo_queries_per_request = registry.histogram(
+    "mongo_queries_per_request", "MongoDB commands issued per HTTP request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000))
+
+
+def query_shape(value):
+    """Replace literal values in a filter with placeholders, keeping operators."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # Operator lists like $or/$and hold sub-filters; value lists collapse
+        shapes = [query_shape(item) for item in value if isinstance(item, dict)]
+        return shapes if shapes else "?"
+    return "?"
+
+
+def _command_filter(command_name: str, command) -> Optional[dict]:
+    if command_name == "find":
+        return command.get("filter", {})
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return statements[0].get("q", {})
+    if command_name in ("count", "distinct", "findAndModify"):
+        return command.get("query", {})
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        return pipeline[0].get("$match", {})
+    return None
+
+
+def _returned_documents(command_name: str, reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") is not None else 0
+    return int(reply.get("n", 0))
+
+
+class ShapeStats:
+    __slots__ = ("collection", "command", "shape", "sample_filter", "count", "total_ms",
+                 "max_ms", "documents", "routes", "last_seen")
+
+    def __init__(self, collection, command, shape, sample_filter):
+        self.collection = collection
+        self.command = command
+        self.shape = shape
+        self.sample_filter = sample_filter
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.documents = 0
+        self.routes: Dict[str, int] = {}
+        self.last_seen = None
+
+    def to_dict(self) -> dict:
+        return {
+            "collection": self.collection,
+            "command": self.command,
+            "filter_shape": self.shape,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "documents_returned": self.documents,
+            "routes": dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+            "last_seen": self.last_seen,
+        }
+
+
+class RouteStats:
+    __slots__ = ("requests", "queries", "max_queries", "query_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.query_ms = 0.0
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """pymongo command listener recording per-command and per-route statistics.
+
+    Commands are grouped by collection, command name and filter shape; any
+    command slower than `slow_ms` is logged with its shape and route.
+    """
+
+    def __init__(self, slow_ms: float = 100.0, max_shapes: int = 500):
+        self.slow_ms = slow_ms
+        self.max_shapes = max_shapes
+        self.shapes: Dict[tuple, ShapeStats] = {}
+        self.routes: Dict[str, RouteStats] = {}
+        self._inflight: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in MONITORED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        command_filter = _command_filter(event.command_name, command)
+        shape = json.dumps({
+            "filter": query_shape(command_filter) if command_filter is not None else None,
+            "sort": list(command.get("sort", {}).keys()) or None,
+        }, sort_keys=True)
+        context = get_request_context()
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = (
+                collection, shape, command_filter, context
+            )
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, {})
+
+    def _finish(self, event, reply):
+        with self._lock:
+            started = self._inflight.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, shape, command_filter, context = started
+        duration_ms = event.duration_micros / 1000
+        route = context.route if context is not None else "<background>"
+        documents = _returned_documents(event.command_name, reply)
+
+        mongo_command_duration_seconds.observe(collection, event.command_name, value=duration_ms / 1000)
+        if context is not None:
+            # Motor finishes commands on its executor threads, and gathered
+            # queries of one request can finish at the same time
+            with self._lock:
+                context.query_count += 1
+                context.query_time += duration_ms
+            if context.trace is not None:
+                record_span(
+                    f"mongo.{event.command_name}", time.perf_counter() - duration_ms / 1000,
+                    duration_ms / 1000, collection=collection, documents=documents
+                )
+
+        key = (collection, event.command_name, shape)
+        with self._lock:
+            stats = self.shapes.get(key)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    # Make room by forgetting the cheapest shape seen so far
+                    cheapest = min(self.shapes, key=lambda k: self.shapes[k].total_ms)
+                    del self.shapes[cheapest]
+                stats = self.shapes[key] = ShapeStats(
+                    collection, event.command_name, json.loads(shape), command_filter
+                )
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.documents += documents
+            stats.routes[route] = stats.routes.get(route, 0) + 1
+            stats.last_seen = time.time()
+
+        if duration_ms >= self.slow_ms:
+            mongo_slow_commands_total.inc(collection, event.command_name)
+            logger.warning(
+                "Slow Mongo %s on %s took %.1fms (route=%s, docs=%d, shape=%s)",
+                event.command_name, collection, duration_ms, route, documents, shape
+            )
+
+    def record_request(self, context: RequestContext) -> None:
+        """RequestContextMiddleware callback: per-route query counts."""
+        route = context.route if context.scope.get("route") is not None else "<unmatched>"
+        mongo_queries_per_request.observe(route, value=context.query_count)
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            stats.requests += 1
+            stats.queries += context.query_count
+            stats.max_queries = max(stats.max_queries, context.query_count)
+            stats.query_ms += context.query_time
+
+    def top_shapes(self, limit: int = 20, sort: str = "total_ms") -> list:
+        with self._lock:
+            shapes = sorted(self.shapes.values(), key=lambda stats: getattr(stats, sort), reverse=True)
+            return [(stats, stats.to_dict()) for stats in shapes[:limit]]
+
+    def route_summary(self) -> list:
+        with self._lock:
+            summary = [
+                {
+                    "route": route,
+                    "requests": stats.requests,
+                    "avg_queries": round(stats.queries / stats.requests, 2),
+                    "max_queries": stats.max_queries,
+                    "avg_query_ms": round(stats.query_ms / stats.requests, 3),
+                }
+                for route, stats in self.routes.items()
+            ]
+        return sorted(summary, key=lambda item: item["avg_queries"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.shapes.clear()
+            self.routes.clear()
+
+
+def winning_stage(plan: dict) -> str:
+    """Flatten an explain winningPlan into e.g. "FETCH <- IXSCAN"."""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage", "?"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages)
+
+
+async def explain_shape(db, stats: ShapeStats) -> Optional[str]:
+    """Ask the server how it plans a sampled query so collection scans stand out."""
+    if stats.command != "find" or stats.sample_filter is None:
+        return None
+    result = await db.command({
+        "explain": {"find": stats.collection, "filter": stats.sample_filter},
+        "verbosity": "queryPlanner",
+    })
+    return winning_stage(result.get("queryPlanner", {}).get("winningPlan", {}))
@@ -0,0 +1,46 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+from metrics import registry
+
+T = TypeVar("T")
+
+
+class ReadModelCache(Generic[T]):
+    """Bounded LRU of precomputed read models, dropped by the handlers that write them.
+
+    Entries live in this process only, which is enough for the single
+    uvicorn worker the app runs as. A load that overlaps an invalidation is
+    returned but not stored, so a read racing a write cannot put the old
+    state back in the cache.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, T]" = OrderedDict()
+        self.stats = registry.cache(name, lambda: len(self.entries))
+        self._version = 0
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Cached value for `key`, calling `load` on a miss. None results are not cached."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.stats.hit()
+            return self.entries[key]
+
+        self.stats.miss()
+        version = self._version
+        value = await load()
+        if value is not None and version == self._version and self.max_entries > 0:
+            self.entries[key] = value
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        self.entries.pop(key, None)
+        self._version += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self._version += 1
@@ -0,0 +1,94 @@
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+# Incoming X-Request-ID values are kept when they look like ids, so a proxy's
+# id carries through; anything else is replaced
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestContext:
+    """Per-request state shared by the instrumentation layers.
+
+    Motor runs pymongo calls in executor threads with a copy of the caller's
+    context, so command listeners see the same object as the handler.
+    """
+
+    __slots__ = ("scope", "request_id", "started", "duration", "status", "user_role",
+                 "query_count", "query_time", "trace")
+
+    def __init__(self, scope, request_id: Optional[str] = None):
+        self.scope = scope
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.user_role = None  # set once the request is authenticated
+        self.query_count = 0
+        self.query_time = 0.0
+        self.trace = None
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the scope once resolved
+        route = self.scope.get("route")
+        return route.path if route is not None else self.scope["path"]
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    return current_request.get()
+
+
+def _incoming_request_id(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            value = value.decode("latin-1")
+            return value if _REQUEST_ID.fullmatch(value) else None
+    return None
+
+
+class RequestContextMiddleware:
+    """ASGI middleware binding a RequestContext for the lifetime of a request.
+
+    Every response carries the request's id in `X-Request-ID`, taken from
+    the request when it sends a usable one. `on_complete` callbacks
+    receive the context once the response is sent, with its status and
+    duration filled in.
+    """
+
+    def __init__(self, app, on_complete: Optional[List[Callable[[RequestContext], None]]] = None):
+        self.app = app
+        self.on_complete = on_complete if on_complete is not None else []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(scope, _incoming_request_id(scope))
+        token = current_request.set(context)
+
+        async def identified_send(message):
+            if message["type"] == "http.response.start":
+                context.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", context.request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, identified_send)
+        finally:
+            context.duration = time.perf_counter() - context.started
+            current_request.reset(token)
+            for callback in self.on_complete:
+                callback(context)
@@ -1,51 +1,247 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form
+# Created before the other imports so their cost shows up in the startup profile
+from startup import DeferredStartup, StartupProfile
+startup_profile = StartupProfile()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import jwt
 import bcrypt
 import base64
 import random
 import string
 from typing import Union
+from urllib.parse import quote
+from download_stats import DownloadCounter
+from admission import AdmissionMiddleware, ConcurrencyLimiter, TokenBucket, parse_limits
+from metrics import MetricsMiddleware, registry as metrics_registry
+from request_context import RequestContextMiddleware, get_request_context
+from structured_logging import AccessLog, LogPipeline
+from query_monitor import QueryMonitor, explain_shape
+from tracing import TraceBuffer, TracedRoute, TracingMiddleware, span
+from storage import InMemoryDatabase, MotorDatabase, parse_read_profiles
+from mongo_pool import PoolMonitor, warm_pool
+from loop_monitor import LoopMonitor
+from memory_stats import MemoryProfiler, PeakAllocationMiddleware, peak_resident_memory_bytes
+from trusted_models import TrustedModelLoader
+from field_selection import FieldSelection, FieldSelector
+from read_cache import ReadModelCache
+from audit_log import AuditLog
+from jobs import JobContext, JobRunner, UnknownJobKind
+from certificates import CertificateTemplate, certificate_filename, render_certificates
+from zip_stream import stream_zip
+from compression import CompressionMiddleware
+from static_files import SinglePageApp
+from image_variants import FORMATS as IMAGE_FORMATS, ImageVariantCache
+import anyio.to_thread
+
+startup_profile.mark("imports")
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Logging: JSON lines (or LOG_FORMAT=text) written by a background thread from
+# a bounded queue; fast successful requests can be sampled in the access log
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', '1.0'))
+ACCESS_LOG_SLOW_MS = float(os.environ.get('ACCESS_LOG_SLOW_MS', '1000'))
+log_pipeline = LogPipeline(level=LOG_LEVEL, json_format=LOG_FORMAT != 'text', max_queue=LOG_QUEUE_SIZE)
+access_log = AccessLog(sample_rate=ACCESS_LOG_SAMPLE_RATE, slow_ms=ACCESS_LOG_SLOW_MS)
+
 # JWT Configuration
 SECRET_KEY = "your-super-secret-jwt-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Request tracing: fraction of requests traced and how many traces to keep.
+# Requests sending TRACE_FORCE_SECRET as X-Trace are always traced.
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.01'))
+TRACE_FORCE_SECRET = os.environ.get('TRACE_FORCE_SECRET') or None
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', '100'))
+trace_buffer = TraceBuffer(size=TRACE_BUFFER_SIZE)
+
+# Event-loop lag monitor; debug mode also samples stacks of blocking callbacks
+LOOP_MONITOR_INTERVAL_MS = float(os.environ.get('LOOP_MONITOR_INTERVAL_MS', '100'))
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get('LOOP_BLOCK_THRESHOLD_MS', '100'))
+LOOP_MONITOR_DEBUG = os.environ.get('LOOP_MONITOR_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+loop_monitor = LoopMonitor(
+    interval=LOOP_MONITOR_INTERVAL_MS / 1000,
+    block_threshold=LOOP_BLOCK_THRESHOLD_MS / 1000,
+    debug=LOOP_MONITOR_DEBUG,
+    app_root=str(ROOT_DIR)
+)
+
+# Memory instrumentation; tracemalloc snapshots only when MEMORY_PROFILING is on
+MEMORY_PROFILING = os.environ.get('MEMORY_PROFILING', 'false').lower() in ('1', 'true', 'yes')
+MEMORY_PROFILING_FRAMES = int(os.environ.get('MEMORY_PROFILING_FRAMES', '8'))
+MEMORY_SAMPLE_SECONDS = float(os.environ.get('MEMORY_SAMPLE_SECONDS', '30'))
+memory_profiler = MemoryProfiler(
+    enabled=MEMORY_PROFILING,
+    frames=MEMORY_PROFILING_FRAMES,
+    sample_interval=MEMORY_SAMPLE_SECONDS,
+    app_root=str(ROOT_DIR)
+)
+
+# Stored documents were validated on write and are loaded without revalidation;
+# STRICT_MODEL_VALIDATION validates every read again when debugging bad data
+STRICT_MODEL_VALIDATION = os.environ.get('STRICT_MODEL_VALIDATION', 'false').lower() in ('1', 'true', 'yes')
+trusted = TrustedModelLoader(strict=STRICT_MODEL_VALIDATION)
+
+# MongoDB command monitoring; commands slower than this are logged
+MONGO_SLOW_QUERY_MS = float(os.environ.get('MONGO_SLOW_QUERY_MS', '100'))
+query_monitor = QueryMonitor(slow_ms=MONGO_SLOW_QUERY_MS)
+pool_monitor = PoolMonitor()
+
+# Connection pool and timeouts; unset values keep the driver defaults (or MONGO_URL options)
+MONGO_CLIENT_OPTIONS = {
+    option: int(os.environ[variable])
+    for variable, option in (
+        ('MONGO_MAX_POOL_SIZE', 'maxPoolSize'),
+        ('MONGO_MIN_POOL_SIZE', 'minPoolSize'),
+        ('MONGO_MAX_IDLE_TIME_MS', 'maxIdleTimeMS'),
+        ('MONGO_WAIT_QUEUE_TIMEOUT_MS', 'waitQueueTimeoutMS'),
+        ('MONGO_CONNECT_TIMEOUT_MS', 'connectTimeoutMS'),
+        ('MONGO_SOCKET_TIMEOUT_MS', 'socketTimeoutMS'),
+        ('MONGO_SERVER_SELECTION_TIMEOUT_MS', 'serverSelectionTimeoutMS'),
+    )
+    if os.environ.get(variable)
+}
+
+# Read profiles ("name=readPreference[:readConcern]") for the public and
+# student read routes, which can be served from replica set secondaries.
+# Profiles left out read from the primary like everything else.
+MONGO_READ_PROFILES = parse_read_profiles(
+    os.environ.get('MONGO_READ_PROFILES', ''),
+    max_staleness=int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '-1'))
+)
+
+# Storage backend: "mongo" (default) or "memory" for hermetic tests and benchmarks
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+
+if STORAGE_BACKEND == 'memory':
+    client = None
+    db = InMemoryDatabase()
+elif STORAGE_BACKEND == 'mongo':
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, event_listeners=[query_monitor, pool_monitor], **MONGO_CLIENT_OPTIONS)
+    db = MotorDatabase(client[os.environ['DB_NAME']], read_profiles=MONGO_READ_PROFILES)
+else:
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected 'mongo' or 'memory'")
+public_reads = db.reads("public")
+student_reads = db.reads("student")
+
+# Cold start: connections opened before serving, the wait before deferred
+# startup steps run when no request arrives, and the readiness DB ping timeout
+MONGO_WARM_CONNECTIONS = int(os.environ.get('MONGO_WARM_CONNECTIONS', '4'))
+DEFERRED_STARTUP_DELAY_SECONDS = float(os.environ.get('DEFERRED_STARTUP_DELAY_SECONDS', '5'))
+READINESS_TIMEOUT_SECONDS = float(os.environ.get('READINESS_TIMEOUT_SECONDS', '2'))
+deferred_startup = DeferredStartup(startup_profile, delay=DEFERRED_STARTUP_DELAY_SECONDS)
+
+# Download counters are buffered in memory and flushed on this interval
+DOWNLOAD_COUNTER_FLUSH_SECONDS = float(os.environ.get('DOWNLOAD_COUNTER_FLUSH_SECONDS', '5'))
+download_counter = DownloadCounter(flush_interval=DOWNLOAD_COUNTER_FLUSH_SECONDS)
+
+# Admin actions are queued in memory and written to audit_log in batches
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', '1'))
+audit_log = AuditLog(max_queue=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_SECONDS)
+
+# Background jobs: asyncio workers, retries with backoff, a process pool for CPU-bound steps
+JOB_CONCURRENCY = int(os.environ.get('JOB_CONCURRENCY', '2'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_DELAY_SECONDS = float(os.environ.get('JOB_RETRY_DELAY_SECONDS', '5'))
+JOB_PROCESS_WORKERS = int(os.environ.get('JOB_PROCESS_WORKERS', '0')) or None  # 0: one per CPU
+job_runner = JobRunner(
+    concurrency=JOB_CONCURRENCY,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    retry_delay=JOB_RETRY_DELAY_SECONDS,
+    process_workers=JOB_PROCESS_WORKERS
+)
+
+# Admission control: "class=concurrency:max_queue" per expensive route class
+ADMISSION_LIMITS = parse_limits(os.environ.get(
+    'ADMISSION_LIMITS', 'upload=2:8,download=8:32,auth=4:16,list=4:16'
+))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_SECONDS', '10'))
+LOGIN_RATE_PER_MINUTE = float(os.environ.get('LOGIN_RATE_PER_MINUTE', '10'))
+FORGOT_PASSWORD_RATE_PER_MINUTE = float(os.environ.get('FORGOT_PASSWORD_RATE_PER_MINUTE', '3'))
+# Proxies in front of the app that append to X-Forwarded-For; 0 keys rate limits on the peer address
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
+admission_limiters = {
+    name: ConcurrencyLimiter(name, limit, max_queue, queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    for name, (limit, max_queue) in ADMISSION_LIMITS.items()
+}
+rate_limits = {
+    "/api/auth/login": TokenBucket(rate=LOGIN_RATE_PER_MINUTE / 60, burst=5),
+    "/api/auth/forgot-password": TokenBucket(rate=FORGOT_PASSWORD_RATE_PER_MINUTE / 60, burst=3),
+}
+
+# Response compression (brotli when installed, else gzip) above this size
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get('COMPRESSION_MINIMUM_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Built frontend served by the app itself (the Dockerfile copies it here)
+STATIC_DIR = Path(os.environ.get('STATIC_DIR', str(ROOT_DIR / 'static')))
+
+# Resized gallery/service images, rendered on demand and cached on disk (LRU)
+IMAGE_SOURCE_DIRS = [
+    Path(directory) for directory in os.environ.get('IMAGE_SOURCE_DIRS', os.pathsep.join([
+        str(STATIC_DIR / 'images'),
+        str(ROOT_DIR.parent / 'frontend' / 'public' / 'images'),
+        str(ROOT_DIR.parent / 'images'),
+    ])).split(os.pathsep) if directory
+]
+# House certificate template stamped by the generate_certificates job
+CERTIFICATE_TEMPLATE = os.environ.get('CERTIFICATE_TEMPLATE') or next(
+    (str(directory / 'template.pdf') for directory in IMAGE_SOURCE_DIRS if (directory / 'template.pdf').is_file()),
+    str(ROOT_DIR.parent / 'images' / 'template.pdf')
+)
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', str(ROOT_DIR / 'cache' / 'images')))
+IMAGE_CACHE_MAX_MB = int(os.environ.get('IMAGE_CACHE_MAX_MB', '256'))
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', '80'))
+image_variants = ImageVariantCache(
+    source_dirs=IMAGE_SOURCE_DIRS,
+    cache_dir=IMAGE_CACHE_DIR,
+    max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    quality=IMAGE_QUALITY
+)
+
+# Students' own profiles (StudentResponse without the certificate payload) by
+# user id; dropped by every handler that writes a student
+STUDENT_PROFILE_CACHE_SIZE = int(os.environ.get('STUDENT_PROFILE_CACHE_SIZE', '2000'))
+student_profiles = ReadModelCache("student_profiles", max_entries=STUDENT_PROFILE_CACHE_SIZE)
 
-# Create the main app without a prefix
-app = FastAPI()
+startup_profile.mark("configuration")
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# All routes live on this router; create_app() adds them to the app
+api_router = APIRouter(prefix="/api", route_class=TracedRoute, default_response_class=ORJSONResponse)
 
 # Security
 security = HTTPBearer()
 
-# Ensure uploads directory exists
+# Upload directories; create_app() creates them
 UPLOAD_DIR = Path(ROOT_DIR) / "uploads" / "certificates"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 EULOGY_DIR = Path(ROOT_DIR) / "uploads" / "eulogies"
-EULOGY_DIR.mkdir(parents=True, exist_ok=True)
 
 # =============================
 # MODELS
@@ -175,6 +371,50 @@ class DownloadFileResponse(BaseModel):
     download_count: int
     is_active: bool
 
+class DownloadDailyStat(BaseModel):
+    date: str  # YYYY-MM-DD (UTC)
+    count: int
+
+class DownloadStatsResponse(BaseModel):
+    download_id: str
+    title: Optional[str] = None
+    total: int
+    daily: List[DownloadDailyStat]
+
+class AuditEventResponse(BaseModel):
+    id: str
+    timestamp: datetime
+    actor_id: str
+    actor_username: str
+    action: str  # e.g. "student.finance.update"
+    target_type: str
+    target_id: Optional[str] = None
+    details: Dict[str, Any] = {}
+
+class JobProgress(BaseModel):
+    done: int = 0
+    total: Optional[int] = None
+    message: Optional[str] = None
+
+class JobSubmit(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    params: Dict[str, Any] = {}
+    status: str  # "queued", "running", "succeeded", "failed", "cancelled"
+    progress: JobProgress
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    submitted_by: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 class PasswordResetRecord(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     student_username: str
@@ -328,15 +568,41 @@ class StudentResponse(BaseModel):
     can_download_certificate: bool = False
     average_score: Optional[float] = None
 
+class StudentDashboardResponse(BaseModel):
+    profile: StudentResponse  # certificate payload omitted, see has_certificate
+    notifications: List[NotificationResponse]
+    resources: List[StudentResourceResponse]
+    downloads: List[DownloadFileResponse]
+    wifi: Optional[WiFiCredentialsResponse] = None
+
 # =============================
 # UTILITY FUNCTIONS
 # =============================
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with span("bcrypt.hash"):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    with span("bcrypt.verify"):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def encode_file_data(file_content: bytes) -> str:
+    with span("base64.encode", bytes=len(file_content)):
+        return base64.b64encode(file_content).decode('utf-8')
+
+def decode_file_data(file_data: str) -> bytes:
+    with span("base64.decode", chars=len(file_data)):
+        return base64.b64decode(file_data)
+
+def decode_file_data_chunks(file_data: str, chunk_size: int = 64 * 1024):
+    """Decode base64 `file_data` piece by piece, about `chunk_size` bytes at a time."""
+    step = chunk_size // 3 * 4
+    for start in range(0, len(file_data), step):
+        yield base64.b64decode(file_data[start:start + step])
+
+def decoded_size(file_data: str) -> int:
+    return len(file_data) * 3 // 4 - file_data.count("=", -2)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -348,6 +614,45 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def attachment_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def file_download_response(file_data: bytes, filename: str, media_type: str) -> Response:
+    # Serve decoded bytes directly; writing them to a shared temp file per
+    # document let concurrent downloads truncate each other's responses.
+    return Response(
+        content=file_data,
+        media_type=media_type,
+        headers={"Content-Disposition": attachment_disposition(filename)}
+    )
+
+def parse_ids(ids: Optional[str]) -> List[str]:
+    return list(dict.fromkeys(part.strip() for part in (ids or "").split(",") if part.strip()))
+
+def bundle_response(collection, documents: List[dict], entry_name, filename: str) -> StreamingResponse:
+    """Stream `documents` (id plus whatever `entry_name` needs) as one ZIP file.
+
+    The listing is already resolved, so a bad request fails before any bytes
+    go out. File bodies are read one document at a time as the archive is
+    written, so the bundle never sits in memory as a whole.
+    """
+    async def entries():
+        for document in documents:
+            stored = await collection.find_one({"id": document["id"], "is_active": True}, {"_id": 0, "file_data": 1})
+            if stored is None:  # deleted while the bundle was streaming
+                continue
+            file_data = stored["file_data"]
+            yield entry_name(document), decoded_size(file_data), decode_file_data_chunks(file_data)
+
+    return StreamingResponse(
+        stream_zip(entries()),
+        media_type="application/zip",
+        headers={"Content-Disposition": attachment_disposition(filename)}
+    )
+
 def generate_reset_code() -> str:
     return ''.join(random.choices(string.digits, k=6))
 
@@ -369,26 +674,86 @@ def calculate_average_score(academic_record: Optional[AcademicRecord]) -> Option
     
     return sum(valid_scores) / len(valid_scores)
 
+def meets_certificate_requirements(average_score: Optional[float], is_cleared: bool) -> bool:
+    return average_score is not None and average_score >= 60 and is_cleared
+
+def is_certificate_downloadable(has_certificate: bool, average_score: Optional[float], is_cleared: bool) -> bool:
+    return has_certificate and meets_certificate_requirements(average_score, is_cleared)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("auth.jwt_decode"):
+            payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await db.users.find_one({"username": username})
+    with span("auth.user_lookup"):
+        user = await db.users.find_one({"username": username})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return User(**user)
+    context = get_request_context()
+    if context is not None:
+        context.user_role = user.get("role")
+
+    with span("validate.user"):
+        return trusted.load(User, user)
 
 async def get_admin_user(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+# =============================
+# SPARSE FIELDSETS
+# =============================
+
+def stored_average_score(student: dict) -> Optional[float]:
+    academic_record = student.get("academic_record")
+    return calculate_average_score(trusted.load(AcademicRecord, academic_record) if academic_record else None)
+
+def stored_certificate_downloadable(student: dict) -> bool:
+    return is_certificate_downloadable(
+        student.get("certificate") is not None,
+        stored_average_score(student),
+        (student.get("finance_record") or {}).get("is_cleared", False)
+    )
+
+# Computed response fields: the stored paths they need and how to compute them
+student_fields = FieldSelector(StudentResponse, derived={
+    "username": (("user_id",), None),  # looked up in bulk by select_student_fields
+    "has_certificate": (("certificate.filename",), lambda student: student.get("certificate") is not None),
+    "average_score": (("academic_record",), stored_average_score),
+    "can_download_certificate": (
+        ("certificate.filename", "academic_record", "finance_record.is_cleared"),
+        stored_certificate_downloadable
+    ),
+})
+download_fields = FieldSelector(DownloadFileResponse)
+resource_fields = FieldSelector(StudentResourceResponse)
+notification_fields = FieldSelector(NotificationResponse, derived={
+    "has_attachment": (("attachment_filename",), lambda notif: notif.get("attachment_filename") is not None),
+})
+eulogy_fields = FieldSelector(EulogyResponse, derived={
+    "days_remaining": (("expires_at",), lambda eulogy: max(0, (eulogy["expires_at"] - datetime.utcnow()).days)),
+})
+
+async def select_student_fields(students: List[dict], fields: FieldSelection) -> List[dict]:
+    usernames = {}
+    if fields.wants("username"):
+        users = await db.users.find(
+            {"id": {"$in": list({student["user_id"] for student in students})}},
+            {"_id": 0, "id": 1, "username": 1}
+        ).to_list(None)
+        usernames = {user["id"]: user["username"] for user in users}
+    return [
+        fields.shape(student, username=usernames.get(student.get("user_id"), "unknown"))
+        for student in students
+    ]
+
 # =============================
 # AUTHENTICATION ROUTES
 # =============================
@@ -396,7 +761,7 @@ async def get_admin_user(current_user: User = Depends(get_current_user)):
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     user = await db.users.find_one({"username": user_credentials.username})
-    if not user or not verify_password(user_credentials.password, user["hashed_password"]):
+    if not user or not await run_in_threadpool(verify_password, user_credentials.password, user["hashed_password"]):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -439,7 +804,7 @@ async def reset_password(request: PasswordResetRequest):
         raise HTTPException(status_code=400, detail="Reset code has expired")
     
     # Update user password
-    hashed_password = hash_password(request.new_password)
+    hashed_password = await run_in_threadpool(hash_password, request.new_password)
     await db.users.update_one(
         {"username": request.username},
         {"$set": {"hashed_password": hashed_password, "is_first_login": False}}
@@ -455,7 +820,7 @@ async def reset_password(request: PasswordResetRequest):
 
 @api_router.post("/auth/change-password")
 async def change_password(password_change: PasswordChange, current_user: User = Depends(get_current_user)):
-    hashed_password = hash_password(password_change.new_password)
+    hashed_password = await run_in_threadpool(hash_password, password_change.new_password)
     await db.users.update_one(
         {"id": current_user.id},
         {"$set": {"hashed_password": hashed_password, "is_first_login": False}}
@@ -484,7 +849,7 @@ async def create_student(student_data: StudentCreate, admin_user: User = Depends
         raise HTTPException(status_code=400, detail="Username already exists")
     
     # Create user account
-    hashed_password = hash_password(student_data.password)
+    hashed_password = await run_in_threadpool(hash_password, student_data.password)
     user = User(
         username=student_data.username,
         email=student_data.email,
@@ -503,20 +868,35 @@ async def create_student(student_data: StudentCreate, admin_user: User = Depends
         phone=student_data.phone
     )
     await db.students.insert_one(student.dict())
+    audit_log.record(admin_user, "student.create", "student", student.id, username=user.username)
     
     return await get_student_response(student)
 
 @api_router.get("/admin/students", response_model=List[StudentResponse])
-async def get_all_students(admin_user: User = Depends(get_admin_user)):
+async def get_all_students(
+    admin_user: User = Depends(get_admin_user),
+    fields: Optional[FieldSelection] = Depends(student_fields)
+):
+    if fields:
+        students = await db.students.find({}, fields.projection).to_list(1000)
+        return ORJSONResponse(await select_student_fields(students, fields))
     students = await db.students.find().to_list(1000)
-    return [await get_student_response(Student(**student)) for student in students]
+    with span("validate.students", count=len(students)):
+        students = trusted.load_many(Student, students)
+    return [await get_student_response(student) for student in students]
 
 @api_router.get("/admin/students/{student_id}", response_model=StudentResponse)
-async def get_student(student_id: str, admin_user: User = Depends(get_admin_user)):
-    student = await db.students.find_one({"id": student_id})
+async def get_student(
+    student_id: str,
+    admin_user: User = Depends(get_admin_user),
+    fields: Optional[FieldSelection] = Depends(student_fields)
+):
+    student = await db.students.find_one({"id": student_id}, fields.projection if fields else None)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    return await get_student_response(Student(**student))
+    if fields:
+        return ORJSONResponse((await select_student_fields([student], fields))[0])
+    return await get_student_response(trusted.load(Student, student))
 
 @api_router.delete("/admin/students/{student_id}")
 async def delete_student(student_id: str, admin_user: User = Depends(get_admin_user)):
@@ -530,6 +910,8 @@ async def delete_student(student_id: str, admin_user: User = Depends(get_admin_u
     
     # Delete the student profile
     await db.students.delete_one({"id": student_id})
+    student_profiles.invalidate(user_id)
+    audit_log.record(admin_user, "student.delete", "student", student_id, full_name=student["full_name"])
     
     return {"message": "Student deleted successfully"}
 
@@ -550,6 +932,9 @@ async def update_student_profile(
         {"id": student_id},
         {"$set": {**update_data, "updated_at": datetime.utcnow()}}
     )
+    student_profiles.invalidate(student["user_id"])
+    audit_log.record(admin_user, "student.profile.update", "student", student_id,
+                     fields=sorted(profile_data.dict(exclude_unset=True)))
     return {"message": "Student profile updated successfully"}
 
 @api_router.put("/admin/students/{student_id}/academic")
@@ -569,6 +954,9 @@ async def update_student_academic(
         {"id": student_id},
         {"$set": {"academic_record": update_data, "updated_at": datetime.utcnow()}}
     )
+    student_profiles.invalidate(student["user_id"])
+    audit_log.record(admin_user, "student.academic.update", "student", student_id,
+                     scores=academic_data.dict(exclude_unset=True))
     return {"message": "Academic record updated successfully"}
 
 @api_router.put("/admin/students/{student_id}/finance")
@@ -604,6 +992,10 @@ async def update_student_finance(
         {"id": student_id},
         {"$set": {"finance_record": update_dict, "updated_at": datetime.utcnow()}}
     )
+    student_profiles.invalidate(student["user_id"])
+    audit_log.record(admin_user, "student.finance.update", "student", student_id,
+                     total_fees=total_fees, paid_amount=paid_amount, balance=update_dict["balance"],
+                     payment_reference=update_dict.get("payment_reference"))
     return {"message": "Finance record updated successfully"}
 
 @api_router.post("/admin/students/{student_id}/certificate")
@@ -612,30 +1004,34 @@ async def upload_certificate(
     file: UploadFile = File(...),
     admin_user: User = Depends(get_admin_user)
 ):
-    student = await db.students.find_one({"id": student_id})
+    student = await db.students.find_one({"id": student_id}, {"_id": 0, "id": 1, "user_id": 1})
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    # Read file content and encode to base64
     file_content = await file.read()
-    file_data = base64.b64encode(file_content).decode('utf-8')
-    
+    await store_certificate(student, file.filename, file_content, admin_user, "student.certificate.upload")
+    return {"message": "Certificate uploaded successfully"}
+
+async def store_certificate(student: dict, filename: str, content: bytes, admin_user: User, action: str,
+                            **details) -> None:
+    """Save a certificate PDF on `student` (needs id and user_id) and audit it as `action`."""
     certificate = Certificate(
-        filename=file.filename,
-        file_data=file_data,
+        filename=filename,
+        file_data=encode_file_data(content),
         uploaded_by=admin_user.id
     )
     
     await db.students.update_one(
-        {"id": student_id},
+        {"id": student["id"]},
         {"$set": {"certificate": certificate.dict(), "updated_at": datetime.utcnow()}}
     )
-    return {"message": "Certificate uploaded successfully"}
+    student_profiles.invalidate(student["user_id"])
+    audit_log.record(admin_user, action, "student", student["id"], filename=filename, **details)
 
 @api_router.get("/admin/password-resets", response_model=List[PasswordResetResponse])
 async def get_password_reset_requests(admin_user: User = Depends(get_admin_user)):
     resets = await db.password_resets.find({"status": "pending"}).to_list(1000)
-    return [PasswordResetResponse(**reset) for reset in resets]
+    return trusted.load_many(PasswordResetResponse, resets)
 
 @api_router.put("/admin/password-resets/{reset_id}/approve")
 async def approve_password_reset(reset_id: str, admin_user: User = Depends(get_admin_user)):
@@ -651,6 +1047,8 @@ async def approve_password_reset(reset_id: str, admin_user: User = Depends(get_a
             "reset_code": otp_code
         }}
     )
+    # The OTP itself stays out of the audit trail
+    audit_log.record(admin_user, "password_reset.approve", "password_reset", reset_id)
     return {"message": "Password reset request approved", "otp_code": otp_code}
 
 @api_router.put("/admin/password-resets/{reset_id}/reject")
@@ -659,6 +1057,7 @@ async def reject_password_reset(reset_id: str, admin_user: User = Depends(get_ad
         {"id": reset_id},
         {"$set": {"status": "rejected", "responded_at": datetime.utcnow(), "admin_response": "Rejected by admin"}}
     )
+    audit_log.record(admin_user, "password_reset.reject", "password_reset", reset_id)
     return {"message": "Password reset request rejected"}
 
 @api_router.post("/admin/eulogies")
@@ -670,7 +1069,7 @@ async def upload_eulogy(
 ):
     # Read file content and encode to base64
     file_content = await file.read()
-    file_data = base64.b64encode(file_content).decode('utf-8')
+    file_data = encode_file_data(file_content)
     
     eulogy = Eulogy(
         title=title,
@@ -681,16 +1080,24 @@ async def upload_eulogy(
     )
     
     await db.eulogies.insert_one(eulogy.dict())
+    audit_log.record(admin_user, "eulogy.create", "eulogy", eulogy.id, title=title, filename=file.filename)
     return {"message": "Eulogy uploaded successfully", "id": eulogy.id}
 
 @api_router.get("/admin/eulogies", response_model=List[EulogyResponse])
-async def get_all_eulogies_admin(admin_user: User = Depends(get_admin_user)):
+async def get_all_eulogies_admin(
+    admin_user: User = Depends(get_admin_user),
+    fields: Optional[FieldSelection] = Depends(eulogy_fields)
+):
+    if fields:
+        eulogies = await db.eulogies.find({}, fields.projection).to_list(1000)
+        return ORJSONResponse([fields.shape(eulogy) for eulogy in eulogies])
     eulogies = await db.eulogies.find().to_list(1000)
     result = []
     for eulogy in eulogies:
         days_remaining = max(0, (eulogy["expires_at"] - datetime.utcnow()).days)
-        result.append(EulogyResponse(
-            **eulogy,
+        result.append(trusted.load(
+            EulogyResponse,
+            eulogy,
             days_remaining=days_remaining
         ))
     return result
@@ -698,6 +1105,7 @@ async def get_all_eulogies_admin(admin_user: User = Depends(get_admin_user)):
 @api_router.delete("/admin/eulogies/{eulogy_id}")
 async def delete_eulogy(eulogy_id: str, admin_user: User = Depends(get_admin_user)):
     await db.eulogies.delete_one({"id": eulogy_id})
+    audit_log.record(admin_user, "eulogy.delete", "eulogy", eulogy_id)
     return {"message": "Eulogy deleted successfully"}
 
 # =============================
@@ -705,7 +1113,6 @@ async def delete_eulogy(eulogy_id: str, admin_user: User = Depends(get_admin_use
 # =============================
 
 DOWNLOADS_DIR = Path(ROOT_DIR) / "uploads" / "downloads"
-DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
 
 @api_router.post("/admin/downloads")
 async def upload_download_file(
@@ -720,7 +1127,7 @@ async def upload_download_file(
     
     # Read file content and encode to base64
     file_content = await file.read()
-    file_data = base64.b64encode(file_content).decode('utf-8')
+    file_data = encode_file_data(file_content)
     
     download_file = DownloadFile(
         title=title,
@@ -732,12 +1139,20 @@ async def upload_download_file(
     )
     
     await db.downloads.insert_one(download_file.dict())
+    audit_log.record(admin_user, "download.create", "download", download_file.id,
+                     title=title, filename=file.filename, file_type=file_type)
     return {"message": "File uploaded successfully", "id": download_file.id}
 
 @api_router.get("/admin/downloads", response_model=List[DownloadFileResponse])
-async def get_all_downloads_admin(admin_user: User = Depends(get_admin_user)):
+async def get_all_downloads_admin(
+    admin_user: User = Depends(get_admin_user),
+    fields: Optional[FieldSelection] = Depends(download_fields)
+):
+    if fields:
+        downloads = await db.downloads.find({"is_active": True}, fields.projection).to_list(1000)
+        return ORJSONResponse([fields.shape(download) for download in downloads])
     downloads = await db.downloads.find({"is_active": True}).to_list(1000)
-    return [DownloadFileResponse(**download) for download in downloads]
+    return trusted.load_many(DownloadFileResponse, downloads)
 
 @api_router.delete("/admin/downloads/{download_id}")
 async def delete_download_file(download_id: str, admin_user: User = Depends(get_admin_user)):
@@ -745,8 +1160,229 @@ async def delete_download_file(download_id: str, admin_user: User = Depends(get_
         {"id": download_id},
         {"$set": {"is_active": False}}
     )
+    audit_log.record(admin_user, "download.delete", "download", download_id)
     return {"message": "Download file deleted successfully"}
 
+@api_router.get("/admin/downloads/stats", response_model=List[DownloadStatsResponse])
+async def get_download_stats(
+    days: int = 30,
+    download_id: Optional[str] = None,
+    admin_user: User = Depends(get_admin_user)
+):
+    # Fold buffered counts in first so the rollups are current
+    await download_counter.flush(db)
+    
+    since = (datetime.utcnow() - timedelta(days=max(days, 1) - 1)).strftime("%Y-%m-%d")
+    query = {"date": {"$gte": since}}
+    if download_id:
+        query["download_id"] = download_id
+    rollups = await db.download_daily_stats.find(query).sort("date", 1).to_list(10000)
+    
+    stats: Dict[str, DownloadStatsResponse] = {}
+    for rollup in rollups:
+        entry = stats.setdefault(rollup["download_id"], DownloadStatsResponse(
+            download_id=rollup["download_id"],
+            total=0,
+            daily=[]
+        ))
+        entry.total += rollup["count"]
+        entry.daily.append(DownloadDailyStat(date=rollup["date"], count=rollup["count"]))
+    
+    downloads = await db.downloads.find(
+        {"id": {"$in": list(stats)}},
+        {"id": 1, "title": 1}
+    ).to_list(len(stats) or 1)
+    for download in downloads:
+        stats[download["id"]].title = download["title"]
+    
+    return sorted(stats.values(), key=lambda entry: entry.total, reverse=True)
+
+# =============================
+# AUDIT LOG
+# =============================
+
+def as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored timestamps are naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@api_router.get("/admin/audit-log", response_model=List[AuditEventResponse])
+async def get_audit_log(
+    actor_id: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    admin_user: User = Depends(get_admin_user)
+):
+    # Write queued events first so recent actions show up
+    await audit_log.flush(db)
+    
+    query = {}
+    if actor_id:
+        query["actor_id"] = actor_id
+    if target_type:
+        query["target_type"] = target_type
+    if target_id:
+        query["target_id"] = target_id
+    if action:
+        query["action"] = action
+    if since or until:
+        query["timestamp"] = {}
+        if since:
+            query["timestamp"]["$gte"] = as_naive_utc(since)
+        if until:
+            query["timestamp"]["$lt"] = as_naive_utc(until)
+    
+    limit = min(max(limit, 1), 1000)
+    events = await db.audit_log.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+    return trusted.load_many(AuditEventResponse, events)
+
+# =============================
+# BACKGROUND JOBS
+# =============================
+
+@job_runner.handler("purge_expired")
+async def purge_expired_job(job: JobContext) -> dict:
+    """Delete eulogies and password reset requests that expired `grace_days` ago or more."""
+    cutoff = datetime.utcnow() - timedelta(days=int(job.params.get("grace_days", 0)))
+    await job.progress(0, total=2, message="Purging expired eulogies")
+    eulogies = await db.eulogies.delete_many({"expires_at": {"$lt": cutoff}})
+    await job.progress(1, message="Purging expired password resets")
+    resets = await db.password_resets.delete_many({"expires_at": {"$lt": cutoff}})
+    return {"eulogies_deleted": eulogies.deleted_count, "password_resets_deleted": resets.deleted_count}
+
+@job_runner.handler("generate_certificates")
+async def generate_certificates_job(job: JobContext) -> dict:
+    """Stamp certificates from the house template for every eligible student.
+
+    Eligibility is the download rule: average of 60 or more and fees
+    cleared. Params: `student_ids` limits the run to those students,
+    `overwrite` replaces certificates already on file (skipped by default,
+    so a resumed job carries on where it stopped), `course` is printed on
+    the certificate. Batches of `batch_size` students render in the
+    process pool, all CPUs at once, and each batch is stored as it
+    finishes.
+    """
+    admin_doc = await db.users.find_one({"id": job.submitted_by})
+    if admin_doc is None:
+        raise ValueError("The admin who submitted this job no longer exists")
+    admin_user = trusted.load(User, admin_doc)
+    # Parse the template here so a broken one fails the job before any work is queued
+    await job.run_in_thread(CertificateTemplate.load, CERTIFICATE_TEMPLATE)
+
+    query = {"finance_record.is_cleared": True}
+    if job.params.get("student_ids"):
+        query["id"] = {"$in": list(job.params["student_ids"])}
+    if not job.params.get("overwrite", False):
+        query["certificate"] = None
+    candidates = await db.students.find(
+        query, {"_id": 0, "id": 1, "user_id": 1, "full_name": 1, "academic_record": 1}
+    ).sort("full_name", 1).to_list(None)
+    eligible = []
+    for student in candidates:
+        average_score = stored_average_score(student)
+        if meets_certificate_requirements(average_score, True):
+            eligible.append((student, average_score))
+
+    total = len(eligible)
+    await job.progress(0, total=total, message=f"Rendering {total} certificates")
+    course = job.params.get("course") or "Computer Packages"
+    issued_on = datetime.utcnow().strftime("%d %B %Y").lstrip("0")
+    batch_size = max(int(job.params.get("batch_size", 16)), 1)
+
+    async def render(batch):
+        fields = [
+            {
+                "full_name": student["full_name"],
+                "course": course,
+                "average_score": average_score,
+                "issued_on": issued_on,
+                "number": f"TWOEM-{student['id'][:8].upper()}",
+            }
+            for student, average_score in batch
+        ]
+        return batch, await job.run_in_process(render_certificates, CERTIFICATE_TEMPLATE, fields)
+
+    renders = [
+        asyncio.ensure_future(render(eligible[start:start + batch_size]))
+        for start in range(0, total, batch_size)
+    ]
+    generated = 0
+    try:
+        for finished in asyncio.as_completed(renders):
+            batch, pdfs = await finished
+            for (student, _), pdf in zip(batch, pdfs):
+                await store_certificate(
+                    student, certificate_filename(student["full_name"], student["id"]), pdf, admin_user,
+                    "student.certificate.generate", job_id=job.job_id
+                )
+            generated += len(batch)
+            await job.progress(generated, message=f"Stored {generated} of {total} certificates")
+    finally:
+        for pending in renders:
+            pending.cancel()
+    return {"generated": generated, "not_eligible": len(candidates) - total}
+
+async def wait_for_deferred_step(name: str) -> None:
+    """Wait for the deferred startup steps; 503 if step `name` failed."""
+    await deferred_startup.wait()
+    if name in deferred_startup.failed:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {name} failed to start")
+
+@api_router.post("/admin/jobs", response_model=JobResponse)
+async def submit_job(job_data: JobSubmit, admin_user: User = Depends(get_admin_user)):
+    # The runner starts with the deferred startup steps
+    await wait_for_deferred_step("job_runner")
+    try:
+        job = await job_runner.submit(job_data.kind, job_data.params, submitted_by=admin_user.id)
+    except UnknownJobKind:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{job_data.kind}'")
+    audit_log.record(admin_user, "job.submit", "job", job["id"], kind=job_data.kind)
+    return trusted.load(JobResponse, job)
+
+@api_router.get("/admin/jobs", response_model=List[JobResponse])
+async def get_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = 50,
+    admin_user: User = Depends(get_admin_user)
+):
+    query = {}
+    if status:
+        query["status"] = status
+    if kind:
+        query["kind"] = kind
+    limit = min(max(limit, 1), 500)
+    jobs = await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    return trusted.load_many(JobResponse, jobs)
+
+@api_router.get("/admin/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, admin_user: User = Depends(get_admin_user)):
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return trusted.load(JobResponse, job)
+
+@api_router.post("/admin/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, admin_user: User = Depends(get_admin_user)):
+    await wait_for_deferred_step("job_runner")
+    if not await job_runner.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not queued or running")
+    audit_log.record(admin_user, "job.cancel", "job", job_id)
+    return {"message": "Job cancelled"}
+
+@api_router.post("/admin/jobs/{job_id}/retry")
+async def retry_job(job_id: str, admin_user: User = Depends(get_admin_user)):
+    await wait_for_deferred_step("job_runner")
+    if not await job_runner.retry(job_id):
+        raise HTTPException(status_code=409, detail="Only failed or cancelled jobs can be retried")
+    audit_log.record(admin_user, "job.retry", "job", job_id)
+    return {"message": "Job queued"}
+
 # =============================
 # NEW ADMIN ROUTES FOR NOTIFICATIONS AND RESOURCES
 # =============================
@@ -770,7 +1406,7 @@ async def create_notification(
     attachment_data = None
     if file:
         file_content = await file.read()
-        attachment_data = base64.b64encode(file_content).decode('utf-8')
+        attachment_data = encode_file_data(file_content)
         attachment_filename = file.filename
     
     notification = Notification(
@@ -785,14 +1421,23 @@ async def create_notification(
     )
     
     await db.notifications.insert_one(notification.dict())
+    audit_log.record(admin_user, "notification.create", "notification", notification.id,
+                     title=title, target_audience=target_audience)
     return {"message": "Notification created successfully", "id": notification.id}
 
 @api_router.get("/admin/notifications", response_model=List[NotificationResponse])
-async def get_all_notifications_admin(admin_user: User = Depends(get_admin_user)):
+async def get_all_notifications_admin(
+    admin_user: User = Depends(get_admin_user),
+    fields: Optional[FieldSelection] = Depends(notification_fields)
+):
+    if fields:
+        notifications = await db.notifications.find({"is_active": True}, fields.projection).to_list(1000)
+        return ORJSONResponse([fields.shape(notif) for notif in notifications])
     notifications = await db.notifications.find({"is_active": True}).to_list(1000)
     return [
-        NotificationResponse(
-            **notif,
+        trusted.load(
+            NotificationResponse,
+            notif,
             has_attachment=notif["attachment_filename"] is not None
         ) for notif in notifications
     ]
@@ -803,6 +1448,7 @@ async def delete_notification(notification_id: str, admin_user: User = Depends(g
         {"id": notification_id},
         {"$set": {"is_active": False}}
     )
+    audit_log.record(admin_user, "notification.delete", "notification", notification_id)
     return {"message": "Notification deleted successfully"}
 
 # Student Resources Management
@@ -820,7 +1466,7 @@ async def upload_student_resource(
     
     # Read file content and encode to base64
     file_content = await file.read()
-    file_data = base64.b64encode(file_content).decode('utf-8')
+    file_data = encode_file_data(file_content)
     
     resource = StudentResource(
         title=title,
@@ -832,12 +1478,20 @@ async def upload_student_resource(
     )
     
     await db.student_resources.insert_one(resource.dict())
+    audit_log.record(admin_user, "resource.create", "resource", resource.id,
+                     title=title, subject=subject, filename=file.filename)
     return {"message": "Resource uploaded successfully", "id": resource.id}
 
 @api_router.get("/admin/resources", response_model=List[StudentResourceResponse])
-async def get_all_resources_admin(admin_user: User = Depends(get_admin_user)):
+async def get_all_resources_admin(
+    admin_user: User = Depends(get_admin_user),
+    fields: Optional[FieldSelection] = Depends(resource_fields)
+):
+    if fields:
+        resources = await db.student_resources.find({"is_active": True}, fields.projection).to_list(1000)
+        return ORJSONResponse([fields.shape(resource) for resource in resources])
     resources = await db.student_resources.find({"is_active": True}).to_list(1000)
-    return [StudentResourceResponse(**resource) for resource in resources]
+    return trusted.load_many(StudentResourceResponse, resources)
 
 @api_router.delete("/admin/resources/{resource_id}")
 async def delete_student_resource(resource_id: str, admin_user: User = Depends(get_admin_user)):
@@ -845,6 +1499,7 @@ async def delete_student_resource(resource_id: str, admin_user: User = Depends(g
         {"id": resource_id},
         {"$set": {"is_active": False}}
     )
+    audit_log.record(admin_user, "resource.delete", "resource", resource_id)
     return {"message": "Resource deleted successfully"}
 
 # WiFi Credentials Management
@@ -871,6 +1526,7 @@ async def update_wifi_credentials(
     else:
         await db.wifi_credentials.insert_one(wifi_creds.dict())
     
+    audit_log.record(admin_user, "wifi.update", "wifi", network_name=wifi_data.network_name)
     return {"message": "WiFi credentials updated successfully"}
 
 @api_router.get("/admin/wifi", response_model=WiFiCredentialsResponse)
@@ -878,25 +1534,61 @@ async def get_wifi_credentials_admin(admin_user: User = Depends(get_admin_user))
     wifi = await db.wifi_credentials.find_one({})
     if not wifi:
         raise HTTPException(status_code=404, detail="WiFi credentials not found")
-    return WiFiCredentialsResponse(**wifi)
+    return trusted.load(WiFiCredentialsResponse, wifi)
 
 # =============================
 # PUBLIC DOWNLOADS ROUTES  
 # =============================
 
 @api_router.get("/downloads", response_model=List[DownloadFileResponse])
-async def get_public_downloads():
+async def get_public_downloads(fields: Optional[FieldSelection] = Depends(download_fields)):
     # Get only active public downloads
-    downloads = await db.downloads.find({
+    downloads = await public_reads.downloads.find({
         "is_active": True,
         "file_type": "public"
-    }).to_list(1000)
-    
-    return [DownloadFileResponse(**download) for download in downloads]
+    }, fields.projection if fields else None).to_list(1000)
+    
+    if fields:
+        return ORJSONResponse([fields.shape(download) for download in downloads])
+    return trusted.load_many(DownloadFileResponse, downloads)
+
+async def find_download_bundle(database, ids: Optional[str], file_type: Optional[str]) -> List[dict]:
+    id_list = parse_ids(ids)
+    if not id_list:
+        raise HTTPException(status_code=400, detail="ids must name at least one download")
+    downloads = await database.downloads.find(
+        {"id": {"$in": id_list}, "is_active": True},
+        {"_id": 0, "id": 1, "filename": 1, "file_type": 1}
+    ).to_list(len(id_list))
+    found = {download["id"] for download in downloads}
+    missing = [download_id for download_id in id_list if download_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Download not found: {', '.join(missing)}")
+    if file_type and any(download["file_type"] != file_type for download in downloads):
+        raise HTTPException(status_code=403, detail="Access denied. File is private.")
+    # Count each file as downloaded, in the order requested
+    order = {download_id: index for index, download_id in enumerate(id_list)}
+    downloads.sort(key=lambda download: order[download["id"]])
+    for download in downloads:
+        download_counter.record(download["id"])
+    return downloads
+
+@api_router.get("/downloads/bundle")
+async def download_files_bundle(ids: str):
+    """Several public downloads as one ZIP, e.g. ?ids=a,b,c."""
+    downloads = await find_download_bundle(public_reads, ids, "public")
+    return bundle_response(public_reads.downloads, downloads, lambda download: download["filename"], "downloads.zip")
+
+@api_router.get("/downloads/private/bundle")
+async def download_private_files_bundle(ids: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required for private files")
+    downloads = await find_download_bundle(db, ids, None)
+    return bundle_response(db.downloads, downloads, lambda download: download["filename"], "downloads.zip")
 
 @api_router.get("/downloads/{download_id}")
 async def download_file(download_id: str):
-    download = await db.downloads.find_one({"id": download_id, "is_active": True})
+    download = await public_reads.downloads.find_one({"id": download_id, "is_active": True})
     if not download:
         raise HTTPException(status_code=404, detail="Download not found")
     
@@ -904,25 +1596,13 @@ async def download_file(download_id: str):
     if download["file_type"] != "public":
         raise HTTPException(status_code=403, detail="Access denied. File is private.")
     
-    # Increment download count
-    await db.downloads.update_one(
-        {"id": download_id},
-        {"$inc": {"download_count": 1}}
-    )
+    # Count the download; flushed to the database in batches
+    download_counter.record(download_id)
     
     # Decode base64 file data
-    file_data = base64.b64decode(download["file_data"])
+    file_data = decode_file_data(download["file_data"])
     
-    # Create a temporary file
-    temp_file = DOWNLOADS_DIR / f"temp_{download_id}_{download['filename']}"
-    with open(temp_file, "wb") as f:
-        f.write(file_data)
-    
-    return FileResponse(
-        path=temp_file,
-        filename=download["filename"],
-        media_type="application/octet-stream"
-    )
+    return file_download_response(file_data, download["filename"], "application/octet-stream")
 
 @api_router.get("/downloads/private/{download_id}")
 async def download_private_file(download_id: str, current_user: User = Depends(get_current_user)):
@@ -934,40 +1614,76 @@ async def download_private_file(download_id: str, current_user: User = Depends(g
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required for private files")
     
-    # Increment download count
-    await db.downloads.update_one(
-        {"id": download_id},
-        {"$inc": {"download_count": 1}}
-    )
+    # Count the download; flushed to the database in batches
+    download_counter.record(download_id)
     
     # Decode base64 file data
-    file_data = base64.b64decode(download["file_data"])
-    
-    # Create a temporary file
-    temp_file = DOWNLOADS_DIR / f"temp_{download_id}_{download['filename']}"
-    with open(temp_file, "wb") as f:
-        f.write(file_data)
+    file_data = decode_file_data(download["file_data"])
     
-    return FileResponse(
-        path=temp_file,
-        filename=download["filename"],
-        media_type="application/octet-stream"
-    )
+    return file_download_response(file_data, download["filename"], "application/octet-stream")
 
 # =============================
 # STUDENT ROUTES
 # =============================
 
 @api_router.get("/student/profile", response_model=StudentResponse)
-async def get_student_profile(current_user: User = Depends(get_current_user)):
+async def get_student_profile(
+    current_user: User = Depends(get_current_user),
+    fields: Optional[FieldSelection] = Depends(student_fields)
+):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Student access required")
     
-    student = await db.students.find_one({"user_id": current_user.id})
-    if not student:
+    if fields:
+        student = await db.students.find_one({"user_id": current_user.id}, fields.projection)
+        if not student:
+            raise HTTPException(status_code=404, detail="Student profile not found")
+        return ORJSONResponse(fields.shape(student, username=current_user.username))
+    
+    profile = await student_profiles.get(current_user.id, lambda: load_student_profile(current_user))
+    if not profile:
         raise HTTPException(status_code=404, detail="Student profile not found")
+    return profile
+
+@api_router.get("/student/dashboard", response_model=StudentDashboardResponse)
+async def get_student_dashboard(current_user: User = Depends(get_current_user)):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Student access required")
     
-    return await get_student_response(Student(**student))
+    profile = await student_profiles.get(current_user.id, lambda: load_student_profile(current_user))
+    if not profile:
+        raise HTTPException(status_code=404, detail="Student profile not found")
+    
+    # Everything else only depends on the student, so fetch it concurrently
+    # and leave the base64 payloads in the database
+    notifications, resources, downloads, wifi = await asyncio.gather(
+        student_reads.notifications.find({
+            "is_active": True,
+            "$or": [
+                {"target_audience": "all"},
+                {"target_audience": "specific", "target_student_ids": {"$in": [profile.id]}}
+            ]
+        }, {"attachment_data": 0}).to_list(1000),
+        student_reads.student_resources.find({"is_active": True}, {"file_data": 0}).to_list(1000),
+        student_reads.downloads.find({"is_active": True}, {"file_data": 0}).to_list(1000),
+        db.wifi_credentials.find_one({}, {"_id": 0, "network_name": 1, "password": 1,
+                                          "connection_guide": 1, "updated_at": 1})
+    )
+    
+    return trusted.build(
+        StudentDashboardResponse,
+        profile=profile,
+        notifications=[
+            trusted.load(
+                NotificationResponse,
+                notif,
+                has_attachment=notif["attachment_filename"] is not None
+            ) for notif in notifications
+        ],
+        resources=trusted.load_many(StudentResourceResponse, resources),
+        downloads=trusted.load_many(DownloadFileResponse, downloads),
+        wifi=trusted.load(WiFiCredentialsResponse, wifi) if wifi else None
+    )
 
 @api_router.put("/student/parent-contacts")
 async def update_parent_contacts(
@@ -981,6 +1697,7 @@ async def update_parent_contacts(
         {"user_id": current_user.id},
         {"$set": {"parent_contacts": parent_contacts.dict(), "updated_at": datetime.utcnow()}}
     )
+    student_profiles.invalidate(current_user.id)
     return {"message": "Parent contacts updated successfully"}
 
 @api_router.get("/student/certificate")
@@ -992,7 +1709,7 @@ async def download_certificate(current_user: User = Depends(get_current_user)):
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
-    student_obj = Student(**student)
+    student_obj = trusted.load(Student, student)
     
     # Check eligibility
     if not student_obj.certificate:
@@ -1006,45 +1723,42 @@ async def download_certificate(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Fees must be cleared")
     
     # Decode base64 file data
-    file_data = base64.b64decode(student_obj.certificate.file_data)
+    file_data = decode_file_data(student_obj.certificate.file_data)
     
-    # Create a temporary file
-    temp_file = UPLOAD_DIR / f"temp_{student_obj.id}_{student_obj.certificate.filename}"
-    with open(temp_file, "wb") as f:
-        f.write(file_data)
-    
-    return FileResponse(
-        path=temp_file,
-        filename=student_obj.certificate.filename,
-        media_type="application/pdf"
-    )
+    return file_download_response(file_data, student_obj.certificate.filename, "application/pdf")
 
 # =============================
 # NEW STUDENT ROUTES FOR RESOURCES
 # =============================
 
 @api_router.get("/student/notifications", response_model=List[NotificationResponse])
-async def get_student_notifications(current_user: User = Depends(get_current_user)):
+async def get_student_notifications(
+    current_user: User = Depends(get_current_user),
+    fields: Optional[FieldSelection] = Depends(notification_fields)
+):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Student access required")
     
     # Get student profile to get student ID
-    student = await db.students.find_one({"user_id": current_user.id})
+    student = await db.students.find_one({"user_id": current_user.id}, {"_id": 0, "id": 1})
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
     # Get notifications for this student
-    notifications = await db.notifications.find({
+    notifications = await student_reads.notifications.find({
         "is_active": True,
         "$or": [
             {"target_audience": "all"},
             {"target_audience": "specific", "target_student_ids": {"$in": [student["id"]]}}
         ]
-    }).to_list(1000)
+    }, fields.projection if fields else None).to_list(1000)
     
+    if fields:
+        return ORJSONResponse([fields.shape(notif) for notif in notifications])
     return [
-        NotificationResponse(
-            **notif,
+        trusted.load(
+            NotificationResponse,
+            notif,
             has_attachment=notif["attachment_filename"] is not None
         ) for notif in notifications
     ]
@@ -1054,7 +1768,7 @@ async def download_notification_attachment(notification_id: str, current_user: U
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Student access required")
     
-    notification = await db.notifications.find_one({"id": notification_id, "is_active": True})
+    notification = await student_reads.notifications.find_one({"id": notification_id, "is_active": True})
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
@@ -1071,49 +1785,70 @@ async def download_notification_attachment(notification_id: str, current_user: U
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Decode base64 file data
-    file_data = base64.b64decode(notification["attachment_data"])
-    
-    # Create a temporary file
-    temp_file = DOWNLOADS_DIR / f"notification_attachment_{notification_id}_{notification['attachment_filename']}"
-    with open(temp_file, "wb") as f:
-        f.write(file_data)
+    file_data = decode_file_data(notification["attachment_data"])
     
-    return FileResponse(
-        path=temp_file,
-        filename=notification["attachment_filename"],
-        media_type="application/octet-stream"
-    )
+    return file_download_response(file_data, notification["attachment_filename"], "application/octet-stream")
 
 @api_router.get("/student/resources", response_model=List[StudentResourceResponse])
-async def get_student_resources(current_user: User = Depends(get_current_user)):
+async def get_student_resources(
+    current_user: User = Depends(get_current_user),
+    fields: Optional[FieldSelection] = Depends(resource_fields)
+):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Student access required")
     
-    resources = await db.student_resources.find({"is_active": True}).to_list(1000)
-    return [StudentResourceResponse(**resource) for resource in resources]
+    resources = await student_reads.student_resources.find(
+        {"is_active": True}, fields.projection if fields else None).to_list(1000)
+    if fields:
+        return ORJSONResponse([fields.shape(resource) for resource in resources])
+    return trusted.load_many(StudentResourceResponse, resources)
+
+@api_router.get("/student/resources/bundle")
+async def download_student_resource_bundle(
+    ids: Optional[str] = None,
+    subject: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Resources as one ZIP, by `ids` (comma-separated) or a whole `subject`."""
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Student access required")
+    
+    id_list = parse_ids(ids)
+    if not id_list and not subject:
+        raise HTTPException(status_code=400, detail="Pass ids or subject")
+    query = {"is_active": True}
+    if id_list:
+        query["id"] = {"$in": id_list}
+    if subject:
+        query["subject"] = subject
+    resources = await student_reads.student_resources.find(
+        query, {"_id": 0, "id": 1, "subject": 1, "title": 1, "filename": 1}
+    ).sort([("subject", 1), ("title", 1)]).to_list(1000)
+    found = {resource["id"] for resource in resources}
+    missing = [resource_id for resource_id in id_list if resource_id not in found]
+    if missing or not resources:
+        raise HTTPException(status_code=404, detail=f"Resource not found: {', '.join(missing) or subject}")
+    
+    return bundle_response(
+        student_reads.student_resources,
+        resources,
+        lambda resource: f"{resource['subject']}/{resource['filename']}",
+        f"{subject or 'resources'}.zip"
+    )
 
 @api_router.get("/student/resources/{resource_id}/download")
 async def download_student_resource(resource_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Student access required")
     
-    resource = await db.student_resources.find_one({"id": resource_id, "is_active": True})
+    resource = await student_reads.student_resources.find_one({"id": resource_id, "is_active": True})
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
     # Decode base64 file data
-    file_data = base64.b64decode(resource["file_data"])
-    
-    # Create a temporary file
-    temp_file = DOWNLOADS_DIR / f"resource_{resource_id}_{resource['filename']}"
-    with open(temp_file, "wb") as f:
-        f.write(file_data)
+    file_data = decode_file_data(resource["file_data"])
     
-    return FileResponse(
-        path=temp_file,
-        filename=resource["filename"],
-        media_type="application/pdf"
-    )
+    return file_download_response(file_data, resource["filename"], "application/pdf")
 
 @api_router.get("/student/wifi", response_model=WiFiCredentialsResponse)
 async def get_wifi_credentials_student(current_user: User = Depends(get_current_user)):
@@ -1123,16 +1858,21 @@ async def get_wifi_credentials_student(current_user: User = Depends(get_current_
     wifi = await db.wifi_credentials.find_one({})
     if not wifi:
         raise HTTPException(status_code=404, detail="WiFi credentials not found")
-    return WiFiCredentialsResponse(**wifi)
+    return trusted.load(WiFiCredentialsResponse, wifi)
 
 @api_router.get("/student/downloads", response_model=List[DownloadFileResponse])
-async def get_student_downloads(current_user: User = Depends(get_current_user)):
+async def get_student_downloads(
+    current_user: User = Depends(get_current_user),
+    fields: Optional[FieldSelection] = Depends(download_fields)
+):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Student access required")
     
     # Get all downloads (both public and private, but students can only download public ones)
-    downloads = await db.downloads.find({"is_active": True}).to_list(1000)
-    return [DownloadFileResponse(**download) for download in downloads]
+    downloads = await student_reads.downloads.find({"is_active": True}, fields.projection if fields else None).to_list(1000)
+    if fields:
+        return ORJSONResponse([fields.shape(download) for download in downloads])
+    return trusted.load_many(DownloadFileResponse, downloads)
 
 # =============================
 # PUBLIC ROUTES
@@ -1146,27 +1886,50 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Whether this instance can serve traffic: /health plus a database round trip."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.ping(), READINESS_TIMEOUT_SECONDS)
+        database = {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    except Exception as exc:
+        database = {"status": "unavailable", "error": type(exc).__name__}
+    ready = database["status"] == "ok"
+    return ORJSONResponse(
+        {
+            "status": "ready" if ready else "unavailable",
+            "database": database,
+            "deferred_startup": {"state": deferred_startup.state, "failed": deferred_startup.failed},
+            "timestamp": datetime.utcnow(),
+        },
+        status_code=200 if ready else 503
+    )
+
 @api_router.get("/eulogies", response_model=List[EulogyResponse])
-async def get_public_eulogies():
+async def get_public_eulogies(fields: Optional[FieldSelection] = Depends(eulogy_fields)):
     # Get only active eulogies that haven't expired
     current_time = datetime.utcnow()
-    eulogies = await db.eulogies.find({
+    eulogies = await public_reads.eulogies.find({
         "is_active": True,
         "expires_at": {"$gt": current_time}
-    }).to_list(1000)
+    }, fields.projection if fields else None).to_list(1000)
     
+    if fields:
+        return ORJSONResponse([fields.shape(eulogy) for eulogy in eulogies])
     result = []
     for eulogy in eulogies:
         days_remaining = max(0, (eulogy["expires_at"] - current_time).days)
-        result.append(EulogyResponse(
-            **eulogy,
+        result.append(trusted.load(
+            EulogyResponse,
+            eulogy,
             days_remaining=days_remaining
         ))
     return result
 
 @api_router.get("/eulogies/{eulogy_id}/download")
 async def download_eulogy(eulogy_id: str):
-    eulogy = await db.eulogies.find_one({"id": eulogy_id})
+    eulogy = await public_reads.eulogies.find_one({"id": eulogy_id})
     if not eulogy:
         raise HTTPException(status_code=404, detail="Eulogy not found")
     
@@ -1175,73 +1938,292 @@ async def download_eulogy(eulogy_id: str):
         raise HTTPException(status_code=410, detail="Eulogy has expired or is no longer available")
     
     # Decode base64 file data
-    file_data = base64.b64decode(eulogy["file_data"])
-    
-    # Create a temporary file
-    temp_file = EULOGY_DIR / f"temp_{eulogy_id}_{eulogy['filename']}"
-    with open(temp_file, "wb") as f:
-        f.write(file_data)
-    
-    return FileResponse(
-        path=temp_file,
-        filename=eulogy["filename"],
-        media_type="application/pdf"
-    )
+    file_data = decode_file_data(eulogy["file_data"])
+    
+    return file_download_response(file_data, eulogy["filename"], "application/pdf")
+
+@api_router.get("/images/{filename}")
+async def get_image(filename: str, w: int = 640, format: str = "auto", accept: str = Header("")):
+    if format != "auto" and format not in IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid image format")
+    if w < 1:
+        raise HTTPException(status_code=400, detail="Invalid width")
+    
+    source = image_variants.source(filename)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    image_format = image_variants.negotiate_format(format, accept, source)
+    path = await image_variants.variant(source, image_variants.snap_width(w), image_format)
+    headers = {"Cache-Control": "public, max-age=2592000"}
+    if format == "auto":
+        headers["Vary"] = "Accept"
+    return FileResponse(path, media_type=IMAGE_FORMATS[image_format][1], headers=headers)
+
+@api_router.get("/admin/admission")
+async def get_admission_status(admin_user: User = Depends(get_admin_user)):
+    return {
+        "classes": {name: limiter.snapshot() for name, limiter in admission_limiters.items()},
+        "rate_limits": {path: bucket.snapshot() for path, bucket in rate_limits.items()},
+    }
+
+@api_router.get("/admin/queries")
+async def get_query_stats(
+    limit: int = 20,
+    sort: str = "total_ms",
+    explain: bool = False,
+    admin_user: User = Depends(get_admin_user)
+):
+    if sort not in ("total_ms", "max_ms", "count", "documents", "bytes"):
+        raise HTTPException(status_code=400, detail="Invalid sort field")
+    
+    shapes = []
+    for stats, summary in query_monitor.top_shapes(limit, sort):
+        if explain:
+            summary["plan"] = await explain_shape(db, stats)
+        shapes.append(summary)
+    
+    return {
+        "slow_threshold_ms": query_monitor.slow_ms,
+        "shapes": shapes,
+        "routes": query_monitor.route_summary(),
+    }
+
+@api_router.get("/admin/traces")
+async def get_traces(
+    limit: int = 50,
+    route: Optional[str] = None,
+    min_duration_ms: float = 0,
+    admin_user: User = Depends(get_admin_user)
+):
+    return [trace.summary() for trace in trace_buffer.recent(limit, route, min_duration_ms)]
+
+@api_router.get("/admin/traces/{trace_id}")
+async def get_trace(trace_id: str, admin_user: User = Depends(get_admin_user)):
+    trace = trace_buffer.get(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
+
+@api_router.get("/admin/event-loop")
+async def get_event_loop_stats(limit: int = 20, admin_user: User = Depends(get_admin_user)):
+    lag = loop_monitor.percentiles()
+    return {
+        "lag_ms": {
+            "p50": round(lag[0.5] * 1000, 3),
+            "p95": round(lag[0.95] * 1000, 3),
+            "p99": round(lag[0.99] * 1000, 3),
+            "max": round(lag[1.0] * 1000, 3),
+            "samples": len(loop_monitor.samples),
+        },
+        "debug": loop_monitor.debug,
+        "block_threshold_ms": LOOP_BLOCK_THRESHOLD_MS,
+        "offenders": loop_monitor.worst_offenders(limit),
+    }
+
+@api_router.get("/admin/memory")
+async def get_memory_stats(admin_user: User = Depends(get_admin_user)):
+    return {
+        "tracing": memory_profiler.tracing,
+        "current": memory_profiler.sample(),
+        "peak_rss_bytes": peak_resident_memory_bytes(),
+        "history": list(memory_profiler.history),
+        "request_peaks": memory_profiler.peak_summary(),
+        "snapshots": memory_profiler.snapshot_list(),
+    }
+
+@api_router.post("/admin/memory/snapshots")
+async def take_memory_snapshot(admin_user: User = Depends(get_admin_user)):
+    # Tracing starts with the deferred startup steps
+    await wait_for_deferred_step("memory_profiler")
+    if not memory_profiler.tracing:
+        raise HTTPException(status_code=400, detail="Memory profiling is not enabled (set MEMORY_PROFILING=true)")
+    snapshot_id = await run_in_threadpool(memory_profiler.take_snapshot)
+    return {"message": "Snapshot taken", "id": snapshot_id}
+
+@api_router.get("/admin/memory/diff")
+async def diff_memory_snapshots(
+    base: str,
+    target: str,
+    limit: int = 25,
+    app_only: bool = True,
+    admin_user: User = Depends(get_admin_user)
+):
+    diff = await run_in_threadpool(memory_profiler.diff, base, target, limit, app_only)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return diff
+
+@api_router.delete("/admin/queries")
+async def reset_query_stats(admin_user: User = Depends(get_admin_user)):
+    query_monitor.reset()
+    return {"message": "Query statistics reset"}
 
 # =============================
 # HELPER FUNCTIONS
 # =============================
 
+async def load_student_profile(user: User) -> Optional[StudentResponse]:
+    """A student's own profile, leaving the certificate PDF in the database."""
+    student = await db.students.find_one({"user_id": user.id}, {"certificate.file_data": 0})
+    if not student:
+        return None
+    has_certificate = student.pop("certificate", None) is not None
+    return build_student_response(trusted.load(Student, student), user.username, has_certificate=has_certificate)
+
 async def get_student_response(student: Student) -> StudentResponse:
-    user = await db.users.find_one({"id": student.user_id})
+    with span("student.user_lookup"):
+        user = await db.users.find_one({"id": student.user_id})
     username = user["username"] if user else "unknown"
-    
+    return build_student_response(student, username)
+
+def build_student_response(
+    student: Student,
+    username: str,
+    has_certificate: Optional[bool] = None
+) -> StudentResponse:
+    # has_certificate is passed when the certificate was projected away
     average_score = calculate_average_score(student.academic_record)
-    has_certificate = student.certificate is not None
-    can_download = (
-        has_certificate and
-        average_score is not None and
-        average_score >= 60 and
-        student.finance_record is not None and
-        student.finance_record.is_cleared
+    if has_certificate is None:
+        has_certificate = student.certificate is not None
+    can_download = is_certificate_downloadable(
+        has_certificate,
+        average_score,
+        student.finance_record is not None and student.finance_record.is_cleared
     )
     
-    return StudentResponse(
-        id=student.id,
-        username=username,
-        full_name=student.full_name,
-        id_number=student.id_number,
-        email=student.email,
-        phone=student.phone,
-        parent_contacts=student.parent_contacts,
-        academic_record=student.academic_record,
-        finance_record=student.finance_record,
-        certificate=student.certificate,
-        has_certificate=has_certificate,
-        can_download_certificate=can_download,
-        average_score=average_score
-    )
+    with span("validate.student_response"):
+        return trusted.build(
+            StudentResponse,
+            id=student.id,
+            username=username,
+            full_name=student.full_name,
+            id_number=student.id_number,
+            email=student.email,
+            phone=student.phone,
+            parent_contacts=student.parent_contacts,
+            academic_record=student.academic_record,
+            finance_record=student.finance_record,
+            certificate=student.certificate,
+            has_certificate=has_certificate,
+            can_download_certificate=can_download,
+            average_score=average_score
+        )
 
-# Include the router in the main app
-app.include_router(api_router)
+# =============================
+# ADMISSION CONTROL
+# =============================
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Hashing passwords with bcrypt
+AUTH_ROUTES = {
+    "/api/auth/login",
+    "/api/auth/reset-password",
+    "/api/auth/change-password",
+    "/api/admin/students",
+}
+
+# List endpoints returning up to 1000 documents
+LIST_ROUTES = {
+    "/api/admin/students",
+    "/api/admin/eulogies",
+    "/api/admin/downloads",
+    "/api/admin/notifications",
+    "/api/admin/resources",
+    "/api/downloads",
+    "/api/eulogies",
+    "/api/student/notifications",
+    "/api/student/resources",
+    "/api/student/downloads",
+}
+
+def classify_request(scope) -> Optional[str]:
+    method = scope["method"]
+    path = scope["path"].rstrip("/")
+    if method == "POST":
+        for name, value in scope["headers"]:
+            if name == b"content-type" and value.startswith(b"multipart/form-data"):
+                return "upload"
+        return "auth" if path in AUTH_ROUTES else None
+    if method != "GET":
+        return None
+    if path in LIST_ROUTES:
+        return "list"
+    if (
+        path.endswith("/download")
+        or path.endswith("/bundle")
+        or path.endswith("/attachment")
+        or path == "/api/student/certificate"
+        or path.startswith("/api/downloads/")
+    ):
+        return "download"
+    return None
+
+# =============================
+# METRICS
+# =============================
+
+def threadpool_stats():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return {
+        ("busy",): statistics.borrowed_tokens,
+        ("limit",): limiter.total_tokens,
+        ("waiting",): statistics.tasks_waiting,
+    }
+
+metrics_registry.gauge(
+    "threadpool_threads", "Worker thread pool usage and queue depth",
+    threadpool_stats, ["state"])
+metrics_registry.gauge(
+    "mongo_pool_connections", "MongoDB connections per server: open, in use, and checkouts waiting",
+    pool_monitor.snapshot, ["address", "state"])
+metrics_registry.gauge(
+    "admission_active_requests", "Requests holding an admission slot",
+    lambda: {(name,): limiter.active for name, limiter in admission_limiters.items()}, ["route_class"])
+metrics_registry.gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot",
+    lambda: {(name,): limiter.waiting for name, limiter in admission_limiters.items()}, ["route_class"])
+metrics_registry.gauge(
+    "admission_rejected_requests", "Requests shed by admission control since start",
+    lambda: {(name,): limiter.rejected for name, limiter in admission_limiters.items()}, ["route_class"])
+metrics_registry.gauge(
+    "download_counter_pending", "Download events buffered and not yet flushed",
+    download_counter.pending_total)
+metrics_registry.gauge(
+    "jobs_running", "Background jobs currently running",
+    job_runner.active)
+metrics_registry.gauge(
+    "jobs_queued", "Background jobs waiting for a worker",
+    job_runner.queued)
+metrics_registry.gauge(
+    "audit_log_pending", "Audit events queued and not yet written",
+    audit_log.pending)
+metrics_registry.gauge(
+    "audit_log_written", "Audit events written since start",
+    lambda: audit_log.written)
+metrics_registry.gauge(
+    "audit_log_dropped", "Audit events dropped because the queue was full",
+    lambda: audit_log.dropped)
+metrics_registry.gauge(
+    "log_records_dropped", "Log records dropped because the log queue was full",
+    lambda: log_pipeline.dropped)
+metrics_registry.gauge(
+    "startup_phase_seconds", "Time spent in each startup phase, and from process start to the first response",
+    startup_profile.snapshot, ["phase"])
+
+async def get_metrics():
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Create default admin user on startup
-@app.on_event("startup")
+async def start_log_pipeline():
+    # Installed here rather than at import so importing the app configures
+    # nothing; restarts the writer thread if a previous shutdown stopped it
+    log_pipeline.install()
+
 async def create_default_admin():
     admin_exists = await db.users.find_one({"role": "admin"})
     if not admin_exists:
@@ -1249,12 +2231,144 @@ async def create_default_admin():
             username="admin",
             email="admin@twoem.com",
             role="admin",
-            hashed_password=hash_password("Twoemweb@2020"),
+            hashed_password=await run_in_threadpool(hash_password, "Twoemweb@2020"),
             is_first_login=False
         )
         await db.users.insert_one(admin_user.dict())
         logger.info("Default admin user created: username=admin, password=Twoemweb@2020")
 
-@app.on_event("shutdown")
+async def open_database():
+    # The admin check needs a connection anyway; warming opens the rest alongside it
+    with startup_profile.phase("startup.database"):
+        await asyncio.gather(warm_pool(db, MONGO_WARM_CONNECTIONS), create_default_admin())
+
+async def start_monitors():
+    loop_monitor.start()
+    deferred_startup.schedule()
+
+async def startup():
+    # Timed as one phase: a mark here would also count app construction and
+    # whatever the server did between import and startup
+    with startup_profile.phase("startup"):
+        await start_log_pipeline()
+        await open_database()
+        await start_monitors()
+
+@deferred_startup.step("memory_profiler")
+async def start_memory_profiler():
+    memory_profiler.start()
+
+@deferred_startup.step("image_cache")
+async def load_image_cache():
+    await run_in_threadpool(image_variants.load)
+
+@deferred_startup.step("download_counter")
+async def start_download_counter():
+    await db.download_daily_stats.create_index([("download_id", 1), ("date", 1)], unique=True)
+    download_counter.start(db)
+
+@deferred_startup.step("audit_log")
+async def start_audit_log():
+    await audit_log.ensure_indexes(db)
+    audit_log.start(db)
+
+@deferred_startup.step("job_runner")
+async def start_job_runner():
+    await job_runner.start(db)
+
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await deferred_startup.stop()
+    await job_runner.stop()
+    await download_counter.stop(db)
+    await audit_log.stop(db)
+    await loop_monitor.stop()
+    await memory_profiler.stop()
+    if client is not None:
+        client.close()
+    log_pipeline.stop()
+
+startup_profile.mark("routes")
+
+def create_app() -> FastAPI:
+    """Assemble the ASGI app from the routes and services defined above.
+
+    Startup only does what the first request needs: the log writer, the
+    default admin check and a warm connection pool. Index builds, cache
+    scans and job recovery are deferred steps (see DeferredStartup).
+    """
+    with startup_profile.phase("app"):
+        # Responses are rendered with orjson; a route that needs the stdlib
+        # encoder can pass response_class=JSONResponse.
+        app = FastAPI(default_response_class=ORJSONResponse)
+        app.add_api_route("/metrics", get_metrics, include_in_schema=False)
+        # The /api routes are already built with their prefix and response
+        # class; include_router would build all of them a second time
+        app.router.routes.extend(api_router.routes)
+
+        # The frontend is served for paths no route matched, so the API
+        # keeps its own 404s, 405s and trailing-slash redirects
+        if STATIC_DIR.is_dir():
+            frontend = SinglePageApp(directory=STATIC_DIR)
+
+            @app.exception_handler(StarletteHTTPException)
+            async def serve_frontend(request: Request, exc: StarletteHTTPException):
+                if exc.status_code == 404:
+                    response = await frontend.fallback(request.scope)
+                    if response is not None:
+                        return response
+                return await http_exception_handler(request, exc)
+
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=COMPRESSION_MINIMUM_SIZE,
+            gzip_level=COMPRESSION_GZIP_LEVEL,
+            brotli_quality=COMPRESSION_BROTLI_QUALITY
+        )
+
+        app.add_middleware(
+            AdmissionMiddleware,
+            limiters=admission_limiters,
+            rate_limits=rate_limits,
+            classify=classify_request,
+            trusted_proxies=TRUSTED_PROXY_COUNT
+        )
+
+        app.add_middleware(PeakAllocationMiddleware, profiler=memory_profiler, classify=classify_request)
+
+        app.add_middleware(MetricsMiddleware, classify=classify_request)
+
+        app.add_middleware(
+            TracingMiddleware,
+            buffer=trace_buffer,
+            sample_rate=TRACE_SAMPLE_RATE,
+            force_secret=TRACE_FORCE_SECRET,
+            skip_paths=("/metrics", "/api/admin/traces", "/api/health/ready")
+        )
+
+        app.add_middleware(
+            RequestContextMiddleware,
+            on_complete=[
+                query_monitor.record_request,
+                access_log.record,
+                startup_profile.request_completed,
+                deferred_startup.request_completed,
+            ]
+        )
+
+        app.add_middleware(
+            CORSMiddleware,
+            allow_credentials=True,
+            allow_origins=["*"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=["X-Request-ID"],
+        )
+
+        for directory in (UPLOAD_DIR, EULOGY_DIR, DOWNLOADS_DIR):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        app.add_event_handler("startup", startup)
+        app.add_event_handler("shutdown", shutdown_db_client)
+    return app
+
+app = create_app()
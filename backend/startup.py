@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was exec'd, from /proc; None elsewhere."""
+    try:
+        with open("/proc/self/stat") as stat:
+            # Fields after the parenthesised command name; starttime is field 22 of stat(5)
+            fields = stat.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as uptime:
+            since_boot = float(uptime.read().split()[0])
+        return max(since_boot - int(fields[19]) / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Where the time from process start to the first response went.
+
+    `mark` closes an import-time phase (everything since the previous
+    mark), `phase` times a block of startup work. Time spent before the
+    profile was created (interpreter start, uvicorn's imports) is recorded
+    as the "process" phase where /proc makes it available. A dotted name
+    ("startup.database") is part of the phase named before the dot.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._last = self.origin
+        self.phases: Dict[str, float] = {}
+        self.offset = _process_age()
+        if self.offset is not None:
+            self.phases["process"] = self.offset
+        self.first_response: Optional[float] = None
+
+    def elapsed(self) -> float:
+        """Seconds since process start (or since the profile was created)."""
+        return time.perf_counter() - self.origin + (self.offset or 0.0)
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def snapshot(self) -> Dict[Tuple[str], float]:
+        stats = {(name,): seconds for name, seconds in self.phases.items()}
+        if self.first_response is not None:
+            stats[("first_response",)] = self.first_response
+        return stats
+
+    def request_completed(self, context) -> None:
+        """RequestContextMiddleware callback; logs the breakdown once, on the first response."""
+        if self.first_response is not None:
+            return
+        self.first_response = self.elapsed()
+        logger.info(
+            "First response %.0fms after start", self.first_response * 1000,
+            extra={
+                "first_response_ms": round(self.first_response * 1000, 1),
+                "first_request": context.route,
+                "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            }
+        )
+
+
+class DeferredStartup:
+    """Startup steps that wait until the first response has gone out.
+
+    After a cold start the first request should not queue behind index
+    builds, cache scans and job recovery, so these steps run concurrently
+    once the first response completes, or `delay` seconds after startup if
+    no request comes in first. Routes that depend on a deferred step
+    `await deferred.wait()`.
+    """
+
+    def __init__(self, profile: StartupProfile, delay: float = 5.0):
+        self.profile = profile
+        self.delay = delay
+        self.steps: List[Tuple[str, Callable[[], Awaitable[None]]]] = []
+        self.state = "pending"
+        self.failed: List[str] = []
+        self._done: Optional[asyncio.Event] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def step(self, name: str):
+        def register(fn: Callable[[], Awaitable[None]]):
+            self.steps.append((name, fn))
+            return fn
+        return register
+
+    def schedule(self) -> None:
+        """Arm the fallback timer; called from a startup hook."""
+        self.state = "pending"
+        self.failed = []
+        self._done = asyncio.Event()
+        self._timer = asyncio.get_running_loop().call_later(self.delay, self.trigger)
+
+    def trigger(self) -> None:
+        if self._task is not None or self._done is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._task = asyncio.create_task(self._run())
+
+    def request_completed(self, context) -> None:
+        """RequestContextMiddleware callback starting the steps after the first response."""
+        self.trigger()
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[None]]) -> None:
+        try:
+            with self.profile.phase(f"deferred.{name}"):
+                await step()
+        except Exception:
+            logger.exception("Deferred startup step %s failed", name)
+            self.failed.append(name)
+
+    async def _run(self) -> None:
+        self.state = "running"
+        with self.profile.phase("deferred"):
+            await asyncio.gather(*(self._run_step(name, step) for name, step in self.steps))
+        self.state = "failed" if self.failed else "done"
+        self._done.set()
+        logger.info(
+            "Deferred startup finished in %.0fms", self.profile.phases["deferred"] * 1000,
+            extra={
+                "failed_steps": self.failed,
+                "phases_ms": {
+                    name: round(seconds * 1000, 1)
+                    for name, seconds in self.profile.phases.items() if name.startswith("deferred.")
+                },
+            }
+        )
+
+    async def wait(self) -> None:
+        """Return once the deferred steps have run, starting them now if needed."""
+        if self._done is None:
+            return
+        self.trigger()
+        await self._done.wait()
+
+    async def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._done = None
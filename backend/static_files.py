@@ -0,0 +1,166 @@
+"""Static file serving with precompressed variants and SPA fallback.
+
+Run as a script at build time to write `.br` and `.gz` siblings next to
+compressible assets:
+
+    python static_files.py static
+"""
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from compression import compress_bytes, is_compressible, negotiate_encoding, supported_encodings
+
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+PRECOMPRESS_MINIMUM_SIZE = 1024
+
+# Build tools put a content hash in the name (main.3f2a1b4c.js), so these
+# files never change and can be cached forever
+HASHED_ASSET = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles serving `file.br`/`file.gz` when the client accepts them.
+
+    The build output does not change while the process runs, so the
+    available variants are indexed once instead of probed per request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.variants: Dict[str, Dict[str, os.stat_result]] = {}
+        for directory in self.all_directories:
+            if os.path.isdir(directory):
+                self._index(os.path.realpath(directory))
+
+    def _index(self, directory: str) -> None:
+        for root, _, files in os.walk(directory):
+            names = set(files)
+            for name in files:
+                encodings = {
+                    encoding: os.stat(os.path.join(root, name + suffix))
+                    for encoding, suffix in SUFFIXES.items() if name + suffix in names
+                }
+                if encodings:
+                    self.variants[os.path.join(root, name)] = encodings
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        available = self.variants.get(str(full_path))
+        request_headers = Headers(scope=scope)
+        encoding = None
+        if available:
+            encoding = negotiate_encoding(
+                request_headers.get("accept-encoding", ""),
+                [encoding for encoding in SUFFIXES if encoding in available],
+            )
+        if encoding is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            if available:
+                response.headers["vary"] = "Accept-Encoding"
+        else:
+            media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+            response = FileResponse(
+                str(full_path) + SUFFIXES[encoding],
+                status_code=status_code,
+                media_type=media_type,
+                stat_result=available[encoding],
+            )
+            response.headers["content-encoding"] = encoding
+            response.headers["vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class SinglePageApp(PrecompressedStaticFiles):
+    """Serves a built frontend, falling back to index.html for client routes.
+
+    Hashed assets are cached as immutable, index.html is revalidated on
+    every load so a deploy is picked up, and anything else gets
+    `default_cache`. Unknown paths under `excluded_prefixes` and missing
+    files with an extension still 404; a stale script must not come back
+    as HTML. Files go out through FileResponse, which hands the path to the
+    server (`http.response.pathsend`, sendfile) when it supports that and
+    streams from a worker thread otherwise.
+
+    Use `fallback` from the app's 404 handler rather than mounting this at
+    "/": a mount there fully matches every path, so the router would never
+    get to the partial match that gives /api its trailing-slash redirects
+    and 405s.
+    """
+
+    def __init__(self, directory, index: str = "index.html", excluded_prefixes=("/api/",),
+                 default_cache: str = "public, max-age=3600"):
+        super().__init__(directory=directory)
+        self.index = index
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        self.default_cache = default_cache
+
+    async def get_response(self, path: str, scope):
+        if scope["path"].startswith(self.excluded_prefixes):
+            raise HTTPException(status_code=404)
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or os.path.splitext(path)[1]:
+                raise
+        return await super().get_response(self.index, scope)
+
+    async def fallback(self, scope) -> Optional[Response]:
+        """Response for a GET or HEAD no route matched, or None to keep the 404."""
+        if scope["method"] not in ("GET", "HEAD") or scope["path"].startswith(self.excluded_prefixes):
+            return None
+        try:
+            return await self.get_response(self.get_path(scope), scope)
+        except HTTPException as exc:
+            if exc.status_code != 404:
+                raise
+        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        name = os.path.basename(str(full_path))
+        if name == self.index:
+            response.headers["cache-control"] = "no-cache"
+        elif HASHED_ASSET.search(name):
+            response.headers["cache-control"] = IMMUTABLE_CACHE
+        else:
+            response.headers["cache-control"] = self.default_cache
+        return response
+
+
+def precompress(directory: str, minimum_size: int = PRECOMPRESS_MINIMUM_SIZE) -> int:
+    """Write compressed siblings for compressible files; returns how many were written."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(tuple(SUFFIXES.values())):
+                continue
+            path = os.path.join(root, name)
+            content_type = mimetypes.guess_type(path)[0] or ""
+            if not is_compressible(content_type) or os.path.getsize(path) < minimum_size:
+                continue
+            with open(path, "rb") as source:
+                data = source.read()
+            for encoding in supported_encodings():
+                compressed = compress_bytes(data, encoding)
+                # Not worth a Content-Encoding round trip for a few percent
+                if len(compressed) > len(data) * 0.9:
+                    continue
+                with open(path + SUFFIXES[encoding], "wb") as target:
+                    target.write(compressed)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:] or ["static"]:
+        print(f"{target}: wrote {precompress(target)} precompressed files")
@@ -0,0 +1,609 @@
+import abc
+import copy
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+# Collections the application reads and writes
+COLLECTIONS = (
+    "users",
+    "students",
+    "downloads",
+    "eulogies",
+    "notifications",
+    "student_resources",
+    "password_resets",
+    "wifi_credentials",
+)
+
+READ_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def parse_read_profiles(spec: str, max_staleness: int = -1) -> Dict[str, dict]:
+    """Parse "public=secondaryPreferred:local,student=nearest" into collection options.
+
+    Each profile names a read preference mode and optionally a read concern
+    level. `max_staleness` (seconds, -1 for none) keeps non-primary reads
+    off secondaries lagging further behind than that.
+    """
+    profiles = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        mode, _, level = values.partition(":")
+        if mode.strip() not in READ_MODES:
+            raise ValueError(f"Unknown read preference {mode.strip()!r} for read profile {name.strip()!r}")
+        mode = READ_MODES[mode.strip()]
+        options = {"read_preference": mode() if mode is Primary else mode(max_staleness=max_staleness)}
+        if level.strip():
+            options["read_concern"] = ReadConcern(level.strip())
+        profiles[name.strip()] = options
+    return profiles
+
+
+class Repository(abc.ABC):
+    """Async document repository for one collection.
+
+    This is the subset of the Motor collection API the handlers use, so
+    `MotorRepository` is a thin delegate and `InMemoryRepository` lets the
+    API run (and be benchmarked) without a database server.
+    """
+
+    name: str
+
+    @abc.abstractmethod
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None):
+        """Return a cursor supporting sort(), skip(), limit() and to_list()."""
+        ...
+
+    @abc.abstractmethod
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        ...
+
+    @abc.abstractmethod
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True) -> InsertManyResult:
+        ...
+
+    @abc.abstractmethod
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        ...
+
+    @abc.abstractmethod
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        ...
+
+    @abc.abstractmethod
+    async def delete_one(self, filter: dict) -> DeleteResult:
+        ...
+
+    @abc.abstractmethod
+    async def delete_many(self, filter: dict) -> DeleteResult:
+        ...
+
+    @abc.abstractmethod
+    async def count_documents(self, filter: dict) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def bulk_write(self, requests: list, ordered: bool = True) -> BulkWriteResult:
+        ...
+
+    @abc.abstractmethod
+    async def create_index(self, keys, **kwargs) -> str:
+        ...
+
+
+class MotorRepository(Repository):
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    async def find_one(self, filter=None, projection=None):
+        return await self.collection.find_one(filter, projection)
+
+    def find(self, filter=None, projection=None):
+        return self.collection.find(filter, projection)
+
+    async def insert_one(self, document):
+        return await self.collection.insert_one(document)
+
+    async def insert_many(self, documents, ordered=True):
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+    async def update_one(self, filter, update, upsert=False):
+        return await self.collection.update_one(filter, update, upsert=upsert)
+
+    async def update_many(self, filter, update, upsert=False):
+        return await self.collection.update_many(filter, update, upsert=upsert)
+
+    async def delete_one(self, filter):
+        return await self.collection.delete_one(filter)
+
+    async def delete_many(self, filter):
+        return await self.collection.delete_many(filter)
+
+    async def count_documents(self, filter):
+        return await self.collection.count_documents(filter)
+
+    async def bulk_write(self, requests, ordered=True):
+        return await self.collection.bulk_write(requests, ordered=ordered)
+
+    async def create_index(self, keys, **kwargs):
+        return await self.collection.create_index(keys, **kwargs)
+
+
+class _Database(abc.ABC):
+    """Attribute access to repositories, mirroring `motor_db.<collection>`."""
+
+    def __init__(self):
+        self._repositories: Dict[str, Repository] = {
+            name: self._create_repository(name) for name in COLLECTIONS
+        }
+
+    @abc.abstractmethod
+    def _create_repository(self, name: str) -> Repository:
+        ...
+
+    def __getattr__(self, name: str) -> Repository:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> Repository:
+        repository = self._repositories.get(name)
+        if repository is None:
+            repository = self._repositories[name] = self._create_repository(name)
+        return repository
+
+    def reads(self, profile: str) -> "_Database":
+        """The database as seen by routes using read profile `profile`."""
+        return self
+
+
+class MotorDatabase(_Database):
+    """Repositories over a Motor database.
+
+    `read_profiles` (see `parse_read_profiles`) name read preference and
+    read concern settings. Routes that can serve slightly stale data read
+    through `db.reads(profile)`, which may send them to secondaries; all
+    other reads and every write go to the primary. Unconfigured profiles
+    read from the primary too.
+    """
+
+    def __init__(self, database, read_profiles: Optional[Dict[str, dict]] = None,
+                 collection_options: Optional[dict] = None):
+        self.database = database
+        self.read_profiles = read_profiles or {}
+        self.collection_options = collection_options or {}
+        self._views: Dict[str, MotorDatabase] = {}
+        super().__init__()
+
+    def _create_repository(self, name):
+        return MotorRepository(self.database.get_collection(name, **self.collection_options))
+
+    def reads(self, profile):
+        options = self.read_profiles.get(profile)
+        if options is None:
+            return self
+        view = self._views.get(profile)
+        if view is None:
+            view = self._views[profile] = MotorDatabase(self.database, collection_options=options)
+        return view
+
+    async def command(self, *args, **kwargs):
+        return await self.database.command(*args, **kwargs)
+
+    async def ping(self) -> None:
+        await self.database.command("ping")
+
+
+class InMemoryDatabase(_Database):
+    def _create_repository(self, name):
+        return InMemoryRepository(name)
+
+    async def command(self, *args, **kwargs):
+        raise NotImplementedError("Database commands are not supported by the in-memory backend")
+
+    async def ping(self) -> None:
+        pass
+
+
+# =============================
+# IN-MEMORY IMPLEMENTATION
+# =============================
+
+_MISSING = object()
+
+
+def _get_path(document: dict, path: str):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set_path(document: dict, path: str, value) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        child = document.get(part)
+        if not isinstance(child, dict):
+            child = document[part] = {}
+        document = child
+    document[parts[-1]] = value
+
+
+def _unset_path(document: dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def _compare(value, other, op) -> bool:
+    try:
+        return op(value, other)
+    except TypeError:
+        return False
+
+
+def _candidates(value) -> list:
+    # Conditions on an array field match if any element matches
+    return value if isinstance(value, list) else [value]
+
+
+def _match_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        return all(_match_operator(value, op, argument) for op, argument in condition.items())
+    if value is _MISSING:
+        return condition is None
+    if isinstance(condition, re.Pattern):
+        return any(isinstance(item, str) and condition.search(item) for item in _candidates(value))
+    return value == condition or (isinstance(value, list) and condition in value)
+
+
+def _match_operator(value, op: str, argument) -> bool:
+    if op == "$eq":
+        return _match_condition(value, argument)
+    if op == "$ne":
+        return not _match_condition(value, argument)
+    if op == "$in":
+        return any(_match_condition(value, item) for item in argument)
+    if op == "$nin":
+        return not any(_match_condition(value, item) for item in argument)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(argument)
+    if op == "$regex":
+        return _match_condition(value, re.compile(argument))
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        if value is _MISSING:
+            return False
+        compare = {
+            "$gt": lambda a, b: a > b,
+            "$gte": lambda a, b: a >= b,
+            "$lt": lambda a, b: a < b,
+            "$lte": lambda a, b: a <= b,
+        }[op]
+        return any(_compare(item, argument, compare) for item in _candidates(value))
+    if op == "$not":
+        return not _match_condition(value, argument)
+    raise NotImplementedError(f"Query operator {op} is not supported by the in-memory backend")
+
+
+def matches(document: dict, filter: Optional[dict]) -> bool:
+    for key, condition in (filter or {}).items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, clause) for clause in condition):
+                return False
+        elif not _match_condition(_get_path(document, key), condition):
+            return False
+    return True
+
+
+def project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        result = {}
+        for path in fields:
+            value = _get_path(document, path)
+            if value is not _MISSING:
+                _set_path(result, path, copy.deepcopy(value))
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    result = copy.deepcopy(document)
+    for path in fields:
+        _unset_path(result, path)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def apply_update(document: dict, update: dict, inserting: bool = False) -> None:
+    if not any(key.startswith("$") for key in update):
+        # Replacement document
+        preserved_id = document.get("_id")
+        document.clear()
+        document.update(copy.deepcopy(update))
+        if preserved_id is not None:
+            document["_id"] = preserved_id
+        return
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            if op in ("$set", "$setOnInsert"):
+                _set_path(document, path, copy.deepcopy(value))
+            elif op == "$inc":
+                current = _get_path(document, path)
+                _set_path(document, path, (0 if current is _MISSING else current) + value)
+            elif op == "$unset":
+                _unset_path(document, path)
+            elif op == "$push":
+                current = _get_path(document, path)
+                items = list(current) if isinstance(current, list) else []
+                items.extend(value["$each"] if isinstance(value, dict) and "$each" in value else [value])
+                _set_path(document, path, copy.deepcopy(items))
+            elif op == "$addToSet":
+                current = _get_path(document, path)
+                items = list(current) if isinstance(current, list) else []
+                for item in (value["$each"] if isinstance(value, dict) and "$each" in value else [value]):
+                    if item not in items:
+                        items.append(copy.deepcopy(item))
+                _set_path(document, path, items)
+            elif op == "$max":
+                current = _get_path(document, path)
+                # Compared in BSON order, so null and missing fields lose to any value
+                if _sort_key(value) > _sort_key(current):
+                    _set_path(document, path, value)
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the in-memory backend")
+
+
+def _sort_key(value):
+    # Mongo orders missing/None first, then numbers, strings, dates
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (4, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value)
+    return (5, str(value))
+
+
+class InMemoryCursor:
+    def __init__(self, documents: List[dict], projection: Optional[dict]):
+        self._documents = documents
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: int = 1) -> "InMemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, count: int) -> "InMemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        self._limit = count
+        return self
+
+    def _results(self, length: Optional[int] = None) -> List[dict]:
+        documents = self._documents
+        for key, direction in reversed(self._sort):
+            documents = sorted(
+                documents,
+                key=lambda document: _sort_key(_get_path(document, key)),
+                reverse=direction < 0
+            )
+        documents = documents[self._skip:]
+        for bound in (self._limit, length):
+            if bound:
+                documents = documents[:bound]
+        return [project(document, self._projection) for document in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return self._results(length)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._results():
+            yield document
+
+
+class InMemoryRepository(Repository):
+    """Repository keeping documents in a dict, for tests and benchmarks.
+
+    Supports the query and update operators the application uses; documents
+    are copied on the way in and out, like a round trip through BSON.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._documents: Dict[Any, dict] = {}
+        self._unique_indexes: List[Tuple[str, ...]] = []
+
+    def _matching(self, filter) -> List[dict]:
+        return [document for document in self._documents.values() if matches(document, filter)]
+
+    def _check_unique(self, document: dict, ignore=None) -> None:
+        for fields in self._unique_indexes:
+            key = tuple(_get_path(document, field) for field in fields)
+            for other in self._documents.values():
+                if other is not ignore and tuple(_get_path(other, field) for field in fields) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+
+    def _insert(self, document: dict) -> Any:
+        if "_id" not in document:
+            # pymongo adds the generated _id to the caller's document too
+            document["_id"] = ObjectId()
+        stored = copy.deepcopy(document)
+        if stored["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._check_unique(stored)
+        self._documents[stored["_id"]] = stored
+        return stored["_id"]
+
+    async def find_one(self, filter=None, projection=None):
+        for document in self._documents.values():
+            if matches(document, filter):
+                return project(document, projection)
+        return None
+
+    def find(self, filter=None, projection=None):
+        return InMemoryCursor(self._matching(filter), projection)
+
+    async def insert_one(self, document):
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents, ordered=True):
+        result = self._bulk_result()
+        inserted = []
+        for index, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as exc:
+                self._write_error(result, index, exc, document)
+                if ordered:
+                    # An ordered write stops at its first error, like the server
+                    break
+        result["nInserted"] = len(inserted)
+        self._raise_write_errors(result)
+        return InsertManyResult(inserted, True)
+
+    def _update(self, filter, update, upsert, multi) -> dict:
+        targets = self._matching(filter)
+        if not multi:
+            targets = targets[:1]
+        for document in targets:
+            # Update a copy so a duplicate key leaves the stored document as it was
+            updated = copy.deepcopy(document)
+            apply_update(updated, update)
+            self._check_unique(updated, ignore=document)
+            self._documents[document["_id"]] = updated
+        result = {"n": len(targets), "nModified": len(targets)}
+        if not targets and upsert:
+            document = {key: copy.deepcopy(value) for key, value in (filter or {}).items()
+                        if not key.startswith("$") and not isinstance(value, dict)}
+            apply_update(document, update, inserting=True)
+            result["upserted"] = self._insert(document)
+            result["n"] = 1
+        return result
+
+    async def update_one(self, filter, update, upsert=False):
+        return UpdateResult(self._update(filter, update, upsert, multi=False), True)
+
+    async def update_many(self, filter, update, upsert=False):
+        return UpdateResult(self._update(filter, update, upsert, multi=True), True)
+
+    def _delete(self, filter, multi) -> int:
+        targets = self._matching(filter)
+        if not multi:
+            targets = targets[:1]
+        for document in targets:
+            del self._documents[document["_id"]]
+        return len(targets)
+
+    async def delete_one(self, filter):
+        return DeleteResult({"n": self._delete(filter, multi=False)}, True)
+
+    async def delete_many(self, filter):
+        return DeleteResult({"n": self._delete(filter, multi=True)}, True)
+
+    async def count_documents(self, filter):
+        return len(self._matching(filter))
+
+    @staticmethod
+    def _bulk_result() -> dict:
+        return {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0,
+                "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+
+    @staticmethod
+    def _write_error(result: dict, index: int, exc: DuplicateKeyError, op) -> None:
+        result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(exc), "op": op})
+
+    @staticmethod
+    def _raise_write_errors(result: dict) -> None:
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+
+    async def bulk_write(self, requests, ordered=True):
+        result = self._bulk_result()
+        for index, request in enumerate(requests):
+            try:
+                self._bulk_operation(result, index, request)
+            except DuplicateKeyError as exc:
+                self._write_error(result, index, exc, request)
+                if ordered:
+                    break
+        self._raise_write_errors(result)
+        return BulkWriteResult(result, True)
+
+    def _bulk_operation(self, result: dict, index: int, request) -> None:
+        if isinstance(request, InsertOne):
+            self._insert(request._doc)
+            result["nInserted"] += 1
+        elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+            outcome = self._update(request._filter, request._doc, request._upsert,
+                                   multi=isinstance(request, UpdateMany))
+            if "upserted" in outcome:
+                result["nUpserted"] += 1
+                result["upserted"].append({"index": index, "_id": outcome["upserted"]})
+            else:
+                result["nMatched"] += outcome["n"]
+                result["nModified"] += outcome["nModified"]
+        elif isinstance(request, (DeleteOne, DeleteMany)):
+            result["nRemoved"] += self._delete(request._filter, multi=isinstance(request, DeleteMany))
+        else:
+            raise NotImplementedError(f"Bulk operation {type(request).__name__} is not supported")
+
+    async def create_index(self, keys, unique: bool = False, **kwargs):
+        fields = (keys,) if isinstance(keys, str) else tuple(key for key, _ in keys)
+        if unique and fields not in self._unique_indexes:
+            self._unique_indexes.append(fields)
+        return kwargs.get("name") or "_".join(f"{field}_1" for field in fields)
@@ -0,0 +1,148 @@
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+
+from request_context import RequestContext, get_request_context
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        context = get_request_context()
+        if context is not None:
+            entry["request_id"] = context.request_id
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    # put_nowait on a full queue would raise into handleError; count and drop instead
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Root logging through a bounded queue drained by a background thread.
+
+    Records are formatted where they are logged, so the JSON carries the
+    request id of the request that logged it, then handed to a
+    QueueListener thread that does the actual write. Logging from the event
+    loop never waits on the terminal or a log shipper; if the writer falls
+    `max_queue` records behind, new records are dropped and counted.
+    """
+
+    def __init__(self, level: str = "INFO", json_format: bool = True, max_queue: int = 10000, stream=None):
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.handler = _DroppingQueueHandler(self.queue)
+        self.handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(logging.Formatter("%(message)s"))
+        self.listener = QueueListener(self.queue, output)
+        self.level = level
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def install(self) -> None:
+        """Route the root logger, and uvicorn's loggers, through the queue.
+
+        Called on startup. Logging configured by someone else (uvicorn
+        --log-config, pytest's capture handlers) is left as it is.
+        """
+        root = logging.getLogger()
+        if self.handler in root.handlers:
+            self.start()
+            return
+        if root.handlers:
+            return
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        for name in ("uvicorn", "uvicorn.error"):
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers.clear()
+            uvicorn_logger.propagate = True
+        # Superseded by AccessLog, which knows the route, user and request id
+        logging.getLogger("uvicorn.access").disabled = True
+        self.start()
+
+    def start(self) -> None:
+        if self.listener._thread is None:
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Write out everything queued and stop the writer thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+class AccessLog:
+    """One structured log line per request, passed to RequestContextMiddleware.
+
+    Failed (4xx/5xx) and slow requests are always logged; fast successful
+    ones are sampled at `sample_rate`, which each line records so counts
+    can be scaled back up.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, slow_ms: float = 1000.0,
+                 logger: Optional[logging.Logger] = None):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.logger = logger or logging.getLogger("access")
+
+    def record(self, context: RequestContext) -> None:
+        status = context.status or 500
+        duration_ms = (context.duration or 0.0) * 1000
+        sampled = status < 400 and duration_ms < self.slow_ms
+        if sampled and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        scope = context.scope
+        client = scope.get("client")
+        self.logger.info(
+            "%s %s %d %.1fms", context.method, scope["path"], status, duration_ms,
+            extra={
+                "request_id": context.request_id,
+                "method": context.method,
+                "route": context.route,
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "user_role": context.user_role,
+                "client": client[0] if client else None,
+                "queries": context.query_count,
+                "query_ms": round(context.query_time, 2),
+                "trace_id": context.trace.trace_id if context.trace is not None else None,
+                "sample_rate": self.sample_rate if sampled else 1.0,
+            }
+        )
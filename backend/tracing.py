@@ -0,0 +1,248 @@
+import functools
+import hmac
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from fastapi.routing import APIRoute
+
+from request_context import get_request_context
+
+# Nesting depth of the innermost open span, used to indent the waterfall
+_span_depth: ContextVar[int] = ContextVar("span_depth", default=0)
+
+_NOOP_SPAN = nullcontext()
+
+
+class Trace:
+    __slots__ = ("trace_id", "method", "path", "route", "status", "started_at",
+                 "duration_ms", "spans", "dropped_spans", "max_spans", "endpoint_end", "_t0", "_lock")
+
+    def __init__(self, method: str, path: str, max_spans: int = 500):
+        self.trace_id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.route = None
+        self.status = None
+        self.started_at = datetime.utcnow()
+        self.duration_ms = None
+        self.spans = []
+        self.dropped_spans = 0
+        self.max_spans = max_spans
+        self.endpoint_end = None
+        self._t0 = time.perf_counter()
+        # Mongo spans are recorded from Motor's executor threads
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, duration: float, depth: int, attrs: dict) -> None:
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped_spans += 1
+                return
+            self.spans.append((name, start, duration, depth, attrs))
+
+    def finish(self, route: str, status: int) -> None:
+        self.route = route
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "span_count": len(self.spans),
+        }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item[1])
+        return {
+            **self.summary(),
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - self._t0) * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                    "depth": depth,
+                    **({"attrs": attrs} if attrs else {}),
+                }
+                for name, start, duration, depth, attrs in spans
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start", "depth", "token")
+
+    def __init__(self, trace: Trace, name: str, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.depth = _span_depth.get()
+        self.token = _span_depth.set(self.depth + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _span_depth.reset(self.token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.add_span(self.name, self.start, duration, self.depth, self.attrs)
+        return False
+
+
+def current_trace() -> Optional[Trace]:
+    context = get_request_context()
+    return context.trace if context is not None else None
+
+
+def span(name: str, **attrs):
+    """Time a block as a span of the current request's trace (no-op if unsampled)."""
+    trace = current_trace()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name, attrs)
+
+
+def record_span(name: str, start: float, duration: float, **attrs) -> None:
+    """Record an already-timed span, e.g. from a pymongo command listener."""
+    trace = current_trace()
+    if trace is not None:
+        trace.add_span(name, start, duration, _span_depth.get(), attrs)
+
+
+class TraceBuffer:
+    """Bounded ring buffer of completed traces, newest last."""
+
+    def __init__(self, size: int = 100):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+    def recent(self, limit: int = 50, route: Optional[str] = None, min_duration_ms: float = 0) -> list:
+        with self._lock:
+            traces = list(self._traces)
+        matching = [
+            trace for trace in reversed(traces)
+            if (route is None or trace.route == route) and (trace.duration_ms or 0) >= min_duration_ms
+        ]
+        return matching[:limit]
+
+
+class TracingMiddleware:
+    """ASGI middleware sampling requests into the trace buffer.
+
+    Must run inside RequestContextMiddleware. When `force_secret` is set, a
+    request sending it as `X-Trace` is always sampled; otherwise the header
+    is ignored, so anonymous clients cannot fill the buffer. Sampled
+    responses carry an `X-Trace-Id` header.
+    """
+
+    def __init__(self, app, buffer: TraceBuffer, sample_rate: float = 0.01, skip_paths=(),
+                 force_secret: Optional[str] = None):
+        self.app = app
+        self.buffer = buffer
+        self.sample_rate = sample_rate
+        self.skip_paths = set(skip_paths)
+        self.force_secret = force_secret.encode("latin-1") if force_secret else None
+
+    def _sampled(self, scope) -> bool:
+        if scope["path"] in self.skip_paths:
+            return False
+        if self.force_secret is not None:
+            for name, value in scope["headers"]:
+                if name == b"x-trace" and hmac.compare_digest(value, self.force_secret):
+                    return True
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        context = get_request_context()
+        if scope["type"] != "http" or context is None or not self._sampled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace = context.trace = Trace(scope["method"], scope["path"])
+        status = 500
+
+        async def traced_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-trace-id", trace.trace_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            trace.finish(context.route, status)
+            self.buffer.append(trace)
+
+
+class TracedRoute(APIRoute):
+    """APIRoute adding `endpoint` and `serialize` spans to sampled traces.
+
+    `serialize` covers response_model validation and JSON rendering, i.e.
+    everything between the endpoint returning and the response being built.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, self._trace_endpoint(endpoint), **kwargs)
+
+    @staticmethod
+    def _trace_endpoint(endpoint):
+        # include_router re-creates routes from already wrapped endpoints
+        if getattr(endpoint, "_traced", False):
+            return endpoint
+
+        @functools.wraps(endpoint)
+        async def traced_endpoint(*args, **kwargs):
+            trace = current_trace()
+            if trace is None:
+                return await endpoint(*args, **kwargs)
+            with _Span(trace, "endpoint", {}):
+                result = await endpoint(*args, **kwargs)
+            trace.endpoint_end = time.perf_counter()
+            return result
+
+        traced_endpoint._traced = True
+        return traced_endpoint
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            response = await handler(request)
+            trace = current_trace()
+            if trace is not None and trace.endpoint_end is not None:
+                record_span("serialize", trace.endpoint_end, time.perf_counter() - trace.endpoint_end)
+                trace.endpoint_end = None
+            return response
+
+        return traced_handler
@@ -0,0 +1,96 @@
+import typing
+from typing import Dict, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, EmailStr
+
+M = TypeVar("M", bound=BaseModel)
+
+# (field name, nested model, is a list of that model)
+_NestedField = Tuple[str, Type[BaseModel], bool]
+
+
+def _is_email(annotation) -> bool:
+    return annotation is EmailStr or any(_is_email(arg) for arg in typing.get_args(annotation))
+
+
+def _nested_model(annotation) -> Optional[Tuple[Type[BaseModel], bool]]:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _nested_model(args[0]) if len(args) == 1 else None
+    if origin in (list, List):
+        args = typing.get_args(annotation)
+        nested = _nested_model(args[0]) if args else None
+        return (nested[0], True) if nested and not nested[1] else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None
+
+
+class TrustedModelLoader:
+    """Builds models from documents that were validated when written.
+
+    Everything in the database went through a Pydantic model on the way
+    in, so reads can skip validating it again and use `model_construct`,
+    which only fills in defaults. Nested models are built recursively so
+    attribute access keeps working.
+
+    That only pays off where validation is expensive: models with nested
+    models or email fields (email-validator runs in Python). Flat models of
+    plain types validate faster in pydantic-core than `model_construct`
+    can build them, so those are still validated. With `strict` on every
+    model is validated, which helps when chasing data that does not match
+    the models.
+    """
+
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        self._plans: Dict[type, Optional[List[_NestedField]]] = {}
+
+    def _plan(self, model: Type[BaseModel]) -> Optional[List[_NestedField]]:
+        """Nested fields to build, or None when validating is cheaper."""
+        if model in self._plans:
+            return self._plans[model]
+        plan, costly = [], False
+        for name, field in model.model_fields.items():
+            nested = _nested_model(field.annotation)
+            if nested is not None:
+                plan.append((name, nested[0], nested[1]))
+                costly = True
+            elif _is_email(field.annotation):
+                costly = True
+        self._plans[model] = plan if costly else None
+        return self._plans[model]
+
+    def _construct(self, model: Type[M], values: dict) -> M:
+        plan = self._plan(model)
+        if plan is None:
+            return model.model_validate(values)
+        for name, nested, many in plan:
+            value = values.get(name)
+            if value is None:
+                continue
+            if many:
+                values[name] = [
+                    item if isinstance(item, nested) else self._construct(nested, dict(item))
+                    for item in value
+                ]
+            elif not isinstance(value, nested):
+                values[name] = self._construct(nested, dict(value))
+        return model.model_construct(**values)
+
+    def load(self, model: Type[M], document: dict, **overrides) -> M:
+        """Build `model` from a stored document plus computed fields."""
+        values = {**document, **overrides}
+        if self.strict:
+            return model.model_validate(values)
+        return self._construct(model, values)
+
+    def load_many(self, model: Type[M], documents: Iterable[dict]) -> List[M]:
+        return [self.load(model, document) for document in documents]
+
+    def build(self, model: Type[M], **values) -> M:
+        """Build `model` from values that are already model instances or trusted data."""
+        if self.strict:
+            return model.model_validate(values)
+        return self._construct(model, values)
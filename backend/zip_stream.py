@@ -0,0 +1,83 @@
+import mimetypes
+import posixpath
+import zipfile
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Tuple
+
+import anyio.to_thread
+
+from compression import is_compressible
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Sink:
+    """Write-only file object holding what ZipFile wrote until it is drained.
+
+    It has no `tell`/`seek`, so ZipFile treats it as a pipe and writes each
+    entry's sizes and CRC in a data descriptor after its data instead of
+    seeking back to the local header.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _safe_name(name: str) -> str:
+    # No absolute paths or ".." segments that would unpack outside the target folder
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return "/".join(parts) or "file"
+
+
+def _unique(name: str, taken: set) -> str:
+    stem, extension = posixpath.splitext(name)
+    candidate, number = name, 1
+    while candidate in taken:
+        number += 1
+        candidate = f"{stem} ({number}){extension}"
+    taken.add(candidate)
+    return candidate
+
+
+async def stream_zip(entries: AsyncIterable[Tuple[str, int, Iterable[bytes]]]) -> AsyncIterator[bytes]:
+    """Build a ZIP archive on the fly from `(name, size, chunks)` entries.
+
+    Bytes are yielded as each chunk is written, so memory use is one chunk
+    plus whatever the caller holds for the current entry, however large the
+    archive gets. Files that are already compressed (PDFs, images, archives)
+    are stored as is; the rest are deflated in a worker thread. Names are
+    kept inside the archive root and repeats get a " (2)" suffix.
+    """
+    sink = _Sink()
+    taken = set()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        async for name, size, chunks in entries:
+            info = zipfile.ZipInfo(_unique(_safe_name(name), taken), date_time=datetime.now().timetuple()[:6])
+            info.file_size = size
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            deflate = is_compressible(media_type)
+            info.compress_type = zipfile.ZIP_DEFLATED if deflate else zipfile.ZIP_STORED
+            with archive.open(info, mode="w") as entry:
+                for chunk in chunks:
+                    if deflate:
+                        await anyio.to_thread.run_sync(entry.write, chunk)
+                    else:
+                        entry.write(chunk)
+                    if sink.chunks:
+                        yield sink.drain()
+            # Data descriptor
+            yield sink.drain()
+    # Central directory, written when the archive closes
+    yield sink.drain()
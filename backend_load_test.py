@@ -0,0 +1,417 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+ADMIN_CREDENTIALS = {"username": "admin", "password": "Twoemweb@2020"}
+
+# Relative weights of the virtual-user scenarios
+DEFAULT_MIX = {"admin": 1, "student": 6, "public": 3}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = defaultdict(int)
+        self.bytes = 0
+
+    def record(self, status, elapsed, size, ok):
+        self.latencies.append(elapsed)
+        self.statuses[status] += 1
+        self.bytes += size
+        if not ok:
+            self.errors += 1
+
+
+class TwoemLoadTester:
+    """Replays the TwoemAPITester flows concurrently and reports latency.
+
+    Each virtual user repeatedly runs one scenario picked by weight: an
+    admin listing and opening students, a student opening the dashboard
+    and downloading a resource, or the public browsing eulogies and
+    downloads. All virtual users share one pooled HTTP client.
+    """
+
+    def __init__(self, base_url, concurrency=10, duration=30.0, students=10, mix=None, timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.duration = duration
+        self.student_count = students
+        self.mix = mix or DEFAULT_MIX
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self.stats = defaultdict(EndpointStats)
+        self.admin_headers = None
+        self.students = []
+        self.student_ids = []
+        self.resource_ids = []
+        self.download_ids = []
+        self.eulogy_ids = []
+        self.iterations = defaultdict(int)
+
+    async def request(self, name, method, url, expected=200, record=True, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            if record:
+                self.stats[name].record(type(e).__name__, time.perf_counter() - start, 0, False)
+            return None
+        if record:
+            self.stats[name].record(
+                response.status_code, time.perf_counter() - start,
+                len(response.content), response.status_code == expected
+            )
+        return response
+
+    async def login(self, credentials):
+        # Login is rate limited per client; wait out 429s during setup
+        for _ in range(10):
+            response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                          record=False, json=credentials)
+            if response is not None and response.status_code == 429:
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                continue
+            if response is None or response.status_code != 200:
+                raise RuntimeError(f"Login failed for {credentials['username']}")
+            return {"Authorization": f"Bearer {response.json()['access_token']}"}
+        raise RuntimeError(f"Login for {credentials['username']} kept being rate limited")
+
+    # =============================
+    # SETUP / TEARDOWN
+    # =============================
+
+    async def setup(self):
+        print("\n===== Preparing load test data =====")
+        self.admin_headers = await self.login(ADMIN_CREDENTIALS)
+        run_id = int(time.time())
+
+        for i in range(self.student_count):
+            credentials = {"username": f"loadstudent_{run_id}_{i}", "password": "Load@123"}
+            response = await self.request(
+                "setup", "POST", "/api/admin/students", record=False, headers=self.admin_headers,
+                json={**credentials, "full_name": f"Load Student {i}", "id_number": f"LOAD{run_id}{i}"}
+            )
+            if response is None or response.status_code != 200:
+                raise RuntimeError("Could not create load test students")
+            self.student_ids.append(response.json()["id"])
+            await self.request(
+                "setup", "PUT", f"/api/admin/students/{self.student_ids[-1]}/academic", record=False,
+                headers=self.admin_headers,
+                json={"ms_word": random.randint(40, 100), "ms_excel": random.randint(40, 100)}
+            )
+            self.students.append(credentials)
+
+        pdf = b"%PDF-1.4\n" + os.urandom(200_000)
+        for i in range(3):
+            response = await self.request(
+                "setup", "POST", "/api/admin/resources", record=False, headers=self.admin_headers,
+                data={"title": f"Load Resource {i}", "subject": "ms_word"},
+                files={"file": (f"load_resource_{i}.pdf", pdf, "application/pdf")}
+            )
+            self.resource_ids.append(response.json()["id"])
+            response = await self.request(
+                "setup", "POST", "/api/admin/downloads", record=False, headers=self.admin_headers,
+                data={"title": f"Load Download {i}", "file_type": "public"},
+                files={"file": (f"load_download_{i}.pdf", pdf, "application/pdf")}
+            )
+            self.download_ids.append(response.json()["id"])
+            response = await self.request(
+                "setup", "POST", "/api/admin/eulogies", record=False, headers=self.admin_headers,
+                data={"title": f"Load Eulogy {i}"},
+                files={"file": (f"load_eulogy_{i}.pdf", pdf, "application/pdf")}
+            )
+            self.eulogy_ids.append(response.json()["id"])
+
+        await self.request("setup", "POST", "/api/admin/notifications", record=False, headers=self.admin_headers,
+                           data={"title": "Load test notice", "content": "<p>" + "lorem ipsum " * 200 + "</p>"})
+        await self.request("setup", "POST", "/api/admin/wifi", record=False, headers=self.admin_headers,
+                           json={"network_name": "TWOEM", "password": "load", "connection_guide": "Connect"})
+
+        self.students = [(credentials, await self.login(credentials)) for credentials in self.students]
+        print(f"✅ Created {len(self.student_ids)} students, {len(self.resource_ids)} resources, "
+              f"{len(self.download_ids)} downloads and {len(self.eulogy_ids)} eulogies")
+
+    async def teardown(self):
+        print("\n===== Cleaning up load test data =====")
+        for student_id in self.student_ids:
+            await self.request("teardown", "DELETE", f"/api/admin/students/{student_id}",
+                               record=False, headers=self.admin_headers)
+        for resource_id in self.resource_ids:
+            await self.request("teardown", "DELETE", f"/api/admin/resources/{resource_id}",
+                               record=False, headers=self.admin_headers)
+        for download_id in self.download_ids:
+            await self.request("teardown", "DELETE", f"/api/admin/downloads/{download_id}",
+                               record=False, headers=self.admin_headers)
+        for eulogy_id in self.eulogy_ids:
+            await self.request("teardown", "DELETE", f"/api/admin/eulogies/{eulogy_id}",
+                               record=False, headers=self.admin_headers)
+        await self.client.aclose()
+
+    # =============================
+    # SCENARIOS
+    # =============================
+
+    async def admin_scenario(self):
+        headers = self.admin_headers
+        await self.request("GET /api/admin/students", "GET", "/api/admin/students", headers=headers)
+        student_id = random.choice(self.student_ids)
+        await self.request("GET /api/admin/students/{student_id}", "GET",
+                           f"/api/admin/students/{student_id}", headers=headers)
+        await self.request("GET /api/admin/notifications", "GET", "/api/admin/notifications", headers=headers)
+        await self.request("GET /api/admin/downloads", "GET", "/api/admin/downloads", headers=headers)
+
+    async def student_scenario(self):
+        _, headers = random.choice(self.students)
+        for path in ("/api/student/profile", "/api/student/notifications", "/api/student/resources",
+                     "/api/student/downloads", "/api/student/wifi"):
+            await self.request(f"GET {path}", "GET", path, headers=headers)
+        resource_id = random.choice(self.resource_ids)
+        await self.request("GET /api/student/resources/{resource_id}/download", "GET",
+                           f"/api/student/resources/{resource_id}/download", headers=headers)
+
+    async def public_scenario(self):
+        await self.request("GET /api/eulogies", "GET", "/api/eulogies")
+        eulogy_id = random.choice(self.eulogy_ids)
+        await self.request("GET /api/eulogies/{eulogy_id}/download", "GET", f"/api/eulogies/{eulogy_id}/download")
+        await self.request("GET /api/downloads", "GET", "/api/downloads")
+        download_id = random.choice(self.download_ids)
+        await self.request("GET /api/downloads/{download_id}", "GET", f"/api/downloads/{download_id}")
+
+    async def virtual_user(self, deadline):
+        scenarios = {
+            "admin": self.admin_scenario,
+            "student": self.student_scenario,
+            "public": self.public_scenario,
+        }
+        names = [name for name in self.mix if self.mix[name] > 0]
+        weights = [self.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            await scenarios[name]()
+            self.iterations[name] += 1
+
+    async def run(self):
+        await self.setup()
+        print(f"\n===== Running {self.concurrency} virtual users for {self.duration:.0f}s =====")
+        start = time.perf_counter()
+        deadline = start + self.duration
+        try:
+            await asyncio.gather(*(self.virtual_user(deadline) for _ in range(self.concurrency)))
+        finally:
+            self.elapsed = time.perf_counter() - start
+            await self.teardown()
+
+    # =============================
+    # REPORTING
+    # =============================
+
+    def summary(self):
+        endpoints = {}
+        for name, stats in sorted(self.stats.items()):
+            latencies = sorted(stats.latencies)
+            count = len(latencies)
+            endpoints[name] = {
+                "requests": count,
+                "throughput_rps": round(count / self.elapsed, 2),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+                "error_rate": round(stats.errors / count, 4) if count else 0.0,
+                "statuses": {str(status): n for status, n in stats.statuses.items()},
+                "bytes": stats.bytes,
+            }
+        total = sum(item["requests"] for item in endpoints.values())
+        errors = sum(stats.errors for stats in self.stats.values())
+        return {
+            "base_url": self.base_url,
+            "concurrency": self.concurrency,
+            "duration_s": round(self.elapsed, 2),
+            "iterations": dict(self.iterations),
+            "total_requests": total,
+            "throughput_rps": round(total / self.elapsed, 2),
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+        }
+
+    def print_report(self, summary):
+        print(f"\n📊 {summary['total_requests']} requests in {summary['duration_s']}s "
+              f"({summary['throughput_rps']} req/s, error rate {summary['error_rate']:.2%})")
+        header = f"{'endpoint':<52} {'reqs':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        print(header)
+        print("-" * len(header))
+        for name, item in summary["endpoints"].items():
+            print(f"{name:<52} {item['requests']:>6} {item['throughput_rps']:>8} {item['p50_ms']:>8} "
+                  f"{item['p95_ms']:>8} {item['p99_ms']:>8} {item['error_rate']:>7.2%}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_replica_set(members=3):
+    """Start a throwaway replica set of local mongod processes; returns (processes, data_dir, url)."""
+    mongod = shutil.which("mongod")
+    if mongod is None:
+        raise RuntimeError("mongod not found on PATH")
+    data_dir = tempfile.mkdtemp(prefix="twoem-rs-")
+    ports = [free_port() for _ in range(members)]
+    processes = []
+    for index, port in enumerate(ports):
+        path = os.path.join(data_dir, str(index))
+        os.makedirs(path)
+        processes.append(subprocess.Popen(
+            [mongod, "--replSet", "rs0", "--port", str(port), "--bind_ip", "127.0.0.1",
+             "--dbpath", path, "--logpath", os.path.join(path, "mongod.log")]
+        ))
+
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    seed = MongoClient("127.0.0.1", ports[0], directConnection=True, serverSelectionTimeoutMS=30000)
+    seed.admin.command("replSetInitiate", {
+        "_id": "rs0",
+        "members": [{"_id": index, "host": f"127.0.0.1:{port}"} for index, port in enumerate(ports)],
+    })
+    url = "mongodb://" + ",".join(f"127.0.0.1:{port}" for port in ports) + "/?replicaSet=rs0"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            status = seed.admin.command("replSetGetStatus")
+            states = [member["stateStr"] for member in status["members"]]
+            if states.count("PRIMARY") == 1 and states.count("SECONDARY") == members - 1:
+                seed.close()
+                return processes, data_dir, url
+        except PyMongoError:
+            pass
+        time.sleep(0.5)
+    stop_replica_set(processes, data_dir)
+    raise RuntimeError("Replica set did not elect a primary within 60s")
+
+
+def stop_replica_set(processes, data_dir):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def start_local_server(storage, port, mongo_url=None):
+    """Start uvicorn on the backend with either a local mongod or the in-memory store."""
+    env = dict(os.environ)
+    env["STORAGE_BACKEND"] = storage
+    if mongo_url:
+        env["MONGO_URL"] = mongo_url
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "twoem_loadtest")
+    # Setup logs in every student; keep the login limiter out of the way
+    env.setdefault("LOGIN_RATE_PER_MINUTE", "100000")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Local server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Local server did not become healthy within 30s")
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in filter(None, spec.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the TWOEM API")
+    parser.add_argument("--base-url", default=os.environ.get("REACT_APP_BACKEND_URL"),
+                        help="API to test (defaults to REACT_APP_BACKEND_URL)")
+    parser.add_argument("--start-server", choices=["memory", "mongo", "replica"],
+                        help="start a local uvicorn backed by the in-memory store, a local mongod, "
+                             "or a local three-member replica set (needs mongod on PATH)")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--students", type=int, default=10, help="students to create for the run")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="scenario weights, e.g. admin=1,student=6,public=3")
+    parser.add_argument("--json", dest="json_path", help="also write the summary as JSON to this path")
+    args = parser.parse_args()
+
+    process = None
+    replica_set = None
+    base_url = args.base_url
+    if args.start_server == "replica":
+        replica_set = start_replica_set()
+        # Public and student reads go to the secondaries unless configured otherwise
+        os.environ.setdefault("MONGO_READ_PROFILES", "public=secondaryPreferred,student=secondaryPreferred")
+        try:
+            process, base_url = start_local_server("mongo", free_port(), mongo_url=replica_set[2])
+        except Exception:
+            stop_replica_set(*replica_set[:2])
+            raise
+    elif args.start_server:
+        process, base_url = start_local_server(args.start_server, free_port())
+    elif not base_url:
+        parser.error("either --base-url (or REACT_APP_BACKEND_URL) or --start-server is required")
+
+    print(f"Load testing TWOEM Online Productions API at: {base_url}")
+    try:
+        tester = TwoemLoadTester(base_url, args.concurrency, args.duration, args.students, args.mix)
+        asyncio.run(tester.run())
+        summary = tester.summary()
+        tester.print_report(summary)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(summary, f, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if replica_set is not None:
+            stop_replica_set(*replica_set[:2])
+    return 0 if summary["error_rate"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,18 @@ import {
   ArrowDownTrayIcon
 } from '@heroicons/react/24/outline';
 
+// Resized WebP/JPEG variants from the backend image endpoint
+const IMAGE_WIDTHS = [320, 640, 960, 1280];
+
+const responsiveImage = (src, sizes) => {
+  const url = `${process.env.REACT_APP_BACKEND_URL}/api/images/${src.split('/').pop()}`;
+  return {
+    src: `${url}?w=640`,
+    srcSet: IMAGE_WIDTHS.map((width) => `${url}?w=${width} ${width}w`).join(', '),
+    sizes
+  };
+};
+
 const PublicWebsite = () => {
   const [isMenuOpen, setIsMenuOpen] = useState(false);
   const [downloads, setDownloads] = useState([]);
@@ -222,7 +234,8 @@ const PublicWebsite = () => {
                 <div className="flex flex-col md:flex-row">
                   <div className="md:w-1/3">
                     <img 
-                      src={service.image} 
+                      {...responsiveImage(service.image, '(min-width: 1024px) 17vw, (min-width: 768px) 33vw, 100vw')}
+                      loading="lazy"
                       alt={service.title}
                       className="w-full h-48 md:h-full object-cover"
                     />
@@ -317,7 +330,8 @@ const PublicWebsite = () => {
             ].map((image, index) => (
               <div key={index} className="relative group overflow-hidden rounded-xl">
                 <img 
-                  src={image.src}
+                  {...responsiveImage(image.src, '(min-width: 768px) 33vw, 100vw')}
+                  loading="lazy"
                   alt={image.alt}
                   className="w-full h-64 object-cover transition-transform duration-300 group-hover:scale-110"
                 />
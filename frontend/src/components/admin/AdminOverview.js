@@ -12,6 +12,12 @@ import {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
 
+// Only what the stats and the recent students table use; skips certificate payloads
+const OVERVIEW_FIELDS = [
+  'id', 'full_name', 'username', 'average_score', 'has_certificate', 'can_download_certificate',
+  'finance_record.is_cleared', 'finance_record.paid_amount', 'finance_record.balance'
+].join(',');
+
 const AdminOverview = () => {
   const [stats, setStats] = useState({
     totalStudents: 0,
@@ -30,7 +36,9 @@ const AdminOverview = () => {
 
   const fetchOverviewData = async () => {
     try {
-      const response = await axios.get(`${API_BASE}/admin/students`);
+      const response = await axios.get(`${API_BASE}/admin/students`, {
+        params: { fields: OVERVIEW_FIELDS }
+      });
       const studentsData = response.data;
       setStudents(studentsData);
 
@@ -5,7 +5,8 @@ import {
   CloudArrowUpIcon, 
   CheckCircleIcon,
   XCircleIcon,
-  EyeIcon
+  EyeIcon,
+  SparklesIcon
 } from '@heroicons/react/24/outline';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -18,11 +19,31 @@ const CertificateManagement = () => {
   const [selectedFile, setSelectedFile] = useState(null);
   const [selectedStudent, setSelectedStudent] = useState(null);
   const [showUploadModal, setShowUploadModal] = useState(false);
+  const [generationJob, setGenerationJob] = useState(null);
 
   useEffect(() => {
     fetchStudents();
   }, []);
 
+  // Poll the batch generation job until it finishes
+  useEffect(() => {
+    if (!generationJob || !['queued', 'running'].includes(generationJob.status)) {
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API_BASE}/admin/jobs/${generationJob.id}`);
+        setGenerationJob(response.data);
+        if (response.data.status === 'succeeded') {
+          fetchStudents();
+        }
+      } catch (error) {
+        console.error('Error fetching job status:', error);
+      }
+    }, 2000);
+    return () => clearTimeout(timer);
+  }, [generationJob]);
+
   const fetchStudents = async () => {
     try {
       const response = await axios.get(`${API_BASE}/admin/students`);
@@ -40,6 +61,21 @@ const CertificateManagement = () => {
     setShowUploadModal(true);
   };
 
+  const handleGenerateCertificates = async () => {
+    if (!window.confirm('Generate certificates from the template for every eligible student without one?')) {
+      return;
+    }
+    try {
+      const response = await axios.post(`${API_BASE}/admin/jobs`, { kind: 'generate_certificates' });
+      setGenerationJob(response.data);
+    } catch (error) {
+      console.error('Error starting certificate generation:', error);
+      alert(error.response?.data?.detail || 'Error starting certificate generation');
+    }
+  };
+
+  const generationRunning = generationJob && ['queued', 'running'].includes(generationJob.status);
+
   const handleFileChange = (e) => {
     const file = e.target.files[0];
     if (file) {
@@ -139,8 +175,40 @@ const CertificateManagement = () => {
             Upload and manage student certificates. Students can only download if they have ≥60% average and cleared fees.
           </p>
         </div>
+        <div className="mt-4 sm:mt-0 sm:ml-16 sm:flex-none">
+          <button
+            onClick={handleGenerateCertificates}
+            disabled={generationRunning}
+            className="inline-flex items-center justify-center rounded-md border border-transparent bg-indigo-600 px-4 py-2 text-sm font-medium text-white shadow-sm hover:bg-indigo-700 disabled:opacity-50"
+          >
+            <SparklesIcon className="h-4 w-4 mr-2" />
+            {generationRunning ? 'Generating...' : 'Generate Certificates'}
+          </button>
+        </div>
       </div>
 
+      {generationJob && (
+        <div className="mt-4 bg-indigo-50 p-4 rounded-md text-sm text-indigo-800">
+          {generationJob.status === 'succeeded' ? (
+            <p>Generated {generationJob.result?.generated ?? 0} certificates.</p>
+          ) : generationJob.status === 'failed' || generationJob.status === 'cancelled' ? (
+            <p className="text-red-700">Certificate generation {generationJob.status}: {generationJob.error || 'no details'}</p>
+          ) : (
+            <>
+              <p>{generationJob.progress?.message || 'Waiting to start...'}</p>
+              {generationJob.progress?.total > 0 && (
+                <div className="mt-2 h-2 w-full bg-indigo-100 rounded">
+                  <div
+                    className="h-2 bg-indigo-600 rounded"
+                    style={{ width: `${(100 * generationJob.progress.done) / generationJob.progress.total}%` }}
+                  ></div>
+                </div>
+              )}
+            </>
+          )}
+        </div>
+      )}
+
       <div className="mt-8 flex flex-col">
         <div className="-my-2 -mx-4 overflow-x-auto sm:-mx-6 lg:-mx-8">
           <div className="inline-block min-w-full py-2 align-middle md:px-6 lg:px-8">
@@ -50,7 +50,8 @@ const NotificationsManagement = () => {
   const fetchStudents = async () => {
     try {
       const response = await axios.get(`${BACKEND_URL}/api/admin/students`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params: { fields: 'id,full_name,username' }
       });
       setStudents(response.data);
     } catch (error) {
@@ -1,28 +1,9 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
 import { AcademicCapIcon, TrophyIcon } from '@heroicons/react/24/outline';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API_BASE = `${BACKEND_URL}/api`;
-
-const StudentAcademics = () => {
-  const [student, setStudent] = useState(null);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    fetchStudentProfile();
-  }, []);
-
-  const fetchStudentProfile = async () => {
-    try {
-      const response = await axios.get(`${API_BASE}/student/profile`);
-      setStudent(response.data);
-    } catch (error) {
-      console.error('Error fetching student profile:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+const StudentAcademics = ({ dashboard }) => {
+  const loading = dashboard === undefined;
+  const student = dashboard?.profile ?? null;
 
   const getScoreColor = (score) => {
     if (score === null || score === undefined) return 'bg-gray-200 text-gray-700';
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import axios from 'axios';
 import { 
   DocumentIcon, 
@@ -12,26 +12,11 @@ import {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
 
-const StudentCertificate = () => {
-  const [student, setStudent] = useState(null);
-  const [loading, setLoading] = useState(true);
+const StudentCertificate = ({ dashboard }) => {
+  const loading = dashboard === undefined;
+  const student = dashboard?.profile ?? null;
   const [downloading, setDownloading] = useState(false);
 
-  useEffect(() => {
-    fetchStudentProfile();
-  }, []);
-
-  const fetchStudentProfile = async () => {
-    try {
-      const response = await axios.get(`${API_BASE}/student/profile`);
-      setStudent(response.data);
-    } catch (error) {
-      console.error('Error fetching student profile:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
   const handleDownloadCertificate = async () => {
     if (!student.can_download_certificate) {
       alert('You are not eligible to download the certificate yet.');
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { Routes, Route, Link, useLocation, Navigate } from 'react-router-dom';
+import axios from 'axios';
 import { useAuth } from '../../contexts/AuthContext';
 import { 
   HomeIcon, 
@@ -21,10 +22,31 @@ import StudentFinance from './StudentFinance';
 import StudentCertificate from './StudentCertificate';
 import StudentResources from './StudentResources';
 
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+
 const StudentDashboard = () => {
   const { user, logout } = useAuth();
   const location = useLocation();
   const [sidebarOpen, setSidebarOpen] = useState(false);
+  // undefined while loading, null if the request failed
+  const [dashboard, setDashboard] = useState(undefined);
+
+  // Profile, notifications, resources, downloads and WiFi in one round trip
+  const fetchDashboard = useCallback(async () => {
+    try {
+      const response = await axios.get(`${BACKEND_URL}/api/student/dashboard`);
+      setDashboard(response.data);
+    } catch (error) {
+      console.error('Error fetching student dashboard:', error);
+      setDashboard(null);
+    }
+  }, []);
+
+  useEffect(() => {
+    if (!user?.is_first_login) {
+      fetchDashboard();
+    }
+  }, [user, fetchDashboard]);
 
   // Redirect to change password if first login
   if (user?.is_first_login) {
@@ -172,11 +194,11 @@ const StudentDashboard = () => {
         {/* Page content */}
         <main className="flex-1 pb-8 bg-gray-50">
           <Routes>
-            <Route index element={<StudentProfile />} />
-            <Route path="academics" element={<StudentAcademics />} />
-            <Route path="finance" element={<StudentFinance />} />
-            <Route path="certificate" element={<StudentCertificate />} />
-            <Route path="resources" element={<StudentResources />} />
+            <Route index element={<StudentProfile dashboard={dashboard} onRefresh={fetchDashboard} />} />
+            <Route path="academics" element={<StudentAcademics dashboard={dashboard} />} />
+            <Route path="finance" element={<StudentFinance dashboard={dashboard} />} />
+            <Route path="certificate" element={<StudentCertificate dashboard={dashboard} />} />
+            <Route path="resources" element={<StudentResources dashboard={dashboard} />} />
           </Routes>
         </main>
       </div>
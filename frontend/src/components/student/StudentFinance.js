@@ -1,5 +1,4 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
 import { 
   CurrencyDollarIcon, 
   CheckCircleIcon, 
@@ -8,27 +7,9 @@ import {
   DocumentTextIcon
 } from '@heroicons/react/24/outline';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API_BASE = `${BACKEND_URL}/api`;
-
-const StudentFinance = () => {
-  const [student, setStudent] = useState(null);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    fetchStudentProfile();
-  }, []);
-
-  const fetchStudentProfile = async () => {
-    try {
-      const response = await axios.get(`${API_BASE}/student/profile`);
-      setStudent(response.data);
-    } catch (error) {
-      console.error('Error fetching student profile:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+const StudentFinance = ({ dashboard }) => {
+  const loading = dashboard === undefined;
+  const student = dashboard?.profile ?? null;
 
   if (loading) {
     return (
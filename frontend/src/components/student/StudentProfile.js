@@ -5,9 +5,9 @@ import { UserIcon, PencilIcon, CheckIcon, XMarkIcon } from '@heroicons/react/24/
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
 
-const StudentProfile = () => {
-  const [student, setStudent] = useState(null);
-  const [loading, setLoading] = useState(true);
+const StudentProfile = ({ dashboard, onRefresh }) => {
+  const loading = dashboard === undefined;
+  const student = dashboard?.profile ?? null;
   const [editing, setEditing] = useState(false);
   const [saving, setSaving] = useState(false);
   const [parentContacts, setParentContacts] = useState({
@@ -20,31 +20,18 @@ const StudentProfile = () => {
   });
 
   useEffect(() => {
-    fetchStudentProfile();
-  }, []);
-
-  const fetchStudentProfile = async () => {
-    try {
-      const response = await axios.get(`${API_BASE}/student/profile`);
-      setStudent(response.data);
-      
-      // Set parent contacts if they exist
-      if (response.data.parent_contacts) {
-        setParentContacts(response.data.parent_contacts);
-      }
-    } catch (error) {
-      console.error('Error fetching student profile:', error);
-    } finally {
-      setLoading(false);
+    // Set parent contacts if they exist
+    if (student?.parent_contacts) {
+      setParentContacts(student.parent_contacts);
     }
-  };
+  }, [student]);
 
   const handleSaveContacts = async () => {
     setSaving(true);
     try {
       await axios.put(`${API_BASE}/student/parent-contacts`, parentContacts);
       setEditing(false);
-      fetchStudentProfile();
+      onRefresh();
     } catch (error) {
       console.error('Error saving parent contacts:', error);
       alert('Error saving parent contacts');
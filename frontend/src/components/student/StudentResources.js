@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import axios from 'axios';
 import { useAuth } from '../../contexts/AuthContext';
 import { 
@@ -18,80 +18,16 @@ import {
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
-const StudentResources = () => {
+const StudentResources = ({ dashboard }) => {
   const { token } = useAuth();
   const [activeTab, setActiveTab] = useState('notifications');
-  const [notifications, setNotifications] = useState([]);
-  const [resources, setResources] = useState([]);
-  const [downloads, setDownloads] = useState([]);
-  const [wifiCredentials, setWifiCredentials] = useState(null);
-  const [loading, setLoading] = useState(true);
   const [showWifiPassword, setShowWifiPassword] = useState(false);
   const [message, setMessage] = useState({ type: '', text: '' });
-
-  useEffect(() => {
-    fetchAllData();
-  }, []);
-
-  const fetchAllData = async () => {
-    try {
-      setLoading(true);
-      await Promise.all([
-        fetchNotifications(),
-        fetchResources(),
-        fetchDownloads(),
-        fetchWifiCredentials()
-      ]);
-    } catch (error) {
-      console.error('Error fetching data:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const fetchNotifications = async () => {
-    try {
-      const response = await axios.get(`${BACKEND_URL}/api/student/notifications`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setNotifications(response.data);
-    } catch (error) {
-      console.error('Error fetching notifications:', error);
-    }
-  };
-
-  const fetchResources = async () => {
-    try {
-      const response = await axios.get(`${BACKEND_URL}/api/student/resources`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setResources(response.data);
-    } catch (error) {
-      console.error('Error fetching resources:', error);
-    }
-  };
-
-  const fetchDownloads = async () => {
-    try {
-      const response = await axios.get(`${BACKEND_URL}/api/student/downloads`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setDownloads(response.data);
-    } catch (error) {
-      console.error('Error fetching downloads:', error);
-    }
-  };
-
-  const fetchWifiCredentials = async () => {
-    try {
-      const response = await axios.get(`${BACKEND_URL}/api/student/wifi`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setWifiCredentials(response.data);
-    } catch (error) {
-      console.error('Error fetching WiFi credentials:', error);
-    }
-  };
+  const loading = dashboard === undefined;
+  const notifications = dashboard?.notifications || [];
+  const resources = dashboard?.resources || [];
+  const downloads = dashboard?.downloads || [];
+  const wifiCredentials = dashboard?.wifi || null;
 
   const downloadNotificationAttachment = async (notificationId, filename) => {
     try {
@@ -135,6 +71,28 @@ const StudentResources = () => {
     }
   };
 
+  const downloadSubjectBundle = async (subject) => {
+    try {
+      const response = await axios.get(`${BACKEND_URL}/api/student/resources/bundle`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { subject },
+        responseType: 'blob'
+      });
+      
+      const url = window.URL.createObjectURL(new Blob([response.data]));
+      const link = document.createElement('a');
+      link.href = url;
+      link.setAttribute('download', `${subject}.zip`);
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      window.URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Error downloading resources:', error);
+      setMessage({ type: 'error', text: 'Failed to download resources' });
+    }
+  };
+
   const downloadPublicFile = async (downloadId, filename) => {
     try {
       const response = await axios.get(`${BACKEND_URL}/api/downloads/${downloadId}`, {
@@ -331,7 +289,7 @@ const StudentResources = () => {
             ) : (
               Object.entries(groupedResources).map(([subject, subjectResources]) => (
                 <div key={subject} className="bg-white rounded-lg border border-gray-200 overflow-hidden">
-                  <div className="bg-gray-50 px-6 py-4 border-b border-gray-200">
+                  <div className="bg-gray-50 px-6 py-4 border-b border-gray-200 flex items-center justify-between">
                     <div className="flex items-center space-x-3">
                       <TagIcon className="h-5 w-5 text-gray-500" />
                       <h2 className="text-xl font-semibold text-gray-900">{subject}</h2>
@@ -339,6 +297,15 @@ const StudentResources = () => {
                         {subjectResources.length} {subjectResources.length === 1 ? 'resource' : 'resources'}
                       </span>
                     </div>
+                    {subjectResources.length > 1 && (
+                      <button
+                        onClick={() => downloadSubjectBundle(subject)}
+                        className="text-blue-600 hover:text-blue-800 text-sm font-medium flex items-center space-x-1"
+                      >
+                        <DocumentArrowDownIcon className="h-4 w-4" />
+                        <span>Download all (ZIP)</span>
+                      </button>
+                    )}
                   </div>
                   
                   <div className="divide-y divide-gray-200">
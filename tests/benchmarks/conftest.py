@@ -0,0 +1,170 @@
+"""Micro-benchmark harness for the backend hot paths.
+
+Each benchmark is timed as the best of several rounds and divided by the
+time of a fixed pure-Python calibration loop, so the stored baselines are
+relative costs that carry over between machines reasonably well. A
+benchmark fails only when it exceeds its baseline by more than the budget
+both in calibration units and in wall time: a slower machine moves only the
+latter, a noisy calibration only the former, a real regression both. A
+benchmark over budget is timed again before it fails, and baselines are
+recorded as the best of several measurements, so one noisy run on a busy
+machine does not fail the suite.
+
+They are skipped unless asked for (see tests/conftest.py for the options):
+
+    pytest tests/benchmarks --benchmarks                          # compare against baselines
+    pytest tests/benchmarks --benchmark-update                    # re-record baselines
+    pytest tests/benchmarks --benchmarks --benchmark-budget 1.0   # allow a 2x slowdown
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+
+# server.py reads its configuration at import time
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+sys.path.insert(0, str(BACKEND_DIR))
+
+ROUNDS = 9
+MIN_ROUND_SECONDS = 0.05
+# Measurements per benchmark when recording a baseline, and at most when one is over budget
+REPEATS = 3
+
+
+def _calibrate() -> float:
+    def reference():
+        total = 0
+        for i in range(10000):
+            total += i * i % 7
+        return total
+
+    return _best_of(reference, ROUNDS)
+
+
+def _best_of(fn, rounds: int) -> float:
+    # Size each round so timer resolution and call overhead stay negligible
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        iterations *= 2
+
+    best = elapsed / iterations
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+class BenchmarkSession:
+    def __init__(self, config):
+        self.update = config.getoption("--benchmark-update")
+        self.budget = config.getoption("--benchmark-budget")
+        self.baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+        self.results = {}
+        self.unit = _calibrate()
+
+    def measure(self, name: str, fn) -> dict:
+        seconds = _best_of(fn, ROUNDS)
+        previous = self.results.get(name)
+        if previous is not None:
+            seconds = min(seconds, previous["seconds"])
+        result = {"seconds": seconds, "relative": seconds / self.unit}
+        self.results[name] = result
+        return result
+
+    def regressed(self, name: str, result: dict) -> bool:
+        baseline = self.baselines.get(name)
+        if self.update or baseline is None:
+            return False
+        return (
+            result["relative"] > baseline["relative"] * (1 + self.budget)
+            and result["seconds"] > baseline["seconds"] * (1 + self.budget)
+        )
+
+    def check(self, name: str, result: dict) -> None:
+        baseline = self.baselines.get(name)
+        if self.regressed(name, result):
+            pytest.fail(
+                f"{name} regressed: {result['relative']:.3f} calibration units "
+                f"({result['seconds'] * 1e6:.1f}us) vs baseline {baseline['relative']:.3f}, "
+                f"budget {self.budget:.0%}",
+                pytrace=False,
+            )
+
+    def save(self) -> None:
+        baselines = dict(self.baselines)
+        for name, result in self.results.items():
+            baselines[name] = {
+                "relative": float(f"{result['relative']:.4g}"),
+                "seconds": float(f"{result['seconds']:.4g}"),
+            }
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def benchmark_session(request):
+    session = BenchmarkSession(request.config)
+    request.config._benchmark_session = session
+    return session
+
+
+@pytest.fixture
+def benchmark(benchmark_session, request):
+    """Time `fn` and compare it to the stored baseline for this test."""
+
+    def run(fn, *args, **kwargs):
+        name = request.node.name
+        result = benchmark_session.measure(name, lambda: fn(*args, **kwargs))
+        for _ in range(REPEATS - 1):
+            # Keep the best of the repeats: noise only ever adds time
+            if not (benchmark_session.update or benchmark_session.regressed(name, result)):
+                break
+            result = benchmark_session.measure(name, lambda: fn(*args, **kwargs))
+        benchmark_session.check(name, result)
+        return result
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    benchmark_session = getattr(session.config, "_benchmark_session", None)
+    if benchmark_session is not None and benchmark_session.update:
+        benchmark_session.save()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    benchmark_session = getattr(config, "_benchmark_session", None)
+    if benchmark_session is None or not benchmark_session.results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(f"calibration unit: {benchmark_session.unit * 1e6:.1f}us")
+    for name, result in sorted(benchmark_session.results.items()):
+        baseline = benchmark_session.baselines.get(name)
+        change = (
+            f"{result['relative'] / baseline['relative'] - 1:+.1%}" if baseline else "no baseline"
+        )
+        terminalreporter.write_line(
+            f"{name:<45} {result['seconds'] * 1e6:>12.1f}us {result['relative']:>10.3f} {change:>12}"
+        )
@@ -0,0 +1,264 @@
+"""Benchmarks for model construction and serialization on the request path.
+
+Documents are synthetic but sized like production data: a certificate PDF
+of ~150KB, notification bodies of a few KB and list endpoints returning a
+class-sized batch of records. The list conversion benchmarks call the route
+handlers themselves against the in-memory store, so they time the
+query and conversion code that actually ships.
+"""
+import base64
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+import server
+
+STUDENTS = 50
+LIST_SIZE = 50
+
+
+def pdf_payload(size: int) -> bytes:
+    return b"%PDF-1.4\n" + os.urandom(size)
+
+
+def user_doc(username: str, role: str = "student") -> dict:
+    return server.User(
+        username=username,
+        email=f"{username}@example.com",
+        role=role,
+        hashed_password="$2b$12$" + "x" * 53,
+        is_first_login=False,
+    ).dict()
+
+
+ADMIN = server.User(**user_doc("admin", role="admin"))
+
+
+def student_doc(user_id: str, index: int, certificate: bool = True) -> dict:
+    doc = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "full_name": f"Student Number {index}",
+        "id_number": f"{30000000 + index}",
+        "email": f"student{index}@example.com",
+        "phone": "+254700000000",
+        "parent_contacts": {
+            "father_name": "Father Name", "father_phone": "+254711111111",
+            "mother_name": "Mother Name", "mother_phone": "+254722222222",
+        },
+        "academic_record": {
+            "ms_word": 72, "ms_excel": 65, "ms_powerpoint": 80, "ms_access": 58,
+            "computer_intro": 91, "updated_at": datetime.utcnow(),
+        },
+        "finance_record": {
+            "total_fees": 15000.0, "paid_amount": 15000.0, "balance": 0.0,
+            "payment_reference": f"MPESA{index:06d}", "last_payment_date": datetime.utcnow(),
+            "is_cleared": True, "updated_at": datetime.utcnow(),
+        },
+        "certificate": None,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    }
+    if certificate:
+        doc["certificate"] = {
+            "filename": f"certificate_{index}.pdf",
+            "file_data": base64.b64encode(pdf_payload(150_000)).decode("utf-8"),
+            "uploaded_at": datetime.utcnow(),
+            "uploaded_by": "admin-id",
+        }
+    return doc
+
+
+def notification_doc(index: int) -> dict:
+    return server.Notification(
+        title=f"Notice {index}",
+        content="<p>" + "Classes resume on Monday at 8am in the main lab. " * 40 + "</p>",
+        attachment_filename="timetable.pdf",
+        attachment_data=base64.b64encode(pdf_payload(100_000)).decode("utf-8"),
+        created_by="admin-id",
+        priority="high",
+    ).dict()
+
+
+def download_doc(index: int) -> dict:
+    return server.DownloadFile(
+        title=f"Course notes {index}",
+        description="Lecture notes for the week",
+        filename=f"notes_{index}.pdf",
+        file_data=base64.b64encode(pdf_payload(200_000)).decode("utf-8"),
+        file_type="public",
+        uploaded_by="admin-id",
+        download_count=index * 3,
+    ).dict()
+
+
+def resource_doc(index: int) -> dict:
+    return server.StudentResource(
+        title=f"Resource {index}",
+        description="Practice exercises",
+        subject="ms_excel",
+        filename=f"resource_{index}.pdf",
+        file_data=base64.b64encode(pdf_payload(200_000)).decode("utf-8"),
+        uploaded_by="admin-id",
+    ).dict()
+
+
+def eulogy_doc(index: int) -> dict:
+    return server.Eulogy(
+        title=f"In memory {index}",
+        description="Celebrating a life",
+        filename=f"eulogy_{index}.pdf",
+        file_data=base64.b64encode(pdf_payload(200_000)).decode("utf-8"),
+        uploaded_by="admin-id",
+    ).dict()
+
+
+def response_field(path: str):
+    return next(
+        route.response_field for route in server.app.routes
+        if getattr(route, "path", None) == path and "GET" in route.methods
+    )
+
+
+def render(event_loop, path: str, content, response_class) -> bytes:
+    """Serialize like the route handler: response_model, then the response class."""
+    serialized = event_loop.run_until_complete(
+        serialize_response(field=response_field(path), response_content=content))
+    return response_class(serialized).body
+
+
+def call_handler(event_loop, handler):
+    """Run an admin list handler as the route would with no ?fields= selection."""
+    return event_loop.run_until_complete(handler(admin_user=ADMIN, fields=None))
+
+
+@pytest.fixture
+def seeded(event_loop):
+    """Insert documents into a collection for the duration of one test."""
+    collections = []
+
+    def seed(collection, docs):
+        collections.append(collection)
+        event_loop.run_until_complete(collection.insert_many(docs))
+
+    yield seed
+    for collection in collections:
+        event_loop.run_until_complete(collection.delete_many({}))
+
+
+@pytest.fixture(scope="module")
+def student_docs(event_loop):
+    docs = []
+    for index in range(STUDENTS):
+        user = user_doc(f"student{index}")
+        event_loop.run_until_complete(server.db.users.insert_one(user))
+        docs.append(student_doc(user["id"], index, certificate=index % 2 == 0))
+    yield docs
+    event_loop.run_until_complete(server.db.users.delete_many({"role": "student"}))
+
+
+def test_calculate_average_score(benchmark):
+    record = server.AcademicRecord(ms_word=72, ms_excel=65, ms_powerpoint=80, ms_access=58)
+    benchmark(server.calculate_average_score, record)
+
+
+def test_student_validation(benchmark, student_docs):
+    doc = student_docs[0]
+    benchmark(lambda: server.Student(**doc))
+
+
+def test_student_trusted_load(benchmark, student_docs):
+    doc = student_docs[0]
+    benchmark(server.trusted.load, server.Student, doc)
+
+
+def test_get_student_response(benchmark, student_docs, event_loop):
+    student = server.Student(**student_docs[0])
+    benchmark(lambda: event_loop.run_until_complete(server.get_student_response(student)))
+
+
+def test_student_list_conversion(benchmark, student_docs, seeded, event_loop):
+    seeded(server.db.students, student_docs)
+    benchmark(call_handler, event_loop, server.get_all_students)
+
+
+@pytest.mark.parametrize("response_class", [JSONResponse, ORJSONResponse], ids=["json", "orjson"])
+def test_student_list_render(benchmark, student_docs, event_loop, response_class):
+    async def convert():
+        students = server.trusted.load_many(server.Student, student_docs)
+        return [await server.get_student_response(student) for student in students]
+
+    students = event_loop.run_until_complete(convert())
+    benchmark(render, event_loop, "/api/admin/students", students, response_class)
+
+
+def test_user_validation(benchmark):
+    doc = user_doc("admin", role="admin")
+    benchmark(lambda: server.User(**doc))
+
+
+def test_notification_list_conversion(benchmark, seeded, event_loop):
+    seeded(server.db.notifications, [notification_doc(index) for index in range(LIST_SIZE)])
+    benchmark(call_handler, event_loop, server.get_all_notifications_admin)
+
+
+@pytest.mark.parametrize("response_class", [JSONResponse, ORJSONResponse], ids=["json", "orjson"])
+def test_notification_list_render(benchmark, event_loop, response_class):
+    notifications = [
+        server.trusted.load(server.NotificationResponse, notification_doc(index), has_attachment=True)
+        for index in range(LIST_SIZE)
+    ]
+    benchmark(render, event_loop, "/api/admin/notifications", notifications, response_class)
+
+
+@pytest.mark.parametrize("response_class", [JSONResponse, ORJSONResponse], ids=["json", "orjson"])
+def test_download_list_render(benchmark, event_loop, response_class):
+    downloads = server.trusted.load_many(
+        server.DownloadFileResponse, [download_doc(index) for index in range(LIST_SIZE)])
+    benchmark(render, event_loop, "/api/admin/downloads", downloads, response_class)
+
+
+def test_download_list_conversion(benchmark, seeded, event_loop):
+    seeded(server.db.downloads, [download_doc(index) for index in range(LIST_SIZE)])
+    benchmark(call_handler, event_loop, server.get_all_downloads_admin)
+
+
+def test_download_list_trusted_load(benchmark):
+    docs = [download_doc(index) for index in range(LIST_SIZE)]
+    benchmark(server.trusted.load_many, server.DownloadFileResponse, docs)
+
+
+def test_resource_list_conversion(benchmark, seeded, event_loop):
+    seeded(server.db.student_resources, [resource_doc(index) for index in range(LIST_SIZE)])
+    benchmark(call_handler, event_loop, server.get_all_resources_admin)
+
+
+def test_eulogy_list_conversion(benchmark, seeded, event_loop):
+    seeded(server.db.eulogies, [eulogy_doc(index) for index in range(LIST_SIZE)])
+    benchmark(call_handler, event_loop, server.get_all_eulogies_admin)
+
+
+def test_jwt_encode(benchmark):
+    benchmark(server.create_access_token, {"sub": "student0"}, timedelta(minutes=30))
+
+
+def test_jwt_decode(benchmark):
+    token = server.create_access_token({"sub": "student0"})
+    benchmark(jwt.decode, token, server.SECRET_KEY, algorithms=[server.ALGORITHM])
+
+
+@pytest.mark.parametrize("size", [100_000, 2_000_000])
+def test_base64_encode(benchmark, size):
+    payload = pdf_payload(size)
+    benchmark(server.encode_file_data, payload)
+
+
+@pytest.mark.parametrize("size", [100_000, 2_000_000])
+def test_base64_decode(benchmark, size):
+    encoded = server.encode_file_data(pdf_payload(size))
+    benchmark(server.decode_file_data, encoded)
@@ -0,0 +1,33 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+BENCHMARKS_DIR = TESTS_DIR / "benchmarks"
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, str(TESTS_DIR.parent / "backend"))
+
+
+def pytest_addoption(parser):
+    # Registered here rather than in benchmarks/conftest.py so they work however the suite is invoked
+    group = parser.getgroup("benchmarks")
+    group.addoption("--benchmarks", action="store_true",
+                    help="Run the timing benchmarks in tests/benchmarks (skipped by default)")
+    group.addoption("--benchmark-update", action="store_true",
+                    help="Record the current timings as the new baselines (implies --benchmarks)")
+    group.addoption("--benchmark-budget", type=float,
+                    default=float(os.environ.get("BENCHMARK_BUDGET", "0.5")),
+                    help="Allowed slowdown over the baseline as a fraction (default 0.5)")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Timings on a shared or busy machine are too noisy to gate every test run on
+    if config.getoption("--benchmarks") or config.getoption("--benchmark-update"):
+        return
+    skip = pytest.mark.skip(reason="benchmark; run with --benchmarks")
+    for item in items:
+        if BENCHMARKS_DIR in item.path.parents:
+            item.add_marker(skip)
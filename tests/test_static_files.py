@@ -0,0 +1,74 @@
+"""Routing of the built frontend next to the API.
+
+The frontend is served for paths no route matched. The /api routes must keep
+their own 404s, 405s and trailing-slash redirects when a static dir exists.
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+
+# server.py reads its configuration at import time
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / "index.html").write_text("<!doctype html><div id=root></div>")
+    (tmp_path / "main.3f2a1b4c.js").write_text("console.log(1)")
+    monkeypatch.setattr(server, "STATIC_DIR", tmp_path)
+    app = server.create_app()
+
+    def request(method, path):
+        async def send():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.request(method, path)
+        return asyncio.run(send())
+
+    return request
+
+
+def test_client_routes_get_index(client):
+    for path in ("/", "/admin/students/42"):
+        response = client("GET", path)
+        assert response.status_code == 200
+        assert response.text.startswith("<!doctype html>")
+        assert response.headers["cache-control"] == "no-cache"
+
+
+def test_head_serves_frontend(client):
+    assert client("HEAD", "/").status_code == 200
+
+
+def test_hashed_asset(client):
+    response = client("GET", "/main.3f2a1b4c.js")
+    assert response.text == "console.log(1)"
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_missing_asset_is_not_index(client):
+    assert client("GET", "/main.00000000.js").status_code == 404
+
+
+def test_api_trailing_slash_redirects(client):
+    response = client("GET", "/api/admin/students/")
+    assert response.status_code == 307
+    assert response.headers["location"].endswith("/api/admin/students")
+
+
+def test_api_wrong_method_is_405(client):
+    assert client("POST", "/api/auth/me").status_code == 405
+
+
+def test_unknown_api_path_is_json_404(client):
+    response = client("GET", "/api/no-such-route")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Not Found"}
+
+
+def test_non_get_outside_api_is_404(client):
+    assert client("POST", "/admin/students").status_code == 404
@@ -0,0 +1,278 @@
+"""Semantics of the in-memory storage backend, checked against what MongoDB does.
+
+The API runs on InMemoryDatabase for the benchmarks and hermetic runs, so
+its query, update, index and bulk write behaviour has to match Motor's for
+the handlers that use it.
+"""
+import asyncio
+import re
+
+import pytest
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from storage import InMemoryDatabase, InMemoryRepository, Repository, matches, parse_read_profiles
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def users():
+    repository = InMemoryRepository("users")
+    run(repository.insert_many([
+        {"id": "1", "username": "amy", "age": 30, "tags": ["admin", "staff"], "profile": {"city": "Nairobi"}},
+        {"id": "2", "username": "ben", "age": 25, "tags": ["staff"], "profile": {"city": "Mombasa"}},
+        {"id": "3", "username": "cat", "age": None, "tags": []},
+    ]))
+    return repository
+
+
+def usernames(repository, filter=None, **cursor):
+    found = repository.find(filter, {"_id": 0, "username": 1})
+    for method, argument in cursor.items():
+        found = getattr(found, method)(argument)
+    return [document["username"] for document in run(found.to_list(None))]
+
+
+# Queries
+
+@pytest.mark.parametrize("filter, expected", [
+    ({"username": "amy"}, ["amy"]),
+    ({"profile.city": "Mombasa"}, ["ben"]),
+    ({"tags": "staff"}, ["amy", "ben"]),
+    ({"tags": {"$in": ["admin"]}}, ["amy"]),
+    ({"username": {"$nin": ["amy", "ben"]}}, ["cat"]),
+    ({"username": {"$ne": "amy"}}, ["ben", "cat"]),
+    ({"age": {"$gt": 25}}, ["amy"]),
+    ({"age": {"$gte": 25, "$lt": 30}}, ["ben"]),
+    ({"age": None}, ["cat"]),
+    ({"profile": {"$exists": False}}, ["cat"]),
+    ({"profile.city": {"$exists": True}}, ["amy", "ben"]),
+    ({"username": {"$regex": "^[ab]"}}, ["amy", "ben"]),
+    ({"username": re.compile("T", re.I)}, ["cat"]),
+    ({"age": {"$not": {"$gt": 25}}}, ["ben", "cat"]),
+    ({"$or": [{"username": "amy"}, {"age": 25}]}, ["amy", "ben"]),
+    ({"$and": [{"tags": "staff"}, {"age": {"$lt": 30}}]}, ["ben"]),
+    ({"$nor": [{"username": "amy"}, {"username": "ben"}]}, ["cat"]),
+    ({"missing": None}, ["amy", "ben", "cat"]),
+])
+def test_query_operators(users, filter, expected):
+    assert usernames(users, filter) == expected
+
+
+def test_unsupported_operator_is_an_error():
+    with pytest.raises(NotImplementedError):
+        matches({"a": 1}, {"a": {"$elemMatch": {"b": 1}}})
+
+
+def test_find_one_and_count(users):
+    assert run(users.find_one({"age": {"$lt": 30}}, {"_id": 0, "id": 1})) == {"id": "2"}
+    assert run(users.find_one({"username": "nobody"})) is None
+    assert run(users.count_documents({"tags": "staff"})) == 2
+
+
+# Projection, sorting and paging
+
+def test_projection_includes_and_excludes_fields(users):
+    included = run(users.find_one({"id": "1"}, {"username": 1, "profile.city": 1}))
+    assert set(included) == {"_id", "username", "profile"}
+    assert included["profile"] == {"city": "Nairobi"}
+
+    excluded = run(users.find_one({"id": "1"}, {"_id": 0, "tags": 0, "profile": 0}))
+    assert excluded == {"id": "1", "username": "amy", "age": 30}
+
+
+def test_sort_orders_missing_and_null_first(users):
+    assert usernames(users, sort="age") == ["cat", "ben", "amy"]
+    assert usernames(users, sort=[("age", -1)]) == ["amy", "ben", "cat"]
+
+
+def test_sort_on_several_keys_skip_and_limit(users):
+    run(users.insert_one({"id": "4", "username": "dan", "age": 25}))
+    ordered = users.find({}, {"_id": 0, "username": 1}).sort([("age", 1), ("username", -1)])
+    assert [document["username"] for document in run(ordered.skip(1).limit(2).to_list(None))] == ["dan", "ben"]
+    assert len(run(users.find().to_list(2))) == 2
+
+
+def test_documents_are_copied_in_and_out(users):
+    document = {"id": "5", "username": "eve", "tags": ["a"]}
+    run(users.insert_one(document))
+    assert "_id" in document  # like pymongo, the generated _id is set on the caller's document
+    document["tags"].append("b")
+
+    found = run(users.find_one({"id": "5"}))
+    assert found["tags"] == ["a"]
+    found["tags"].append("c")
+    assert run(users.find_one({"id": "5"}))["tags"] == ["a"]
+
+
+async def _iterate(cursor):
+    return [document async for document in cursor]
+
+
+def test_cursor_is_async_iterable(users):
+    assert len(run(_iterate(users.find({"tags": "staff"})))) == 2
+
+
+# Updates
+
+def test_update_operators(users):
+    run(users.update_one({"id": "1"}, {
+        "$set": {"profile.country": "KE", "username": "amelia"},
+        "$inc": {"age": 1, "logins": 2},
+        "$unset": {"tags": ""},
+    }))
+    run(users.update_one({"id": "2"}, {"$push": {"tags": {"$each": ["x", "y"]}}, "$max": {"age": 40}}))
+    run(users.update_one({"id": "3"}, {"$addToSet": {"tags": {"$each": ["x", "x", "y"]}}, "$max": {"age": 1}}))
+
+    amy = run(users.find_one({"id": "1"}, {"_id": 0}))
+    assert amy == {"id": "1", "username": "amelia", "age": 31, "logins": 2,
+                   "profile": {"city": "Nairobi", "country": "KE"}}
+    ben = run(users.find_one({"id": "2"}))
+    assert ben["tags"] == ["staff", "x", "y"] and ben["age"] == 40
+    cat = run(users.find_one({"id": "3"}))
+    assert cat["tags"] == ["x", "y"] and cat["age"] == 1
+
+
+def test_update_one_touches_one_document_and_update_many_all(users):
+    assert run(users.update_one({"tags": "staff"}, {"$set": {"flag": True}})).modified_count == 1
+    assert run(users.count_documents({"flag": True})) == 1
+    assert run(users.update_many({"tags": "staff"}, {"$set": {"flag": True}})).modified_count == 2
+    assert run(users.count_documents({"flag": True})) == 2
+
+
+def test_replacement_keeps_the_id(users):
+    before = run(users.find_one({"id": "2"}))
+    run(users.update_one({"id": "2"}, {"id": "2", "username": "benjamin"}))
+    after = run(users.find_one({"id": "2"}))
+    assert after == {"_id": before["_id"], "id": "2", "username": "benjamin"}
+
+
+def test_upsert_inserts_filter_fields_and_set_on_insert(users):
+    result = run(users.update_one(
+        {"id": "9", "age": {"$gt": 1}},
+        {"$set": {"username": "zed"}, "$setOnInsert": {"created": True}},
+        upsert=True,
+    ))
+    assert result.upserted_id is not None
+    assert run(users.find_one({"id": "9"}, {"_id": 0})) == {"id": "9", "username": "zed", "created": True}
+
+    run(users.update_one({"id": "9"}, {"$set": {"username": "zoe"}, "$setOnInsert": {"created": False}},
+                         upsert=True))
+    assert run(users.find_one({"id": "9"}))["created"] is True
+
+
+def test_unsupported_update_operator_is_an_error(users):
+    with pytest.raises(NotImplementedError):
+        run(users.update_one({"id": "1"}, {"$rename": {"age": "years"}}))
+
+
+def test_delete(users):
+    assert run(users.delete_one({"tags": "staff"})).deleted_count == 1
+    assert run(users.delete_many({})).deleted_count == 2
+    assert run(users.count_documents({})) == 0
+
+
+# Unique indexes
+
+def test_unique_index_rejects_duplicate_inserts(users):
+    run(users.create_index("username", unique=True))
+    with pytest.raises(DuplicateKeyError):
+        run(users.insert_one({"id": "4", "username": "amy"}))
+    assert run(users.count_documents({"username": "amy"})) == 1
+
+
+def test_failed_update_leaves_the_document_unchanged(users):
+    run(users.create_index("username", unique=True))
+    with pytest.raises(DuplicateKeyError):
+        run(users.update_one({"id": "2"}, {"$set": {"username": "amy", "age": 99}}))
+    assert run(users.find_one({"id": "2"}, {"_id": 0, "username": 1, "age": 1})) == {"username": "ben", "age": 25}
+
+
+def test_compound_unique_index(users):
+    run(users.create_index([("username", 1), ("age", 1)], unique=True))
+    run(users.insert_one({"username": "amy", "age": 31}))
+    with pytest.raises(DuplicateKeyError):
+        run(users.insert_one({"username": "amy", "age": 30}))
+
+
+def test_duplicate_id_is_rejected(users):
+    document = run(users.find_one({"id": "1"}))
+    with pytest.raises(DuplicateKeyError):
+        run(users.insert_one(document))
+
+
+# Bulk writes
+
+def test_insert_many_ordered_stops_at_the_first_duplicate(users):
+    run(users.create_index("id", unique=True))
+    with pytest.raises(BulkWriteError) as error:
+        run(users.insert_many([{"id": "4"}, {"id": "1"}, {"id": "5"}]))
+    assert error.value.details["nInserted"] == 1
+    assert [e["index"] for e in error.value.details["writeErrors"]] == [1]
+    assert run(users.count_documents({"id": "5"})) == 0
+
+
+def test_insert_many_unordered_writes_everything_else(users):
+    run(users.create_index("id", unique=True))
+    with pytest.raises(BulkWriteError) as error:
+        run(users.insert_many([{"id": "1"}, {"id": "4"}, {"id": "2"}, {"id": "5"}], ordered=False))
+    details = error.value.details
+    assert details["nInserted"] == 2
+    assert [(e["index"], e["code"]) for e in details["writeErrors"]] == [(0, 11000), (2, 11000)]
+    assert run(users.count_documents({"id": {"$in": ["4", "5"]}})) == 2
+
+
+def test_bulk_write_mixed_operations(users):
+    result = run(users.bulk_write([
+        InsertOne({"id": "4", "username": "dan"}),
+        UpdateOne({"id": "1"}, {"$inc": {"age": 1}}),
+        UpdateMany({"tags": "staff"}, {"$set": {"staff": True}}),
+        UpdateOne({"id": "7"}, {"$set": {"username": "gus"}}, upsert=True),
+        ReplaceOne({"id": "3"}, {"id": "3", "username": "cathy"}),
+        DeleteOne({"id": "2"}),
+        DeleteMany({"username": "nobody"}),
+    ]))
+    assert (result.inserted_count, result.matched_count, result.modified_count,
+            result.upserted_count, result.deleted_count) == (1, 4, 4, 1, 1)
+    assert list(result.upserted_ids) == [3]
+    assert usernames(users, sort="id") == ["amy", "cathy", "dan", "gus"]
+
+
+def test_bulk_write_reports_duplicates(users):
+    run(users.create_index("id", unique=True))
+    with pytest.raises(BulkWriteError) as error:
+        run(users.bulk_write([InsertOne({"id": "1"}), UpdateOne({"id": "2"}, {"$set": {"seen": True}})],
+                             ordered=False))
+    assert [e["index"] for e in error.value.details["writeErrors"]] == [0]
+    assert error.value.details["nMatched"] == 1
+    assert run(users.find_one({"id": "2"}))["seen"] is True
+
+
+# Database
+
+def test_database_exposes_repositories_by_attribute_and_item():
+    db = InMemoryDatabase()
+    assert db.users is db["users"]
+    assert db.audit_log is db["audit_log"]
+    assert db.reads("public") is db
+    with pytest.raises(AttributeError):
+        db._private
+    run(db.ping())
+
+
+def test_repository_is_abstract():
+    with pytest.raises(TypeError):
+        Repository()
+
+
+def test_parse_read_profiles():
+    profiles = parse_read_profiles("public=secondaryPreferred:local, student=nearest", max_staleness=120)
+    assert profiles["public"]["read_preference"].mongos_mode == "secondaryPreferred"
+    assert profiles["public"]["read_preference"].max_staleness == 120
+    assert profiles["public"]["read_concern"].level == "local"
+    assert "read_concern" not in profiles["student"]
+    with pytest.raises(ValueError):
+        parse_read_profiles("public=fastest")